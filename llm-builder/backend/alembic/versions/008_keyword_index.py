@@ -0,0 +1,46 @@
+"""Keyword inverted index (BM25) per knowledge base
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-03-04
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "keyword_chunks",
+        sa.Column("point_id", sa.String(36), primary_key=True),
+        sa.Column("knowledge_base_id", sa.String(36), sa.ForeignKey("knowledge_bases.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("document_id", sa.String(36), sa.ForeignKey("documents.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("length", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_keyword_chunks_knowledge_base_id", "keyword_chunks", ["knowledge_base_id"])
+    op.create_index("ix_keyword_chunks_document_id", "keyword_chunks", ["document_id"])
+
+    op.create_table(
+        "keyword_postings",
+        sa.Column("knowledge_base_id", sa.String(36), sa.ForeignKey("knowledge_bases.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("term", sa.String(64), primary_key=True),
+        sa.Column("point_id", sa.String(36), sa.ForeignKey("keyword_chunks.point_id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("document_id", sa.String(36), sa.ForeignKey("documents.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("tf", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_keyword_postings_document_id", "keyword_postings", ["document_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_keyword_postings_document_id", table_name="keyword_postings")
+    op.drop_table("keyword_postings")
+    op.drop_index("ix_keyword_chunks_document_id", table_name="keyword_chunks")
+    op.drop_index("ix_keyword_chunks_knowledge_base_id", table_name="keyword_chunks")
+    op.drop_table("keyword_chunks")
@@ -0,0 +1,40 @@
+"""Document file hash and per-chunk content hashes (dedup, incremental re-ingest)
+
+Revision ID: 010
+Revises: 009
+Create Date: 2025-03-06
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.create_index("ix_documents_kb_content_hash", "documents", ["knowledge_base_id", "content_hash"])
+
+    op.create_table(
+        "document_chunks",
+        sa.Column("point_id", sa.String(36), primary_key=True),
+        sa.Column("document_id", sa.String(36), sa.ForeignKey("documents.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("knowledge_base_id", sa.String(36), sa.ForeignKey("knowledge_bases.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("chunk_index", sa.Integer(), nullable=False),
+        sa.Column("content_hash", sa.String(64), nullable=False),
+    )
+    op.create_index("ix_document_chunks_document_id", "document_chunks", ["document_id"])
+    op.create_index("ix_document_chunks_knowledge_base_id", "document_chunks", ["knowledge_base_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_document_chunks_knowledge_base_id", table_name="document_chunks")
+    op.drop_index("ix_document_chunks_document_id", table_name="document_chunks")
+    op.drop_table("document_chunks")
+    op.drop_index("ix_documents_kb_content_hash", table_name="documents")
+    op.drop_column("documents", "content_hash")
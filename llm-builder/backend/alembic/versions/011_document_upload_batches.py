@@ -0,0 +1,26 @@
+"""Document upload batch id (bulk and archive uploads)
+
+Revision ID: 011
+Revises: 010
+Create Date: 2025-03-07
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("upload_batch_id", sa.String(36), nullable=True))
+    op.create_index("ix_documents_upload_batch_id", "documents", ["upload_batch_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_documents_upload_batch_id", table_name="documents")
+    op.drop_column("documents", "upload_batch_id")
@@ -2,6 +2,7 @@ import uuid
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.core import auth_cache
 from app.db.base import get_db
 from app.models.user import User
 from app.models.audit import ApiKey
@@ -57,4 +58,5 @@ def revoke_api_key(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="API key not found")
     db.delete(ak)
     db.commit()
+    auth_cache.invalidate(key_hash=ak.key_hash)
     return None
@@ -1,19 +1,52 @@
 import uuid
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import anyio
+from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.base import get_db
+from app.db.base import AsyncSessionLocal, get_async_db, get_db
 from app.models.user import User
 from app.models.chat import ChatSession, ChatMessage
 from app.models.deployment import Deployment
 from app.core.deps import get_current_user
-from app.services.rag import run_rag
+from app.core.sse import SSE_HEADERS, sse_event
+from app.services.rag import run_rag, stream_rag
 
 router = APIRouter()
 
 
+async def _get_session_and_history(db: AsyncSession, session_id: str, user: User) -> tuple[ChatSession, list[dict]]:
+    """Owned chat session (404 otherwise) and its last N turns (N = deployment memory_turns) for prompt memory."""
+    session = (
+        await db.execute(select(ChatSession).where(ChatSession.id == session_id, ChatSession.user_id == user.id))
+    ).scalar_one_or_none()
+    if not session:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+    dep = await db.get(Deployment, session.deployment_id)
+    memory_turns = int(dep.memory_turns or "10") if dep else 10
+    past = (
+        await db.execute(
+            select(ChatMessage)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.created_at.desc())
+            .limit(memory_turns * 2)
+        )
+    ).scalars().all()
+    return session, [{"role": m.role, "content": m.content} for m in reversed(past)]
+
+
+async def _save_turn(session_id: str, content: str, response_text: str, citations: list[dict], assistant_id: str) -> None:
+    """Persist user + assistant message once generation ends (own session: the request's may already be closed)."""
+    async with AsyncSessionLocal() as db:
+        db.add(ChatMessage(id=str(uuid.uuid4()), session_id=session_id, role="user", content=content))
+        db.add(ChatMessage(id=assistant_id, session_id=session_id, role="assistant", content=response_text, citations=citations))
+        await db.commit()
+
+
 @router.post("/sessions")
 def create_session(
     body: dict,
@@ -106,40 +139,64 @@ def get_messages(
 
 
 @router.post("/sessions/{session_id}/messages")
-def send_message(
+async def send_message(
     session_id: str,
     body: dict,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user),
 ):
     """Body: { content: string }. Runs RAG, saves user + assistant message, returns response and citations."""
-    session = db.query(ChatSession).filter(ChatSession.id == session_id, ChatSession.user_id == user.id).first()
-    if not session:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
     content = (body.get("content") or "").strip()
+    session, chat_history = await _get_session_and_history(db, session_id, user)
     if not content:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="content required")
+    # Release the connection before the (long) generation
+    await db.close()
 
-    # Load last N turns for memory
-    dep = db.query(Deployment).filter(Deployment.id == session.deployment_id).first()
-    memory_turns = int(dep.memory_turns or "10") if dep else 10
-    past = db.query(ChatMessage).filter(ChatMessage.session_id == session_id).order_by(ChatMessage.created_at.desc()).limit(memory_turns * 2).all()
-    chat_history = [{"role": m.role, "content": m.content} for m in reversed(past)]
+    response_text, citations = await run_rag(session.deployment_id, content, chat_history=chat_history)
 
-    response_text, citations = run_rag(session.deployment_id, content, chat_history=chat_history)
-
-    user_msg = ChatMessage(id=str(uuid.uuid4()), session_id=session_id, role="user", content=content)
-    assistant_msg = ChatMessage(id=str(uuid.uuid4()), session_id=session_id, role="assistant", content=response_text, citations=citations)
-    db.add(user_msg)
-    db.add(assistant_msg)
-    db.commit()
+    assistant_id = str(uuid.uuid4())
+    await _save_turn(session_id, content, response_text, citations, assistant_id)
+    return {"response": response_text, "citations": citations, "message_id": assistant_id}
 
-    return {"response": response_text, "citations": citations, "message_id": assistant_msg.id}
 
-
-@router.get("/sessions/{session_id}/messages/stream")
-def stream_message_placeholder(
+@router.api_route("/sessions/{session_id}/messages/stream", methods=["GET", "POST"])
+async def stream_message(
     session_id: str,
+    content: str | None = None,
+    body: dict | None = Body(None),
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user),
 ):
-    """Placeholder: streaming can be added here (SSE). Use POST /messages for now."""
-    raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Use POST /messages for now")
+    """
+    SSE variant of POST /messages. Content from ?content= (GET, EventSource) or body { content } (POST).
+    Events: citations (list), token ({text}) per fragment, done ({message_id}). Both messages are saved
+    when generation ends (also if the client disconnects, with the text generated so far).
+    """
+    content = ((body or {}).get("content") or content or "").strip()
+    session, chat_history = await _get_session_and_history(db, session_id, user)
+    if not content:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="content required")
+    await db.close()
+
+    try:
+        citations, tokens = await stream_rag(session.deployment_id, content, chat_history=chat_history)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    assistant_id = str(uuid.uuid4())
+
+    async def events():
+        parts = []
+        try:
+            yield sse_event("citations", citations)
+            async for text in tokens:
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+        finally:
+            # A client disconnect cancels this generator: shield, or the cancellation aborts the save as well
+            with anyio.CancelScope(shield=True):
+                await tokens.aclose()
+                await _save_turn(session_id, content, "".join(parts), citations, assistant_id)
+        yield sse_event("done", {"message_id": assistant_id})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,7 +1,10 @@
 import uuid
 from typing import Any
 
+import anyio
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.db.base import get_db
@@ -11,8 +14,9 @@ from app.models.prompt_template import PromptTemplate
 from app.schemas.deployment import DeploymentCreate, DeploymentUpdate, DeploymentResponse
 from app.schemas.prompt_template import PromptTemplateCreate, PromptTemplateUpdate, PromptTemplateResponse
 from app.core.deps import get_current_user, require_builder
-from app.services.rag import run_rag
+from app.services.rag import run_rag, stream_rag
 from app.core.audit import log_audit
+from app.core.sse import SSE_HEADERS, sse_event
 
 router = APIRouter()
 
@@ -150,19 +154,42 @@ def delete_deployment(deployment_id: str, db: Session = Depends(get_db), _: User
 
 
 @router.post("/{deployment_id}/run")
-def run_deployment(
+async def run_deployment(
     deployment_id: str,
     body: dict,
-    db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    """Run RAG for this deployment. Body: { \"question\": \"...\" }. Returns response and citations."""
+    """
+    Run RAG for this deployment. Body: { \"question\": \"...\", \"stream\": false }. Returns response and
+    citations; with stream=true, an SSE stream of citations, token ({text}) and done events.
+    """
     question = (body.get("question") or "").strip()
     if not question:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="question required")
+    if body.get("stream"):
+        try:
+            citations, tokens = await stream_rag(deployment_id, question)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
+        await run_in_threadpool(log_audit, user_id=user.id, action="deployment.run", resource_type="deployment", resource_id=deployment_id, details={"question_length": len(question), "stream": True})
+
+        async def events():
+            try:
+                yield sse_event("citations", citations)
+                async for text in tokens:
+                    yield sse_event("token", {"text": text})
+            finally:
+                # On client disconnect, close the LLM stream now rather than when the generator is collected
+                with anyio.CancelScope(shield=True):
+                    await tokens.aclose()
+            yield sse_event("done", {})
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
     try:
-        response_text, citations = run_rag(deployment_id, question)
-        log_audit(user_id=user.id, action="deployment.run", resource_type="deployment", resource_id=deployment_id, details={"question_length": len(question)})
+        response_text, citations = await run_rag(deployment_id, question)
+        await run_in_threadpool(log_audit, user_id=user.id, action="deployment.run", resource_type="deployment", resource_id=deployment_id, details={"question_length": len(question)})
         return {"response": response_text, "citations": citations}
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
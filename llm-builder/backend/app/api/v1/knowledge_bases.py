@@ -1,10 +1,14 @@
+import contextlib
 import os
 import re
 import uuid
 from typing import Annotated
 
 import json
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from rq import Queue
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
 
 from app.db.base import get_db
@@ -12,20 +16,49 @@ from app.models.user import User
 from app.models.knowledge_base import KnowledgeBase
 from app.models.document import Document, DocumentStatus
 from app.schemas.knowledge_base import KnowledgeBaseCreate, KnowledgeBaseUpdate, KnowledgeBaseResponse
-from app.schemas.document import DocumentResponse, DocumentUpdate
+from app.schemas.document import DocumentResponse, DocumentUpdate, UploadBatchResponse, UploadRejection
+from app.core.body_limit import FORM_OVERHEAD_BYTES, BodyLimitRoute, max_body_bytes
 from app.core.deps import get_current_user, require_builder
 from app.core.config import get_settings
-from app.core.queue import get_queue
+from app.core.queue import MAINTENANCE_QUEUE, enqueue_once, get_queue, ingest_job_id, ingest_queue_name
+from app.core.tracing import trace_meta
 from app.workers.ingest import run_ingest
-from app.services.qdrant_client import get_qdrant
+from app.workers.maintenance import run_migrate_collection
+from app.services.qdrant_client import get_qdrant, delete_points_by_document, search_dense, is_hybrid_collection
+from app.services.retrieval_cache import bump_content_version
+from app.services.document_chunks import INSERT_BATCH_SIZE
+from app.services.uploads import ReceivedUpload, UploadRejected, receive_files, receive_upload
 from app.schemas.rag_config import resolve_embedding_for_kb
 from app.services.embedding_registry import encode_query as encode_query_with_model
 
-router = APIRouter()
+router = APIRouter(route_class=BodyLimitRoute)
 
 # Safe upload: only types the ingest worker can parse; max 50 MB
 ALLOWED_EXTENSIONS = {".txt", ".pdf", ".docx", ".doc", ".html", ".htm"}
 MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+# Bulk upload: files (archive members included) and bytes per request; ingest jobs per Redis pipeline
+MAX_BULK_FILES = 10_000
+MAX_BULK_BYTES = 5 * 1024 * 1024 * 1024
+ENQUEUE_BATCH_SIZE = 500
+# The bulk upload form, for the OpenAPI schema (the endpoint parses it itself)
+BULK_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+                        "config": {"type": "string"},
+                        "preset_id": {"type": "string"},
+                    },
+                }
+            }
+        },
+    }
+}
 
 
 def _safe_basename(filename: str) -> str:
@@ -35,6 +68,16 @@ def _safe_basename(filename: str) -> str:
     return name or "document"
 
 
+def _file_size(doc: Document) -> int | None:
+    """Size of the document's stored file, if it has one."""
+    if not doc.storage_path:
+        return None
+    try:
+        return os.path.getsize(os.path.join(get_settings().upload_dir, doc.storage_path))
+    except OSError:
+        return None
+
+
 def _kb_to_response(kb: KnowledgeBase) -> KnowledgeBaseResponse:
     config = getattr(kb, "config", None)
     if config is not None and not isinstance(config, dict):
@@ -49,7 +92,7 @@ def _kb_to_response(kb: KnowledgeBase) -> KnowledgeBaseResponse:
     )
 
 
-def _doc_to_response(doc: Document) -> DocumentResponse:
+def _doc_to_response(doc: Document, duplicate: bool = False) -> DocumentResponse:
     config = getattr(doc, "config", None)
     if config is not None and not isinstance(config, dict):
         config = None
@@ -62,6 +105,8 @@ def _doc_to_response(doc: Document) -> DocumentResponse:
         error_message=doc.error_message,
         config=config,
         created_at=doc.created_at.isoformat() if doc.created_at else "",
+        content_hash=doc.content_hash,
+        duplicate=duplicate,
     )
 
 
@@ -78,6 +123,19 @@ def _resolve_config_from_preset(preset_id: str | None, config: dict | None, user
     return base
 
 
+def _upload_config(config: str | None, preset_id: str | None, user_id: str, db: Session) -> dict | None:
+    """Document config from the upload form: a preset and/or a JSON config (which overrides it)."""
+    if not (config or preset_id):
+        return None
+    config_dict = None
+    if config:
+        try:
+            config_dict = json.loads(config) if isinstance(config, str) else config
+        except (json.JSONDecodeError, TypeError):
+            config_dict = None
+    return _resolve_config_from_preset(preset_id, config_dict, user_id, db)
+
+
 @router.get("", response_model=list[KnowledgeBaseResponse])
 def list_knowledge_bases(
     db: Session = Depends(get_db),
@@ -171,6 +229,7 @@ def list_documents(
 
 
 @router.post("/{kb_id}/upload", response_model=DocumentResponse)
+@max_body_bytes(MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES)
 async def upload_document(
     kb_id: str,
     file: UploadFile = File(...),
@@ -189,36 +248,38 @@ async def upload_document(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File type not allowed. Use: {', '.join(sorted(ALLOWED_EXTENSIONS))}",
         )
+    doc_config = _upload_config(config, preset_id, str(user.id), db)
     settings = get_settings()
     upload_dir = os.path.join(settings.upload_dir, kb_id)
-    os.makedirs(upload_dir, exist_ok=True)
     doc_id = str(uuid.uuid4())
     storage_path = os.path.join(kb_id, f"{doc_id}{ext}")
     full_path = os.path.join(settings.upload_dir, storage_path)
-    content = b""
-    while True:
-        chunk = await file.read(1024 * 1024)
-        if not chunk:
-            break
-        if len(content) + len(chunk) > MAX_UPLOAD_BYTES:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail=f"File too large. Max size: {MAX_UPLOAD_BYTES // (1024*1024)} MB",
-            )
-        content += chunk
-    with open(full_path, "wb") as f:
-        f.write(content)
-
-    doc_config = None
-    if config or preset_id:
-        config_dict = None
-        if config:
-            try:
-                config_dict = json.loads(config) if isinstance(config, str) else config
-            except (json.JSONDecodeError, TypeError):
-                config_dict = None
-        doc_config = _resolve_config_from_preset(preset_id, config_dict, str(user.id), db)
+    try:
+        upload = await receive_upload(file, upload_dir, ext, MAX_UPLOAD_BYTES)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    content_hash = upload.sha256
 
+    # Byte-identical file with the same settings already in this KB: nothing to ingest
+    try:
+        existing = (
+            db.query(Document)
+            .filter(
+                Document.knowledge_base_id == kb_id,
+                Document.content_hash == content_hash,
+                Document.status != DocumentStatus.FAILED,
+            )
+            .all()
+        )
+        duplicate = next((d for d in existing if (d.config or None) == (doc_config or None)), None)
+    except BaseException:
+        upload.discard()
+        raise
+    if duplicate is not None:
+        upload.discard()
+        return _doc_to_response(duplicate, duplicate=True)
+
+    upload.commit(full_path)
     doc = Document(
         id=doc_id,
         knowledge_base_id=kb_id,
@@ -227,15 +288,185 @@ async def upload_document(
         storage_path=storage_path,
         status=DocumentStatus.PENDING,
         config=doc_config,
+        content_hash=content_hash,
     )
     db.add(doc)
     db.commit()
     db.refresh(doc)
-    queue = get_queue()
-    queue.enqueue(run_ingest, doc_id, job_timeout="10m")
+    queue = get_queue(ingest_queue_name(upload.size))
+    enqueue_once(queue, run_ingest, doc_id, job_id=ingest_job_id(doc_id), job_timeout="10m", meta=trace_meta())
     return _doc_to_response(doc)
 
 
+def _add_bulk_documents(
+    db: Session, kb_id: str, batch_id: str, doc_config: dict | None, received: list[tuple[str, ReceivedUpload]]
+) -> tuple[int, list[DocumentResponse]]:
+    """
+    Store a bulk upload's files as PENDING documents of the KB and enqueue their ingest jobs. Blocking (batched
+    inserts, Redis pipelines): run it in a worker thread, as a whole, so documents are never committed without
+    their jobs. Files byte-identical to a document with the same settings are discarded. Returns the number of
+    documents added and the duplicates.
+    """
+    settings = get_settings()
+    rows = []
+    sizes = []
+    duplicates: list[DocumentResponse] = []
+    stored_paths = []
+    try:
+        # Byte-identical to a document of the KB with the same settings, or to an earlier file of this batch
+        hashes = list({u.sha256 for _, u in received})
+        by_hash: dict[str, Document] = {}
+        for i in range(0, len(hashes), INSERT_BATCH_SIZE):
+            existing = (
+                db.query(Document)
+                .filter(
+                    Document.knowledge_base_id == kb_id,
+                    Document.content_hash.in_(hashes[i : i + INSERT_BATCH_SIZE]),
+                    Document.status != DocumentStatus.FAILED,
+                )
+                .all()
+            )
+            for dup in existing:
+                if (dup.config or None) == (doc_config or None):
+                    by_hash.setdefault(dup.content_hash, dup)
+
+        for name, upload in received:
+            dup = by_hash.get(upload.sha256)
+            if dup is not None:
+                upload.discard()
+                # Before the commit, which would expire (and reload) the loaded ones
+                duplicates.append(_doc_to_response(dup, duplicate=True))
+                continue
+            doc_id = str(uuid.uuid4())
+            ext = os.path.splitext(name)[1].lower()
+            storage_path = os.path.join(kb_id, f"{doc_id}{ext}")
+            full_path = os.path.join(settings.upload_dir, storage_path)
+            upload.commit(full_path)
+            stored_paths.append(full_path)
+            row = {
+                "id": doc_id,
+                "knowledge_base_id": kb_id,
+                "name": name,
+                "source_type": "file",
+                "storage_path": storage_path,
+                "status": DocumentStatus.PENDING,
+                "config": doc_config,
+                "content_hash": upload.sha256,
+                "upload_batch_id": batch_id,
+            }
+            rows.append(row)
+            sizes.append(upload.size)
+            # Later copies in the batch are duplicates of this one
+            by_hash[upload.sha256] = Document(**row)
+        for i in range(0, len(rows), INSERT_BATCH_SIZE):
+            db.execute(insert(Document), rows[i : i + INSERT_BATCH_SIZE])
+        db.commit()
+    except BaseException:
+        db.rollback()
+        for _, upload in received:
+            upload.discard()
+        for path in stored_paths:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+        raise
+
+    meta = trace_meta()
+    jobs_by_queue: dict[str, list] = {}
+    for row, size in zip(rows, sizes):
+        jobs_by_queue.setdefault(ingest_queue_name(size), []).append(
+            Queue.prepare_data(
+                run_ingest, (row["id"],), timeout="10m", job_id=ingest_job_id(row["id"]), meta=dict(meta)
+            )
+        )
+    for name, jobs in jobs_by_queue.items():
+        queue = get_queue(name)
+        for i in range(0, len(jobs), ENQUEUE_BATCH_SIZE):
+            queue.enqueue_many(jobs[i : i + ENQUEUE_BATCH_SIZE])
+    return len(rows), duplicates
+
+
+@router.post("/{kb_id}/upload/bulk", response_model=UploadBatchResponse, openapi_extra=BULK_UPLOAD_BODY)
+@max_body_bytes(MAX_BULK_BYTES + FORM_OVERHEAD_BYTES)
+async def upload_documents_bulk(
+    kb_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_builder),
+):
+    """
+    Upload many documents at once: any mix of files and zip/tar archives, whose members are added as documents.
+    All documents get one batch id (poll GET /{kb_id}/upload/batches/{batch_id}), are inserted together and
+    their ingest jobs are enqueued in pipelined batches. Duplicates and refused files are listed, not fatal.
+    Form fields: files (repeated), config and preset_id, as for a single upload.
+    """
+    kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == kb_id).first()
+    if not kb:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Knowledge base not found")
+    upload_dir = os.path.join(get_settings().upload_dir, kb_id)
+    batch_id = str(uuid.uuid4())
+
+    # Parsed here rather than by File() parameters, which FastAPI reads with Starlette's limit of 1000 files
+    async with request.form(max_files=MAX_BULK_FILES) as form:
+        files = [f for f in form.getlist("files") if not isinstance(f, str)]
+        if not files:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No files uploaded")
+        config, preset_id = form.get("config"), form.get("preset_id")
+        doc_config = _upload_config(
+            config if isinstance(config, str) else None,
+            preset_id if isinstance(preset_id, str) else None,
+            str(user.id),
+            db,
+        )
+        try:
+            results = await receive_files(
+                files, upload_dir, ALLOWED_EXTENSIONS, MAX_UPLOAD_BYTES, MAX_BULK_FILES, MAX_BULK_BYTES
+            )
+        except UploadRejected as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+    received = [(_safe_basename(name), r) for name, r in results if isinstance(r, ReceivedUpload)]
+    rejected = [UploadRejection(name=name, detail=str(r)) for name, r in results if not isinstance(r, ReceivedUpload)]
+
+    added, duplicates = await run_in_threadpool(_add_bulk_documents, db, kb_id, batch_id, doc_config, received)
+    return UploadBatchResponse(
+        batch_id=batch_id,
+        knowledge_base_id=kb_id,
+        total=added,
+        pending=added,
+        processing=0,
+        completed=0,
+        failed=0,
+        done=not added,
+        duplicates=duplicates,
+        rejected=rejected,
+    )
+
+
+@router.get("/{kb_id}/upload/batches/{batch_id}", response_model=UploadBatchResponse)
+def get_upload_batch(
+    kb_id: str,
+    batch_id: str,
+    db: Session = Depends(get_db),
+    _: User = Depends(require_builder),
+):
+    """Ingest progress of a bulk upload: its documents counted by status."""
+    counts = dict(
+        db.query(Document.status, func.count(Document.id))
+        .filter(Document.knowledge_base_id == kb_id, Document.upload_batch_id == batch_id)
+        .group_by(Document.status)
+        .all()
+    )
+    if not counts:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload batch not found")
+    by_status = {s.value: counts.get(s, 0) for s in DocumentStatus}
+    return UploadBatchResponse(
+        batch_id=batch_id,
+        knowledge_base_id=kb_id,
+        total=sum(by_status.values()),
+        done=by_status["pending"] + by_status["processing"] == 0,
+        **by_status,
+    )
+
+
 @router.post("/{kb_id}/search")
 def search(
     kb_id: str,
@@ -259,15 +490,15 @@ def search(
     )
     client = get_qdrant()
     try:
-        results = client.search(
-            collection_name=kb.qdrant_collection_name,
-            query_vector=vector,
-            limit=top_k,
-            with_payload=True,
-        )
+        results = search_dense(client, kb.qdrant_collection_name, vector, top_k)
         return {
             "results": [
-                {"text": r.payload.get("text", ""), "source": r.payload.get("source", ""), "score": r.score}
+                {
+                    "text": r.payload.get("text", ""),
+                    "source": r.payload.get("source", ""),
+                    "score": r.score,
+                    **({"page": r.payload["page"]} if r.payload.get("page") is not None else {}),
+                }
                 for r in results
             ]
         }
@@ -307,6 +538,11 @@ def delete_document(
     doc = db.query(Document).filter(Document.id == document_id, Document.knowledge_base_id == kb_id).first()
     if not doc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == kb_id).first()
+    if kb:
+        delete_points_by_document(get_qdrant(), kb.qdrant_collection_name, doc.id)
+        bump_content_version(db, kb.id)
+    # Keyword index rows go with the document (ON DELETE CASCADE)
     db.delete(doc)
     db.commit()
     return None
@@ -328,6 +564,32 @@ def trigger_ingest(
     doc.error_message = None
     db.commit()
     db.refresh(doc)
-    queue = get_queue()
-    queue.enqueue(run_ingest, document_id, job_timeout="10m")
+    queue = get_queue(ingest_queue_name(_file_size(doc)))
+    enqueue_once(
+        queue, run_ingest, document_id, job_id=ingest_job_id(document_id), job_timeout="10m", meta=trace_meta()
+    )
     return _doc_to_response(doc)
+
+
+@router.post("/{kb_id}/migrate-hybrid")
+def migrate_hybrid(
+    kb_id: str,
+    db: Session = Depends(get_db),
+    _: User = Depends(require_builder),
+):
+    """Queue migration of a dense-only collection (created before hybrid search) to dense + sparse vectors."""
+    kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == kb_id).first()
+    if not kb:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Knowledge base not found")
+    # Ingests queued or running now would write to the old collection; the job re-checks before switching
+    ingesting = db.query(Document).filter(
+        Document.knowledge_base_id == kb_id,
+        Document.status.in_((DocumentStatus.PENDING, DocumentStatus.PROCESSING)),
+    ).first()
+    if ingesting:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Wait for documents to finish processing")
+    if is_hybrid_collection(get_qdrant(), kb.qdrant_collection_name):
+        return {"status": "already_hybrid"}
+    queue = get_queue(MAINTENANCE_QUEUE)
+    enqueue_once(queue, run_migrate_collection, kb_id, job_id=f"migrate-{kb_id}", job_timeout="1h", meta=trace_meta())
+    return {"status": "queued"}
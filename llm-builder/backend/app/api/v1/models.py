@@ -9,7 +9,7 @@ from app.models.user import User
 from app.models.model_registry import ModelRegistry
 from app.schemas.model_registry import ModelRegistryCreate, ModelRegistryUpdate, ModelRegistryResponse
 from app.core.deps import get_current_user, require_builder
-from app.services.llm_client import complete, health_check
+from app.services.llm_client import acomplete, ahealth_check
 
 router = APIRouter()
 
@@ -118,7 +118,7 @@ def delete_model(
 
 
 @router.post("/{model_id}/test")
-def test_model(
+async def test_model(
   model_id: str,
   body: dict,
   db: Session = Depends(get_db),
@@ -132,14 +132,14 @@ def test_model(
     if not prompt:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="prompt required")
     try:
-        response_text = complete(model, prompt)
+        response_text = await acomplete(model, prompt)
         return {"response": response_text}
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
 
 
 @router.get("/{model_id}/health")
-def model_health(
+async def model_health(
   model_id: str,
   db: Session = Depends(get_db),
   _: User = Depends(require_builder),
@@ -147,5 +147,5 @@ def model_health(
     model = db.query(ModelRegistry).filter(ModelRegistry.id == model_id).first()
     if not model:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Model not found")
-    ok = health_check(model)
+    ok = await ahealth_check(model)
     return {"status": "ok" if ok else "unreachable"}
@@ -6,14 +6,19 @@ from sqlalchemy.orm import Session
 from app.db.base import get_db
 from app.models.user import User
 from app.models.training import TrainingDataset, TrainingJob, TrainingJobStatus
+from app.core.body_limit import FORM_OVERHEAD_BYTES, BodyLimitRoute, max_body_bytes
 from app.core.deps import get_current_user, require_builder
 from app.core.config import get_settings
-from app.core.queue import get_queue
+from app.core.queue import TRAINING_QUEUE, enqueue_once, get_queue
+from app.core.tracing import trace_meta
+from app.services.uploads import UploadRejected, receive_upload
 from app.workers.training import run_training
 
-router = APIRouter()
+router = APIRouter(route_class=BodyLimitRoute)
 
 TRAINING_DATASETS_DIR = "training_datasets"
+# Datasets are copied to disk in blocks, never held in memory; max 1 GB
+MAX_DATASET_BYTES = 1024 * 1024 * 1024
 
 
 @router.get("/datasets")
@@ -26,6 +31,7 @@ def list_datasets(db: Session = Depends(get_db), _: User = Depends(require_build
 
 
 @router.post("/datasets")
+@max_body_bytes(MAX_DATASET_BYTES + FORM_OVERHEAD_BYTES)
 async def upload_dataset(
     file: UploadFile = File(...),
     name: str = Form(""),
@@ -34,15 +40,16 @@ async def upload_dataset(
 ):
     settings = get_settings()
     base_dir = os.path.join(settings.upload_dir, TRAINING_DATASETS_DIR)
-    os.makedirs(base_dir, exist_ok=True)
     dataset_id = str(uuid.uuid4())
     ext = ".jsonl" if (file.filename or "").endswith(".jsonl") else ".json"
     path = os.path.join(dataset_id + ext)
     full_path = os.path.join(base_dir, path)
-    content = await file.read()
-    with open(full_path, "wb") as f:
-        f.write(content)
-    row_count = str(max(0, content.count(b"\n")))
+    try:
+        upload = await receive_upload(file, base_dir, ext, MAX_DATASET_BYTES)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    upload.commit(full_path)
+    row_count = str(upload.newlines)
     ds = TrainingDataset(
         id=dataset_id,
         name=name or (file.filename or "dataset"),
@@ -101,8 +108,8 @@ def create_job(
     db.add(job)
     db.commit()
     db.refresh(job)
-    queue = get_queue()
-    queue.enqueue(run_training, job.id, job_timeout="1h")
+    queue = get_queue(TRAINING_QUEUE)
+    enqueue_once(queue, run_training, job.id, job_id=f"training-{job.id}", job_timeout="1h", meta=trace_meta())
     return {
         "id": job.id,
         "dataset_id": job.dataset_id,
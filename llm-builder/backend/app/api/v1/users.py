@@ -3,6 +3,7 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.core import auth_cache
 from app.db.base import get_db
 from app.models.user import User
 from app.schemas.user import UserResponse, UserUpdate
@@ -68,5 +69,6 @@ def update_user(
         from app.core.security import get_password_hash
         user.hashed_password = get_password_hash(body.password)
     db.commit()
+    auth_cache.invalidate(user_id=user.id)
     db.refresh(user)
     return _user_to_response(user)
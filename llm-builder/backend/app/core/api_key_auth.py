@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 import hashlib
 import secrets
 
+from app.core import auth_cache
 from app.db.base import get_db
 from app.models.user import User
 from app.models.audit import ApiKey
@@ -28,10 +29,15 @@ def get_user_from_api_key(db: Session, raw_key: str) -> User | None:
     if not raw_key or not raw_key.startswith("llmb_"):
         return None
     key_hash = hash_key(raw_key)
-    ak = db.query(ApiKey).filter(ApiKey.key_hash == key_hash).first()
-    if not ak:
-        return None
-    user = db.query(User).filter(User.id == ak.user_id).first()
+    user_id = auth_cache.get_api_key_user_id(key_hash)
+    if user_id is None:
+        read_generation = auth_cache.generation()
+        ak = db.query(ApiKey).filter(ApiKey.key_hash == key_hash).first()
+        if not ak:
+            return None
+        user_id = ak.user_id
+        auth_cache.put_api_key(key_hash, user_id, read_generation)
+    user = auth_cache.load_user(db, user_id)
     if user and user.is_active:
         return user
     return None
@@ -1,8 +1,12 @@
 import uuid
 from fastapi import Request
 from app.db.base import SessionLocal
+from app.core.tracing import REQUEST_ID_HEADER, request_span
 from app.models.audit import AuditLog
 
+# Probes and scrapes: no spans
+UNTRACED_PATHS = {"/health", "/ready", "/metrics"}
+
 
 def log_audit(
     user_id: str | None = None,
@@ -38,5 +42,15 @@ def log_audit(
 async def audit_middleware(request: Request, call_next):
     request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
     request.state.request_id = request_id
-    response = await call_next(request)
+    if request.url.path in UNTRACED_PATHS:
+        return await call_next(request)
+    with request_span(request.method, request.url.path, request.headers, request_id) as span:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            # Route template, not the raw path, so span names do not contain ids
+            span.update_name(f"{request.method} {route.path}")
+            span.set_attribute("http.route", route.path)
+        span.set_attribute("http.response.status_code", response.status_code)
+    response.headers[REQUEST_ID_HEADER] = request_id
     return response
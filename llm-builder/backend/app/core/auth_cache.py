@@ -0,0 +1,201 @@
+"""
+In-process cache of authenticated principals, so a request does not query the users / api_keys tables to
+resolve its bearer token or API key. Users are cached as column snapshots (each request gets its own transient
+User), API keys as key hash -> user id; entries live auth_cache_ttl_seconds. Changing a user or revoking a key
+publishes an invalidation on a Redis channel that every API process listens to (start_invalidation_listener),
+so replicas drop the entry at once; while Redis is unreachable, the TTL bounds how long a stale entry is used.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import get_settings
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "auth:invalidate"
+_COLUMNS = [c.key for c in User.__table__.columns]
+
+_users: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+_api_keys: OrderedDict[str, tuple[float, str]] = OrderedDict()
+_lock = threading.Lock()
+_stats = {"user": {"hits": 0, "misses": 0}, "api_key": {"hits": 0, "misses": 0}, "invalidations": 0}
+# Bumped by every invalidation: a lookup that started before one must not cache what it read (it may be stale)
+_generation = 0
+_listener: threading.Thread | None = None
+_listener_stop = threading.Event()
+
+
+def generation() -> int:
+    """Take before reading from the DB, pass to put_user / put_api_key."""
+    return _generation
+
+
+def _get(cache: OrderedDict, kind: str, key: str):
+    now = time.monotonic()
+    with _lock:
+        entry = cache.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                cache.move_to_end(key)
+                _stats[kind]["hits"] += 1
+                return entry[1]
+            del cache[key]
+        _stats[kind]["misses"] += 1
+    return None
+
+
+def _put(cache: OrderedDict, key: str, value, read_generation: int) -> None:
+    settings = get_settings()
+    if settings.auth_cache_ttl_seconds <= 0:
+        return
+    with _lock:
+        if read_generation != _generation:
+            return
+        cache[key] = (time.monotonic() + settings.auth_cache_ttl_seconds, value)
+        cache.move_to_end(key)
+        while len(cache) > settings.auth_cache_max_entries:
+            cache.popitem(last=False)
+
+
+def get_user(user_id: str) -> User | None:
+    """Cached user as a new transient (session-less) User, or None on a miss."""
+    if get_settings().auth_cache_ttl_seconds <= 0:
+        return None
+    snapshot = _get(_users, "user", user_id)
+    return User(**snapshot) if snapshot is not None else None
+
+
+def put_user(user: User, read_generation: int) -> None:
+    _put(_users, user.id, {name: getattr(user, name) for name in _COLUMNS}, read_generation)
+
+
+def load_user(db, user_id: str) -> User | None:
+    """User by id, from the cache or else from db (and then cached). Cached users are for reading only."""
+    user = get_user(user_id)
+    if user is None:
+        read_generation = generation()
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is not None:
+            put_user(user, read_generation)
+    return user
+
+
+def get_api_key_user_id(key_hash: str) -> str | None:
+    if get_settings().auth_cache_ttl_seconds <= 0:
+        return None
+    return _get(_api_keys, "api_key", key_hash)
+
+
+def put_api_key(key_hash: str, user_id: str, read_generation: int) -> None:
+    _put(_api_keys, key_hash, user_id, read_generation)
+
+
+def _invalidate_local(message: str) -> None:
+    global _generation
+    kind, _, key = message.partition(":")
+    with _lock:
+        _generation += 1
+        _stats["invalidations"] += 1
+        if kind == "user":
+            _users.pop(key, None)
+            # Keys map to user ids, so the user's keys re-resolve through the user entry; nothing else to drop
+        elif kind == "key":
+            _api_keys.pop(key, None)
+        else:
+            _users.clear()
+            _api_keys.clear()
+
+
+def invalidate(user_id: str | None = None, key_hash: str | None = None) -> None:
+    """Drop a user (changed role, deactivated, new password) or a revoked key here and in every API process."""
+    from app.core.queue import get_redis
+
+    messages = []
+    if user_id:
+        messages.append(f"user:{user_id}")
+    if key_hash:
+        messages.append(f"key:{key_hash}")
+    for message in messages:
+        _invalidate_local(message)
+        try:
+            get_redis().publish(INVALIDATION_CHANNEL, message)
+        except Exception:
+            logger.warning("Could not publish auth cache invalidation %s; other replicas expire it by TTL", message)
+
+
+def clear() -> None:
+    """Drop every entry and reset counters."""
+    global _generation
+    with _lock:
+        _generation += 1
+        _users.clear()
+        _api_keys.clear()
+        _stats.update(user={"hits": 0, "misses": 0}, api_key={"hits": 0, "misses": 0}, invalidations=0)
+
+
+def auth_cache_stats() -> dict:
+    """Hit/miss counters per cache (user, api_key), entry counts and invalidations received."""
+    with _lock:
+        return {
+            "user": {**_stats["user"], "size": len(_users)},
+            "api_key": {**_stats["api_key"], "size": len(_api_keys)},
+            "invalidations": _stats["invalidations"],
+        }
+
+
+def _drop_all() -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _users.clear()
+        _api_keys.clear()
+
+
+def _listen() -> None:
+    from redis import Redis
+
+    backoff = 1.0
+    while not _listener_stop.is_set():
+        pubsub = None
+        try:
+            redis = Redis.from_url(get_settings().redis_url, health_check_interval=30)
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Invalidations published while we were not subscribed are lost: start from an empty cache
+            _drop_all()
+            backoff = 1.0
+            while not _listener_stop.is_set():
+                message = pubsub.get_message(timeout=1.0)
+                if message and message["type"] == "message":
+                    _invalidate_local(message["data"].decode())
+        except Exception as e:
+            logger.warning("Auth cache invalidation listener disconnected (%s); retrying in %.0fs", e, backoff)
+            _listener_stop.wait(backoff)
+            backoff = min(backoff * 2, 30.0)
+        finally:
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+
+def start_invalidation_listener() -> None:
+    """Subscribe this process to invalidations from the others (API startup). No-op when the cache is off."""
+    global _listener
+    if get_settings().auth_cache_ttl_seconds <= 0 or (_listener is not None and _listener.is_alive()):
+        return
+    _listener_stop.clear()
+    _listener = threading.Thread(target=_listen, name="auth-cache-invalidation", daemon=True)
+    _listener.start()
+
+
+def stop_invalidation_listener() -> None:
+    global _listener
+    _listener_stop.set()
+    if _listener is not None:
+        _listener.join(timeout=5)
+        _listener = None
@@ -0,0 +1,58 @@
+"""
+Request body limits for upload endpoints. Starlette spools a multipart body to temp files before the endpoint
+runs, so limits checked while storing an upload (services/uploads.py) only apply once all of it is on disk.
+These refuse the body while it is received instead: routers with upload endpoints use route_class=BodyLimitRoute
+and an endpoint opts in with @max_body_bytes(limit).
+"""
+from fastapi import HTTPException, Request, status
+from fastapi.routing import APIRoute
+
+# Multipart framing (headers of every part) and form fields, on top of the file bytes an endpoint accepts
+FORM_OVERHEAD_BYTES = 16 * 1024 * 1024
+
+
+def max_body_bytes(limit: int):
+    """Endpoint decorator: answer 413 to a body over limit bytes, by its Content-Length or once that many arrive."""
+
+    def decorate(endpoint):
+        endpoint.max_body_bytes = limit
+        return endpoint
+
+    return decorate
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"Request body too large. Max size: {limit // (1024 * 1024)} MB",
+    )
+
+
+class BodyLimitRoute(APIRoute):
+    """APIRoute enforcing the endpoint's max_body_bytes, if it has one, before and while the body is read."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        limit = getattr(self.endpoint, "max_body_bytes", None)
+        if limit is None:
+            return handler
+
+        async def limited_handler(request: Request):
+            length = request.headers.get("content-length", "")
+            if length.isdigit() and int(length) > limit:
+                raise _too_large(limit)
+            received = 0
+            receive = request.receive
+
+            async def limited_receive():
+                nonlocal received
+                message = await receive()
+                if message["type"] == "http.request":
+                    received += len(message.get("body", b""))
+                    if received > limit:
+                        raise _too_large(limit)
+                return message
+
+            return await handler(Request(request.scope, limited_receive))
+
+        return limited_handler
@@ -23,6 +23,64 @@ class Settings(BaseSettings):
     qdrant_url: str = "http://localhost:6333"
     qdrant_api_key: str | None = None
 
+    # LLM HTTP client pool (one keep-alive pool per endpoint; HTTP/2 used when h2 is installed)
+    llm_http_max_connections: int = 100
+    llm_http_max_keepalive_connections: int = 20
+    llm_http_keepalive_expiry: float = 30.0
+    llm_http2: bool = True
+
+    # Query embedding cache (repeat questions / searches skip the embedding model). Size 0 disables it;
+    # with query_embedding_cache_redis, entries are also shared across API replicas via Redis.
+    query_embedding_cache_size: int = 2048
+    query_embedding_cache_ttl: int = 3600
+    query_embedding_cache_redis: bool = False
+
+    # Query encoding micro-batching: concurrent encode_query calls wait up to max_wait_ms and are encoded
+    # together (up to max_size per model call). max_size 1 disables batching.
+    embedding_batch_max_size: int = 32
+    embedding_batch_max_wait_ms: float = 5.0
+
+    # Authenticated users / API keys cached per API process (no DB lookup per request); TTL 0 disables. User
+    # changes and key revocations are pushed to every process via Redis pub/sub, the TTL bounds staleness otherwise
+    auth_cache_ttl_seconds: float = 30.0
+    auth_cache_max_entries: int = 10_000
+
+    # Retrieval result cache in Redis (shared across API replicas). TTL 0 disables it.
+    retrieval_cache_ttl: int = 900
+    retrieval_cache_max_entries_per_kb: int = 1000
+    retrieval_cache_max_entry_bytes: int = 262_144
+
+    # Ingest: chunks per encode_passages call / Qdrant upsert batch
+    ingest_embed_batch_size: int = 64
+
+    # Persistent chunk-embedding cache in Redis, shared by workers and KBs (LRU eviction above this size; 0 disables)
+    passage_cache_max_bytes: int = 536_870_912
+
+    # Text extraction runs in child processes: whole-document timeout (keep below the 10m ingest job timeout),
+    # per-process memory cap, parallel processes for large PDFs (0 = CPU count) and pages per PDF shard
+    extraction_timeout_seconds: float = 300.0
+    extraction_max_memory_mb: int = 2048
+    extraction_workers: int = 0
+    extraction_pdf_shard_pages: int = 50
+
+    # Ingest jobs for files above this size go to the ingest-large queue, others to ingest-small
+    ingest_large_file_mb: int = 10
+
+    # RQ worker: embedding models (comma-separated) loaded in the worker's main process before it forks a
+    # work-horse per job, which then shares them copy-on-write instead of loading them per job; empty disables.
+    # worker_fork false runs jobs in the worker process itself (no fork per job, less isolation)
+    worker_preload_embedding_models: str = "all-MiniLM-L6-v2"
+    worker_fork: bool = True
+    # Worker processes started by the runner: space-separated pools "queue[,queue...]=count"; each worker takes
+    # jobs from its first non-empty queue, so list a pool's own queue first and queues it may help with after
+    worker_pools: str = "ingest-small=2 ingest-large,ingest-small=1 maintenance=1 training=1"
+
+    # Tracing (OpenTelemetry): "otlp" exports to OTEL_EXPORTER_OTLP_ENDPOINT (OTLP/HTTP, default
+    # http://localhost:4318), "file" appends spans as JSON lines to tracing_file; empty disables tracing
+    tracing_exporter: str = ""
+    tracing_file: str = "traces.jsonl"
+    tracing_sample_ratio: float = 1.0
+
     # Uploads: app and worker must share this path (e.g. same Docker volume). Set UPLOAD_DIR in env.
     upload_dir: str = "/tmp/uploads"
 
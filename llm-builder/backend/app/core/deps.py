@@ -4,6 +4,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer, OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
+from app.core import auth_cache
 from app.db.base import get_db
 from app.models.user import User, Role
 from app.core.security import decode_token
@@ -28,7 +29,7 @@ def get_current_user(
         if payload and payload.get("type") == "access":
             user_id = payload.get("sub")
             if user_id:
-                user = get_user_by_id(db, user_id)
+                user = auth_cache.load_user(db, user_id)
                 if user and user.is_active:
                     return user
                 if user and not user.is_active:
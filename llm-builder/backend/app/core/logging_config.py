@@ -4,6 +4,8 @@ import sys
 import json
 from datetime import datetime
 
+from app.core.tracing import log_context
+
 
 class JSONFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
@@ -15,6 +17,8 @@ class JSONFormatter(logging.Formatter):
         }
         if record.exc_info:
             log_obj["exception"] = self.formatException(record.exc_info)
+        # trace_id, span_id and request_id of the request or job being handled
+        log_obj.update(log_context())
         if hasattr(record, "request_id"):
             log_obj["request_id"] = getattr(record, "request_id", None)
         return json.dumps(log_obj)
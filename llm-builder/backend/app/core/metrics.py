@@ -0,0 +1,218 @@
+"""
+Prometheus metrics, served at /metrics. Request-path metrics (RAG stage latencies, retrieval and answer cache
+lookups) live in the API process, labelled by deployment and knowledge base. Ingest runs in RQ work-horse
+processes that exit after each job, so its stage durations are accumulated in Redis (like the passage cache
+counters) and read at scrape time, together with queue depth, embedding cache counters and DB pool usage.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from prometheus_client.utils import floatToGoString
+
+from app.core.tracing import start_span
+
+RAG_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+INGEST_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+# Redis hashes, fields "<kb id>|<stage>|<le or sum>" and "<kb id>|<counter>"
+INGEST_SECONDS_KEY = "metrics:ingest_stage_seconds"
+INGEST_TOTALS_KEY = "metrics:ingest_totals"
+
+RAG_STAGE_SECONDS = Histogram(
+    "llm_builder_rag_stage_seconds",
+    "Duration of RAG pipeline stages: query_embedding, vector_search, keyword_retrieval, merge, prompt_build, "
+    "llm_time_to_first_token, llm_total, total",
+    ["stage", "deployment", "knowledge_base"],
+    buckets=RAG_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "llm_builder_cache_requests",
+    "Per-request cache lookups (retrieval, semantic_answer) by result",
+    ["cache", "result", "deployment", "knowledge_base"],
+)
+
+# (deployment id, knowledge base id) of the RAG request being served; asyncio.gather copies it into subtasks
+_rag_labels: ContextVar[tuple[str, str]] = ContextVar("rag_labels", default=("", ""))
+
+
+def set_rag_labels(deployment_id: str | None, knowledge_base_id: str | None) -> None:
+    _rag_labels.set((deployment_id or "", knowledge_base_id or ""))
+
+
+def rag_labels() -> tuple[str, str]:
+    """Labels of the current request, for code that records after the request context is gone (streaming)."""
+    return _rag_labels.get()
+
+
+def observe_rag_stage(stage: str, seconds: float, labels: tuple[str, str] | None = None) -> None:
+    RAG_STAGE_SECONDS.labels(stage, *(labels or _rag_labels.get())).observe(seconds)
+
+
+@contextmanager
+def rag_stage(stage: str):
+    """Time the block as a RAG stage of the current request (failures included), in a span rag.<stage>."""
+    started = time.perf_counter()
+    try:
+        with start_span(f"rag.{stage}"):
+            yield
+    finally:
+        observe_rag_stage(stage, time.perf_counter() - started)
+
+
+def count_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss", *_rag_labels.get()).inc()
+
+
+def record_ingest(knowledge_base_id: str, status: str, seconds: dict[str, float], chunks: int = 0) -> None:
+    """Add one ingest run (stage durations, outcome, chunks) to the shared counters in Redis. Best effort."""
+    from app.core.queue import get_redis
+
+    try:
+        with get_redis().pipeline(transaction=False) as pipe:
+            for stage, value in seconds.items():
+                prefix = f"{knowledge_base_id}|{stage}|"
+                for bound in INGEST_BUCKETS:
+                    if value <= bound:
+                        pipe.hincrby(INGEST_SECONDS_KEY, prefix + floatToGoString(bound), 1)
+                pipe.hincrby(INGEST_SECONDS_KEY, prefix + "+Inf", 1)
+                pipe.hincrbyfloat(INGEST_SECONDS_KEY, prefix + "sum", value)
+            pipe.hincrby(INGEST_TOTALS_KEY, f"{knowledge_base_id}|documents_{status}", 1)
+            if chunks:
+                pipe.hincrby(INGEST_TOTALS_KEY, f"{knowledge_base_id}|chunks", chunks)
+            pipe.execute()
+    except Exception:
+        pass
+
+
+def _ingest_metrics(redis) -> list:
+    series: dict[tuple[str, str], dict[str, float]] = {}
+    for field, value in redis.hgetall(INGEST_SECONDS_KEY).items():
+        kb_id, stage, le = field.decode().split("|")
+        series.setdefault((kb_id, stage), {})[le] = float(value)
+    histogram = HistogramMetricFamily(
+        "llm_builder_ingest_stage_seconds",
+        "Duration of ingest stages per document: extract, chunk, embed, upsert, index, total",
+        labels=["stage", "knowledge_base"],
+    )
+    for (kb_id, stage), fields in sorted(series.items()):
+        buckets = [(floatToGoString(b), fields.get(floatToGoString(b), 0.0)) for b in INGEST_BUCKETS]
+        buckets.append(("+Inf", fields.get("+Inf", 0.0)))
+        histogram.add_metric([stage, kb_id], buckets, sum_value=fields.get("sum", 0.0))
+    documents = CounterMetricFamily(
+        "llm_builder_ingest_documents", "Ingested documents by outcome", labels=["status", "knowledge_base"]
+    )
+    chunks = CounterMetricFamily("llm_builder_ingest_chunks", "Chunks indexed by ingest", labels=["knowledge_base"])
+    for field, value in sorted(redis.hgetall(INGEST_TOTALS_KEY).items()):
+        kb_id, name = field.decode().split("|")
+        if name == "chunks":
+            chunks.add_metric([kb_id], int(value))
+        else:
+            documents.add_metric([name.removeprefix("documents_"), kb_id], int(value))
+    return [histogram, documents, chunks]
+
+
+def _queue_metrics(redis) -> list:
+    from rq import Queue, Worker
+
+    jobs = GaugeMetricFamily("llm_builder_queue_jobs", "RQ jobs by queue and state", labels=["queue", "state"])
+    for queue in Queue.all(connection=redis):
+        jobs.add_metric([queue.name, "queued"], queue.count)
+        jobs.add_metric([queue.name, "started"], queue.started_job_registry.count)
+        jobs.add_metric([queue.name, "deferred"], queue.deferred_job_registry.count)
+        jobs.add_metric([queue.name, "scheduled"], queue.scheduled_job_registry.count)
+        jobs.add_metric([queue.name, "failed"], queue.failed_job_registry.count)
+    workers = GaugeMetricFamily("llm_builder_queue_workers", "Running RQ workers")
+    workers.add_metric([], Worker.count(connection=redis))
+    return [jobs, workers]
+
+
+def _embedding_cache_metrics() -> list:
+    from app.services.embedding_registry import query_cache_stats
+    from app.services.passage_cache import passage_cache_stats
+
+    requests = CounterMetricFamily(
+        "llm_builder_embedding_cache_requests",
+        "Embedding cache lookups by result: query (this process) and passage (all ingest workers)",
+        labels=["cache", "result"],
+    )
+    entries = GaugeMetricFamily("llm_builder_embedding_cache_entries", "Embedding cache entries", labels=["cache"])
+    stats = {"query": query_cache_stats()}
+    try:
+        stats["passage"] = passage_cache_stats()
+    except Exception:
+        pass
+    for cache, s in stats.items():
+        requests.add_metric([cache, "hit"], s["hits"])
+        requests.add_metric([cache, "miss"], s["misses"])
+        entries.add_metric([cache], s["size"] if cache == "query" else s["entries"])
+    return [requests, entries]
+
+
+def _auth_cache_metrics() -> list:
+    from app.core.auth_cache import auth_cache_stats
+
+    stats = auth_cache_stats()
+    requests = CounterMetricFamily(
+        "llm_builder_auth_cache_requests",
+        "Authenticated principal cache lookups in this process (user, api_key) by result",
+        labels=["cache", "result"],
+    )
+    entries = GaugeMetricFamily("llm_builder_auth_cache_entries", "Auth cache entries", labels=["cache"])
+    for cache in ("user", "api_key"):
+        requests.add_metric([cache, "hit"], stats[cache]["hits"])
+        requests.add_metric([cache, "miss"], stats[cache]["misses"])
+        entries.add_metric([cache], stats[cache]["size"])
+    invalidations = CounterMetricFamily(
+        "llm_builder_auth_cache_invalidations", "Auth cache invalidations applied in this process"
+    )
+    invalidations.add_metric([], stats["invalidations"])
+    return [requests, entries, invalidations]
+
+
+def _db_pool_metrics() -> list:
+    from app.db.base import async_engine, engine
+
+    connections = GaugeMetricFamily(
+        "llm_builder_db_pool_connections", "DB pool connections by state", labels=["pool", "state"]
+    )
+    size = GaugeMetricFamily("llm_builder_db_pool_size", "Configured DB pool size", labels=["pool"])
+    for name, pool in (("sync", engine.pool), ("async", async_engine.pool)):
+        if not hasattr(pool, "checkedout"):
+            continue
+        connections.add_metric([name, "checked_out"], pool.checkedout())
+        connections.add_metric([name, "idle"], pool.checkedin())
+        # Negative until pool_size connections have been opened
+        connections.add_metric([name, "overflow"], max(0, pool.overflow()))
+        size.add_metric([name], pool.size())
+    return [connections, size]
+
+
+class _ScrapeCollector:
+    """Metrics computed when scraped. A Redis outage drops only the Redis-backed families."""
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        from app.core.queue import get_redis
+
+        yield from _db_pool_metrics()
+        yield from _embedding_cache_metrics()
+        yield from _auth_cache_metrics()
+        redis = get_redis()
+        for read in (_queue_metrics, _ingest_metrics):
+            try:
+                families = read(redis)
+            except Exception:
+                continue
+            yield from families
+
+
+REGISTRY.register(_ScrapeCollector())
+
+
+def render_metrics() -> bytes:
+    """All metrics in the Prometheus text exposition format."""
+    return generate_latest(REGISTRY)
@@ -1,10 +1,81 @@
+import asyncio
+
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import WatchError
 from rq import Queue
+from rq.job import Job
+from rq.registry import FailedJobRegistry, FinishedJobRegistry
 from app.core.config import get_settings
 
+# Job queues. Small ingests are what users wait on; large ones, collection migrations and training are
+# kept off that queue so they cannot hold it up (worker pools: worker_pools setting, workers/runner.py)
+INGEST_SMALL_QUEUE = "ingest-small"
+INGEST_LARGE_QUEUE = "ingest-large"
+MAINTENANCE_QUEUE = "maintenance"
+TRAINING_QUEUE = "training"
+# Single queue used before the split; workers still drain it
+DEFAULT_QUEUE = "default"
+QUEUES = [INGEST_SMALL_QUEUE, INGEST_LARGE_QUEUE, MAINTENANCE_QUEUE, TRAINING_QUEUE]
+
+# A job with one of these statuses already covers the work; anything else may be replaced
+_ACTIVE_JOB_STATUSES = {"queued", "started", "deferred", "scheduled"}
+
+# id(event loop) -> async client (its connection pool belongs to that loop)
+_async_redis: dict[int, AsyncRedis] = {}
+
 def get_redis():
     settings = get_settings()
     return Redis.from_url(settings.redis_url)
 
-def get_queue() -> Queue:
-    return Queue("default", connection=get_redis())
+def get_async_redis() -> AsyncRedis:
+    """Shared async Redis client for the running loop (caches on request paths)."""
+    loop_id = id(asyncio.get_running_loop())
+    client = _async_redis.get(loop_id)
+    if client is None:
+        client = AsyncRedis.from_url(get_settings().redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        _async_redis[loop_id] = client
+    return client
+
+async def close_async_redis() -> None:
+    client = _async_redis.pop(id(asyncio.get_running_loop()), None)
+    if client is not None:
+        await client.aclose()
+
+def get_queue(name: str = DEFAULT_QUEUE) -> Queue:
+    return Queue(name, connection=get_redis())
+
+def ingest_queue_name(file_size: int | None) -> str:
+    """Queue for ingesting a file of file_size bytes (unknown size: small)."""
+    large = get_settings().ingest_large_file_mb * 1024 * 1024
+    return INGEST_LARGE_QUEUE if file_size is not None and file_size > large else INGEST_SMALL_QUEUE
+
+def ingest_job_id(document_id: str) -> str:
+    """One ingest job id per document, so the same document is never queued twice (see enqueue_once)."""
+    return f"ingest-{document_id}"
+
+def enqueue_once(queue: Queue, func, *args, job_id: str, **kwargs) -> Job:
+    """
+    queue.enqueue(func, *args, job_id=job_id, **kwargs) unless a job with job_id is already queued or running,
+    in which case that job is returned and nothing is enqueued. A finished or failed job with the id is
+    replaced. Check and enqueue are one Redis transaction (WATCH on the job), so concurrent calls enqueue once.
+    """
+    connection = queue.connection
+    key = Job.key_for(job_id)
+    while True:
+        with connection.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                status, origin = pipe.hmget(key, "status", "origin")
+                if status is not None and status.decode() in _ACTIVE_JOB_STATUSES:
+                    return Job.fetch(job_id, connection=connection)
+                pipe.multi()
+                if origin is not None:
+                    # Drop the previous run from its registries; the new job reuses the id
+                    for registry in (FailedJobRegistry, FinishedJobRegistry):
+                        registry(origin.decode(), connection=connection).remove(job_id, pipeline=pipe)
+                job = queue.enqueue(func, *args, job_id=job_id, pipeline=pipe, **kwargs)
+                pipe.execute()
+                return job
+            except WatchError:
+                continue
@@ -0,0 +1,10 @@
+"""Server-sent events helpers for streaming endpoints."""
+import json
+
+# Disable proxy buffering (nginx) and caching so tokens reach the client as they are produced
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data) -> str:
+    """Format one SSE frame with a JSON data line."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,177 @@
+"""
+OpenTelemetry tracing. setup_tracing() installs an SDK tracer provider that exports to an OTLP/HTTP collector
+(OTEL_EXPORTER_OTLP_ENDPOINT, default http://localhost:4318) or appends spans as JSON lines to a file; with
+tracing_exporter unset, spans are no-ops. Trace context and the request id travel with RQ jobs in job.meta
+(trace_meta() when enqueuing, job_span() in the worker) and with LLM calls as traceparent / X-Request-ID headers.
+"""
+import functools
+import inspect
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from opentelemetry import context as otel_context
+from opentelemetry import propagate, trace
+
+from app.core.config import get_settings
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+tracer = trace.get_tracer("llm_builder")
+
+# Request id of the API request (or of the request that enqueued the running job), for logs and outgoing calls
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+_provider = None
+
+
+def setup_tracing(service_name: str) -> None:
+    """Install the exporter chosen by tracing_exporter ("otlp" or "file"); no-op when it is empty."""
+    global _provider
+    settings = get_settings()
+    if not settings.tracing_exporter or _provider is not None:
+        return
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    if settings.tracing_exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        exporter = OTLPSpanExporter()
+    elif settings.tracing_exporter == "file":
+        exporter = ConsoleSpanExporter(
+            out=open(settings.tracing_file, "a", buffering=1),
+            formatter=lambda span: span.to_json(indent=None) + os.linesep,
+        )
+    else:
+        raise ValueError(f"Unsupported tracing_exporter: {settings.tracing_exporter}")
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name}),
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio)),
+    )
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+
+
+def flush_tracing() -> None:
+    """Export buffered spans now (RQ work-horses exit with os._exit, skipping the exporter's shutdown)."""
+    if _provider is not None:
+        _provider.force_flush()
+
+
+def log_context() -> dict:
+    """trace_id / span_id of the current span and the request id, for log records."""
+    out = {}
+    span_context = trace.get_current_span().get_span_context()
+    if span_context.is_valid:
+        out["trace_id"] = format(span_context.trace_id, "032x")
+        out["span_id"] = format(span_context.span_id, "016x")
+    request_id = _request_id.get()
+    if request_id:
+        out["request_id"] = request_id
+    return out
+
+
+@contextmanager
+def start_span(name: str, attributes: dict | None = None, kind=trace.SpanKind.INTERNAL):
+    """Span that is current for the block. Not for code that yields (generators): see detached_span."""
+    with tracer.start_as_current_span(name, attributes=attributes, kind=kind) as span:
+        yield span
+
+
+@contextmanager
+def detached_span(name: str, parent=None, attributes: dict | None = None, kind=trace.SpanKind.INTERNAL):
+    """
+    Span that is never made current, for async generators: they resume in their consumer's context, where a
+    current span could not be reset. parent is a context captured earlier (default: the current one).
+    """
+    span = tracer.start_span(name, context=parent, attributes=attributes, kind=kind)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_exception(e)
+        span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
+        raise
+    finally:
+        span.end()
+
+
+def current_context():
+    return otel_context.get_current()
+
+
+def traced(name: str, attributes: dict | None = None):
+    """Decorator: run the (sync or async) function in a span called name."""
+
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.start_as_current_span(name, attributes=attributes):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name, attributes=attributes):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def set_span_attributes(attributes: dict) -> None:
+    trace.get_current_span().set_attributes(attributes)
+
+
+def trace_headers(span=None) -> dict[str, str]:
+    """Outgoing HTTP headers: W3C traceparent of span (default: the current span) and X-Request-ID."""
+    headers: dict[str, str] = {}
+    propagate.inject(headers, context=trace.set_span_in_context(span) if span is not None else None)
+    request_id = _request_id.get()
+    if request_id:
+        headers[REQUEST_ID_HEADER] = request_id
+    return headers
+
+
+@contextmanager
+def request_span(method: str, path: str, headers, request_id: str):
+    """Server span for an API request, continuing an incoming traceparent; the request id is current too."""
+    token = _request_id.set(request_id)
+    try:
+        with tracer.start_as_current_span(
+            f"{method} {path}",
+            context=propagate.extract(headers),
+            kind=trace.SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": path, "request.id": request_id},
+        ) as span:
+            yield span
+    finally:
+        _request_id.reset(token)
+
+
+def trace_meta() -> dict:
+    """job.meta for queue.enqueue(..., meta=trace_meta()): the caller's trace context and request id."""
+    carrier: dict[str, str] = {}
+    propagate.inject(carrier)
+    return {"trace_context": carrier, "request_id": _request_id.get()}
+
+
+@contextmanager
+def job_span(name: str, meta: dict, attributes: dict | None = None):
+    """Consumer span for an RQ job, child of the span that enqueued it (from trace_meta in job.meta)."""
+    token = _request_id.set(meta.get("request_id"))
+    try:
+        with tracer.start_as_current_span(
+            name,
+            context=propagate.extract(meta.get("trace_context") or {}),
+            kind=trace.SpanKind.CONSUMER,
+            attributes=attributes,
+        ) as span:
+            yield span
+    finally:
+        _request_id.reset(token)
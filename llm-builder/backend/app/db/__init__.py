@@ -1,3 +1,3 @@
-from app.db.base import Base, SessionLocal, get_db
+from app.db.base import Base, SessionLocal, AsyncSessionLocal, get_db, get_async_db
 
-__all__ = ["Base", "SessionLocal", "get_db"]
+__all__ = ["Base", "SessionLocal", "AsyncSessionLocal", "get_db", "get_async_db"]
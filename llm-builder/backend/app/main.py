@@ -1,23 +1,35 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
 from app.core.logging_config import setup_logging
+from app.core.tracing import setup_tracing
 from app.api.v1 import api_router
-from app.db.base import engine, Base
+from app.db.base import async_engine, engine, Base
 from app.core.audit import audit_middleware
+from app.core.auth_cache import start_invalidation_listener, stop_invalidation_listener
+from app.core.metrics import CONTENT_TYPE_LATEST, render_metrics
+from app.services.llm_client import close_http_clients
+from app.services.qdrant_client import close_async_qdrant
+from app.core.queue import close_async_redis
 
 settings = get_settings()
 setup_logging(use_json=not settings.debug, level="DEBUG" if settings.debug else "INFO")
+setup_tracing("llm-builder-api")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
+    start_invalidation_listener()
     yield
-    # shutdown if needed
+    stop_invalidation_listener()
+    await close_http_clients()
+    await close_async_qdrant()
+    await close_async_redis()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -64,6 +76,12 @@ def ready():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (RAG stage latencies, ingest stages, queues, caches, DB pools)."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/")
 def root():
     return {"message": "LLM Builder API", "docs": "/docs"}
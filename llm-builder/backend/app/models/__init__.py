@@ -8,9 +8,12 @@ from app.models.chat import ChatSession, ChatMessage
 from app.models.training import TrainingDataset, TrainingJob, TrainingJobStatus
 from app.models.audit import AuditLog, ApiKey
 from app.models.rag_config_preset import RagConfigPreset
+from app.models.keyword_index import KeywordChunk, KeywordPosting
+from app.models.document_chunk import DocumentChunk
 
 __all__ = [
     "User", "Role", "KnowledgeBase", "Document", "DocumentStatus",
     "ModelRegistry", "ModelProvider", "ModelType", "PromptTemplate", "Deployment",
     "ChatSession", "ChatMessage", "TrainingDataset", "TrainingJob", "TrainingJobStatus", "AuditLog", "ApiKey", "RagConfigPreset",
+    "KeywordChunk", "KeywordPosting", "DocumentChunk",
 ]
@@ -25,5 +25,7 @@ class Document(Base):
     error_message = Column(Text, nullable=True)
     metadata_ = Column("metadata", JSONB, nullable=True)
     config = Column(JSONB, nullable=True)  # override chunking + embedding for this document
+    content_hash = Column(String(64), nullable=True)  # sha256 of the uploaded file
+    upload_batch_id = Column(String(36), nullable=True, index=True)  # bulk upload the document came in with
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
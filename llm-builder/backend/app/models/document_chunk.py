@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+
+from app.db.base import Base
+
+
+class DocumentChunk(Base):
+    """One row per Qdrant point of a document: lets re-ingest diff chunks by content hash."""
+
+    __tablename__ = "document_chunks"
+
+    point_id = Column(String(36), primary_key=True)  # deterministic, see services.document_chunks.chunk_point_ids
+    document_id = Column(String(36), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    knowledge_base_id = Column(String(36), ForeignKey("knowledge_bases.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    content_hash = Column(String(64), nullable=False)  # sha256 of the chunk text
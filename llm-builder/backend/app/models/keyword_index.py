@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+
+from app.db.base import Base
+
+
+class KeywordChunk(Base):
+    __tablename__ = "keyword_chunks"
+
+    point_id = Column(String(36), primary_key=True)  # Qdrant point id of the chunk
+    knowledge_base_id = Column(String(36), ForeignKey("knowledge_bases.id", ondelete="CASCADE"), nullable=False, index=True)
+    document_id = Column(String(36), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    length = Column(Integer, nullable=False)  # number of terms, for BM25 length normalization
+
+
+class KeywordPosting(Base):
+    __tablename__ = "keyword_postings"
+
+    # PK (knowledge_base_id, term, point_id) doubles as the term lookup index
+    knowledge_base_id = Column(String(36), ForeignKey("knowledge_bases.id", ondelete="CASCADE"), primary_key=True)
+    term = Column(String(64), primary_key=True)
+    point_id = Column(String(36), ForeignKey("keyword_chunks.point_id", ondelete="CASCADE"), primary_key=True)
+    document_id = Column(String(36), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    tf = Column(Integer, nullable=False)  # term frequency in the chunk
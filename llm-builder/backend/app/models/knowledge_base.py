@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, String, Text
+from sqlalchemy import Column, DateTime, Integer, String, Text
 from sqlalchemy.dialects.postgresql import JSONB
 
 from app.db.base import Base
@@ -13,5 +13,7 @@ class KnowledgeBase(Base):
     description = Column(Text, nullable=True)
     qdrant_collection_name = Column(String(255), unique=True, nullable=False, index=True)
     config = Column(JSONB, nullable=True)  # chunk_strategy, chunk_size, chunk_overlap, embedding_model, embedding_query_prefix
+    # Bumped on every ingest / document delete; part of the retrieval cache key
+    content_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -17,6 +17,27 @@ class DocumentResponse(BaseModel):
     error_message: str | None
     config: dict | None = None  # override for chunking/embedding for this document
     created_at: str
+    content_hash: str | None = None  # sha256 of the uploaded file
+    duplicate: bool = False  # upload matched an existing document of the KB, which is returned instead
 
     class Config:
         from_attributes = True
+
+
+class UploadRejection(BaseModel):
+    name: str  # file or archive member name
+    detail: str
+
+
+class UploadBatchResponse(BaseModel):
+    batch_id: str
+    knowledge_base_id: str
+    total: int  # documents created by the batch
+    pending: int
+    processing: int
+    completed: int
+    failed: int
+    done: bool  # nothing pending or processing
+    # Only in the upload response: files matching an existing document (returned instead), and refused files
+    duplicates: list[DocumentResponse] = []
+    rejected: list[UploadRejection] = []
@@ -10,6 +10,7 @@ def app_defaults() -> dict:
         "chunk_strategy": DEFAULT_STRATEGY,
         "chunk_size": DEFAULT_CHUNK_SIZE,
         "chunk_overlap": DEFAULT_CHUNK_OVERLAP,
+        "chunk_token_limit": False,
         "embedding_model": DEFAULT_EMBEDDING_MODEL,
         "embedding_query_prefix": None,
     }
@@ -37,9 +38,10 @@ def resolve_embedding_for_kb(kb_config: dict | None) -> dict:
 
 # Same shape used in KB config and document config
 class RagConfigSchema(BaseModel):
-    chunk_strategy: str | None = None  # fixed, paragraph, sentence, recursive
+    chunk_strategy: str | None = None  # fixed, paragraph, sentence, recursive, token
     chunk_size: int | None = None
     chunk_overlap: int | None = None
+    chunk_token_limit: bool | None = None  # split chunks longer than the embedding model embeds in full
     embedding_model: str | None = None
     embedding_query_prefix: str | None = None
 
@@ -0,0 +1,179 @@
+"""
+Per-deployment semantic answer cache, opt-in through Deployment.config:
+  "semantic_cache": true, "semantic_cache_threshold": 0.95 (cosine), "semantic_cache_ttl": 86400 (seconds).
+(question embedding, answer, citations) are stored in Qdrant. A new question at least `threshold` similar to
+a cached one gets that answer with no retrieval and no LLM call, as long as the deployment's fingerprint
+(KB content version, query embedding model and prefix, prompt template, model, generation config) is unchanged.
+"""
+import hashlib
+import json
+import time
+import uuid
+
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import (
+    Distance,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    MatchValue,
+    PayloadSchemaType,
+    PointStruct,
+    Range,
+    VectorParams,
+)
+
+from app.models.deployment import Deployment
+from app.models.knowledge_base import KnowledgeBase
+from app.models.prompt_template import PromptTemplate
+from app.services.embedding_registry import DEFAULT_EMBEDDING_MODEL, get_query_prefix
+
+# One collection per vector size: deployments share it, filtered by deployment_id
+COLLECTION_PREFIX = "semantic_cache_"
+DEFAULT_THRESHOLD = 0.95
+DEFAULT_TTL = 86_400
+CONFIG_KEYS = ("semantic_cache", "semantic_cache_threshold", "semantic_cache_ttl")
+
+_existing_collections: set[str] = set()
+
+
+def semantic_cache_settings(dep: Deployment) -> tuple[float, int] | None:
+    """(threshold, ttl) if the deployment enabled the cache, else None."""
+    config = dep.config or {}
+    if not config.get("semantic_cache"):
+        return None
+    threshold = float(config.get("semantic_cache_threshold") or DEFAULT_THRESHOLD)
+    ttl = int(config.get("semantic_cache_ttl") or DEFAULT_TTL)
+    return threshold, ttl
+
+
+def answer_fingerprint(
+    dep: Deployment,
+    kb: KnowledgeBase | None,
+    prompt_template: PromptTemplate | None,
+    embedding: dict,
+) -> str:
+    """
+    Everything besides the question that shapes the answer. Cached answers only match the same fingerprint.
+    embedding is the {embedding_model, embedding_query_prefix} the question is encoded with, resolved as
+    encode_query does: collections are shared by vector size, and another model of that size must not match.
+    """
+    config = {k: v for k, v in (dep.config or {}).items() if k not in CONFIG_KEYS}
+    model = embedding.get("embedding_model") or DEFAULT_EMBEDDING_MODEL
+    parts = [
+        dep.model_id,
+        kb.id if kb else "",
+        str(kb.content_version or 0) if kb else "",
+        kb.qdrant_collection_name if kb else "",
+        model,
+        get_query_prefix(model, embedding.get("embedding_query_prefix")) or "",
+        prompt_template.content if prompt_template else "",
+        json.dumps(config, sort_keys=True, default=str),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _collection_name(vector: list[float]) -> str:
+    return f"{COLLECTION_PREFIX}{len(vector)}"
+
+
+def _deployment_filter(deployment_id: str) -> FieldCondition:
+    return FieldCondition(key="deployment_id", match=MatchValue(value=deployment_id))
+
+
+async def _collection_exists(client: AsyncQdrantClient, name: str) -> bool:
+    if name in _existing_collections:
+        return True
+    if await client.collection_exists(name):
+        _existing_collections.add(name)
+        return True
+    return False
+
+
+async def _ensure_collection(client: AsyncQdrantClient, name: str, vector_size: int) -> None:
+    if await _collection_exists(client, name):
+        return
+    try:
+        await client.create_collection(
+            collection_name=name,
+            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+        )
+        await client.create_payload_index(name, "deployment_id", PayloadSchemaType.KEYWORD)
+        await client.create_payload_index(name, "fingerprint", PayloadSchemaType.KEYWORD)
+        await client.create_payload_index(name, "created_at", PayloadSchemaType.FLOAT)
+    except Exception:
+        # Another replica created it first
+        if not await client.collection_exists(name):
+            raise
+    _existing_collections.add(name)
+
+
+async def lookup_answer(
+    client: AsyncQdrantClient,
+    deployment_id: str,
+    vector: list[float],
+    fingerprint: str,
+    threshold: float,
+    ttl: int,
+) -> tuple[str, list[dict]] | None:
+    """(answer, citations) of the most similar fresh cached question above threshold, else None."""
+    name = _collection_name(vector)
+    if not await _collection_exists(client, name):
+        return None
+    response = await client.query_points(
+        collection_name=name,
+        query=vector,
+        query_filter=Filter(
+            must=[
+                _deployment_filter(deployment_id),
+                FieldCondition(key="fingerprint", match=MatchValue(value=fingerprint)),
+                FieldCondition(key="created_at", range=Range(gte=time.time() - ttl)),
+            ]
+        ),
+        score_threshold=threshold,
+        limit=1,
+        with_payload=True,
+    )
+    if not response.points:
+        return None
+    payload = response.points[0].payload or {}
+    return payload.get("answer", ""), payload.get("citations") or []
+
+
+async def store_answer(
+    client: AsyncQdrantClient,
+    deployment_id: str,
+    vector: list[float],
+    fingerprint: str,
+    ttl: int,
+    question: str,
+    answer: str,
+    citations: list[dict],
+) -> None:
+    """Cache an answer, and drop this deployment's entries that are expired or have another fingerprint."""
+    name = _collection_name(vector)
+    await _ensure_collection(client, name, len(vector))
+    now = time.time()
+    await client.upsert(
+        collection_name=name,
+        points=[
+            PointStruct(
+                id=str(uuid.uuid4()),
+                vector=vector,
+                payload={
+                    "deployment_id": deployment_id,
+                    "fingerprint": fingerprint,
+                    "created_at": now,
+                    "question": question,
+                    "answer": answer,
+                    "citations": citations,
+                },
+            )
+        ],
+        wait=False,
+    )
+    for stale in (
+        Filter(must=[_deployment_filter(deployment_id)], must_not=[FieldCondition(key="fingerprint", match=MatchValue(value=fingerprint))]),
+        Filter(must=[_deployment_filter(deployment_id), FieldCondition(key="created_at", range=Range(lt=now - ttl))]),
+    ):
+        await client.delete(collection_name=name, points_selector=FilterSelector(filter=stale), wait=False)
@@ -0,0 +1,79 @@
+"""Content hashes for documents and chunks: byte-identical upload detection and incremental re-ingest."""
+import hashlib
+import uuid
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.document_chunk import DocumentChunk
+
+# Namespace for deterministic point ids (uuid5)
+POINT_ID_NAMESPACE = uuid.UUID("6f1c2a52-3c1e-4d8b-9a57-0b7d4f2e9c11")
+INSERT_BATCH_SIZE = 5_000
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_point_ids(
+    document_id: str,
+    embedding_model: str,
+    hashes: list[str],
+    seen: dict[str, int] | None = None,
+) -> list[str]:
+    """
+    Stable Qdrant point id per chunk: same document, embedding model and text -> same id, so an unchanged
+    chunk keeps its point (and vector) across re-ingests. Repeated texts get an occurrence counter; pass the
+    same `seen` dict for consecutive batches of one document.
+    """
+    seen = {} if seen is None else seen
+    ids = []
+    for h in hashes:
+        n = seen.get(h, 0)
+        seen[h] = n + 1
+        ids.append(str(uuid.uuid5(POINT_ID_NAMESPACE, f"{document_id}:{embedding_model}:{h}:{n}")))
+    return ids
+
+
+def document_chunk_points(db: Session, document_id: str) -> dict[str, int]:
+    """point_id -> chunk_index for the document's chunks as of the last successful ingest."""
+    rows = db.execute(
+        select(DocumentChunk.point_id, DocumentChunk.chunk_index).where(DocumentChunk.document_id == document_id)
+    ).all()
+    return {point_id: chunk_index for point_id, chunk_index in rows}
+
+
+def delete_document_chunks(db: Session, document_id: str) -> None:
+    db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document_id))
+
+
+def add_document_chunks(
+    db: Session,
+    knowledge_base_id: str,
+    document_id: str,
+    start_index: int,
+    point_ids: list[str],
+    hashes: list[str],
+) -> None:
+    """Record a batch of the document's chunks; chunk_index counts from start_index. Caller commits."""
+    rows = [
+        {
+            "point_id": point_id,
+            "document_id": document_id,
+            "knowledge_base_id": knowledge_base_id,
+            "chunk_index": i,
+            "content_hash": h,
+        }
+        for i, (point_id, h) in enumerate(zip(point_ids, hashes), start=start_index)
+    ]
+    for i in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.execute(insert(DocumentChunk), rows[i : i + INSERT_BATCH_SIZE])
@@ -1,161 +1,286 @@
 """Parse documents and chunk text. Used by ingest worker."""
+import bisect
+import multiprocessing
+import os
 import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
 # Strategy IDs and default params for API/docs
-CHUNK_STRATEGIES = ["fixed", "paragraph", "sentence", "recursive"]
+CHUNK_STRATEGIES = ["fixed", "paragraph", "sentence", "recursive", "token"]
 DEFAULT_CHUNK_SIZE = 512
 DEFAULT_CHUNK_OVERLAP = 50
 DEFAULT_STRATEGY = "fixed"
 
+# Token strategy: text is tokenized as pieces of about this many characters (cut at whitespace), in one batch
+TOKENIZE_PIECE_CHARS = 4096
+# Token limit: chunks are counted in batches of this many
+TOKEN_LIMIT_BATCH_SIZE = 64
+
+# Streaming: text files are read in blocks of about this many characters (cut at line ends)
+TEXT_BLOCK_CHARS = 64 * 1024
+# Streaming chunking works on a window of at least this many characters (or chunks) at a time
+CHUNK_WINDOW_MIN_CHARS = 32 * 1024
+CHUNK_WINDOW_CHUNKS = 16
+# ... and holds at most this many windows of text the strategy finds no break in before cutting it as fixed chunks
+CHUNK_WINDOW_MAX_WINDOWS = 4
+
+
+def _strip_span(text: str, start: int, end: int) -> tuple[int, int]:
+    """text[start:end].strip() as offsets, without copying."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _split_spans(text: str, pattern: re.Pattern) -> list[tuple[int, int]]:
+    """[p.strip() for p in pattern.split(text) if p.strip()] as (start, end) offsets."""
+    spans = []
+    pos = 0
+    for m in pattern.finditer(text):
+        spans.append(_strip_span(text, pos, m.start()))
+        pos = m.end()
+    spans.append(_strip_span(text, pos, len(text)))
+    return [(s, e) for s, e in spans if s < e]
+
+
+def _group_spans(
+    text: str,
+    spans: list[tuple[int, int]],
+    sep: str,
+    chunk_size: int,
+    overlap: int,
+) -> list[tuple[int, str]]:
+    """
+    Merge units (paragraphs, sentences) joined by sep into chunks of up to chunk_size characters; on overflow
+    the trailing units worth at least `overlap` characters start the next chunk. A chunk is the unit range
+    [first, i); weight[i] = characters of units before i plus one sep each, so lengths and the overlap cut are
+    O(1) / O(log n) instead of rescanning the chunk.
+    """
+    w = len(sep)
+    weight = [0]
+    for s, e in spans:
+        weight.append(weight[-1] + e - s + w)
+
+    def chunk(lo: int, hi: int) -> tuple[int, str]:
+        return spans[lo][0], sep.join(text[s:e] for s, e in spans[lo:hi])
+
+    chunks = []
+    first = 0
+    current_len = 0
+    for i, (s, e) in enumerate(spans):
+        if current_len + e - s + w > chunk_size and i > first:
+            chunks.append(chunk(first, i))
+            if overlap > 0:
+                # Last unit j whose suffix [j, i) holds >= overlap characters, or the whole chunk
+                first = max(first, bisect.bisect_right(weight, weight[i] - overlap) - 1)
+                current_len = weight[i] - weight[first] - w
+            else:
+                first = i
+                current_len = 0
+        current_len += e - s + w if current_len else e - s
+    if first < len(spans):
+        chunks.append(chunk(first, len(spans)))
+    return chunks
 
-def _chunk_fixed(text: str, chunk_size: int = 512, overlap: int = 50) -> list[str]:
+
+def _chunk_fixed(text: str, chunk_size: int = 512, overlap: int = 50) -> list[tuple[int, str]]:
     """Split text into overlapping chunks by character (approx tokens), break at sentence/newline/space."""
-    if not text or not text.strip():
-        return []
-    text = text.strip()
+    start, stop = _strip_span(text, 0, len(text))
     chunks = []
-    start = 0
-    while start < len(text):
+    while start < stop:
         end = start + chunk_size
-        chunk = text[start:end]
-        if end < len(text):
-            last_period = chunk.rfind(". ")
-            last_newline = chunk.rfind("\n")
-            last_space = chunk.rfind(" ")
-            break_at = max(last_period, last_newline, last_space)
+        if end < stop:
+            break_at = max(
+                text.rfind(". ", start, end),
+                text.rfind("\n", start, end),
+                text.rfind(" ", start, end),
+            ) - start
             if break_at > chunk_size // 2:
-                chunk = chunk[: break_at + 1]
                 end = start + break_at + 1
-        chunks.append(chunk.strip())
-        start = end - overlap if overlap < chunk_size else end
-    return [c for c in chunks if c]
+        s, e = _strip_span(text, start, min(end, stop))
+        if s < e:
+            chunks.append((s, text[s:e]))
+        next_start = end - overlap if overlap < chunk_size else end
+        # A break point at or before the overlap would not move forward
+        start = next_start if next_start > start else end
+    return chunks
 
 
-def _chunk_paragraph(text: str, chunk_size: int = 512, overlap: int = 50) -> list[str]:
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+
+def _chunk_paragraph(text: str, chunk_size: int = 512, overlap: int = 50) -> list[tuple[int, str]]:
     """Split on double newline, merge paragraphs up to chunk_size with overlap."""
-    if not text or not text.strip():
-        return []
-    text = text.strip()
-    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
-    if not paragraphs:
+    spans = _split_spans(text, _PARAGRAPH_BREAK)
+    if not spans:
         return _chunk_fixed(text, chunk_size, overlap)
-    chunks = []
-    current = []
-    current_len = 0
-    for i, p in enumerate(paragraphs):
-        add_len = len(p) + 2
-        if current_len + add_len > chunk_size and current:
-            chunks.append("\n\n".join(current))
-            if overlap > 0 and current:
-                # keep last paragraph(s) for overlap
-                overlap_len = 0
-                keep = []
-                for j in range(len(current) - 1, -1, -1):
-                    overlap_len += len(current[j]) + 2
-                    keep.insert(0, current[j])
-                    if overlap_len >= overlap:
-                        break
-                current = keep
-                current_len = sum(len(x) for x in current) + 2 * (len(current) - 1)
-            else:
-                current = []
-                current_len = 0
-        current.append(p)
-        current_len += add_len if current_len else len(p)
-    if current:
-        chunks.append("\n\n".join(current))
-    return [c for c in chunks if c]
+    return _group_spans(text, spans, "\n\n", chunk_size, overlap)
 
 
-def _chunk_sentence(text: str, chunk_size: int = 512, overlap: int = 50) -> list[str]:
+def _chunk_sentence(text: str, chunk_size: int = 512, overlap: int = 50) -> list[tuple[int, str]]:
     """Split into sentences, then group sentences into chunks of ~chunk_size chars with overlap."""
-    if not text or not text.strip():
-        return []
-    text = text.strip()
-    sentences = re.split(r"(?<=[.!?])\s+", text)
-    sentences = [s.strip() for s in sentences if s.strip()]
-    if not sentences:
+    spans = _split_spans(text, _SENTENCE_BREAK)
+    if not spans:
         return _chunk_fixed(text, chunk_size, overlap)
-    chunks = []
-    current = []
-    current_len = 0
-    for i, s in enumerate(sentences):
-        add_len = len(s) + 1
-        if current_len + add_len > chunk_size and current:
-            chunk = " ".join(current)
-            chunks.append(chunk)
-            if overlap > 0 and current:
-                overlap_len = 0
-                keep = []
-                for j in range(len(current) - 1, -1, -1):
-                    overlap_len += len(current[j]) + 1
-                    keep.insert(0, current[j])
-                    if overlap_len >= overlap:
-                        break
-                current = keep
-                current_len = sum(len(x) for x in current) + (len(current) - 1)
-            else:
-                current = []
-                current_len = 0
-        current.append(s)
-        current_len += add_len if current_len else len(s)
-    if current:
-        chunks.append(" ".join(current))
-    return [c for c in chunks if c]
+    return _group_spans(text, spans, " ", chunk_size, overlap)
 
 
-def _chunk_recursive(text: str, chunk_size: int = 512, overlap: int = 50, separators: list[str] | None = None) -> list[str]:
+def _chunk_recursive(
+    text: str,
+    chunk_size: int = 512,
+    overlap: int = 50,
+    separators: list[str] | None = None,
+) -> list[tuple[int, str]]:
     """Recursive split: try separators in order, then recurse on oversized segments."""
-    if not text or not text.strip():
-        return []
-    text = text.strip()
     if separators is None:
         separators = ["\n\n", "\n", ". ", " "]
     if chunk_size <= 0:
         chunk_size = DEFAULT_CHUNK_SIZE
 
-    def _split(s: str, sep_list: list[str]) -> list[str]:
-        if len(s) <= chunk_size:
-            return [s] if s.strip() else []
+    def _has_text(start: int, end: int) -> bool:
+        s, e = _strip_span(text, start, end)
+        return s < e
+
+    def _split(start: int, end: int, sep_list: list[str]) -> list[tuple[int, int]]:
+        if end - start <= chunk_size:
+            return [(start, end)] if _has_text(start, end) else []
         if not sep_list:
-            return [s[i : i + chunk_size] for i in range(0, len(s), chunk_size - overlap)]
+            step = chunk_size - overlap if overlap < chunk_size else chunk_size
+            return [(i, min(i + chunk_size, end)) for i in range(start, end, step)]
         sep = sep_list[0]
-        parts = s.split(sep)
-        if len(parts) == 1:
-            return _split(s, sep_list[1:])
+        # Parts are separated by sep; each part but the last keeps its separator, so runs of parts are
+        # contiguous spans of text
+        parts = []
+        pos = start
+        while (found := text.find(sep, pos, end)) >= 0:
+            parts.append((pos, found + len(sep)))
+            pos = found + len(sep)
+        if not parts:
+            return _split(start, end, sep_list[1:])
+        parts.append((pos, end))
         out = []
-        current = ""
-        for i, p in enumerate(parts):
-            add = p + (sep if i < len(parts) - 1 else "")
-            if len(current) + len(add) <= chunk_size:
-                current += add
+        cur_start = cur_end = None
+        for s, e in parts:
+            if cur_start is None or (cur_end - cur_start) + (e - s) <= chunk_size:
+                if cur_start is None and e - s > chunk_size:
+                    out.extend(_split(s, e, sep_list[1:]))
+                    continue
+                cur_start = s if cur_start is None else cur_start
+                cur_end = e
             else:
-                if current.strip():
-                    out.append(current.strip())
-                if len(add) > chunk_size:
-                    out.extend(_split(add, sep_list[1:]))
-                    current = ""
+                out.append(_strip_span(text, cur_start, cur_end))
+                if e - s > chunk_size:
+                    out.extend(_split(s, e, sep_list[1:]))
+                    cur_start = cur_end = None
                 else:
-                    current = add
-        if current.strip():
-            out.append(current.strip())
+                    cur_start, cur_end = s, e
+        if cur_start is not None:
+            out.append(_strip_span(text, cur_start, cur_end))
         return out
 
-    return [c for c in _split(text, separators) if c]
+    start, stop = _strip_span(text, 0, len(text))
+    return [(s, text[s:e]) for s, e in _split(start, stop, separators) if s < e]
 
 
-def chunk_text(
-    text: str,
-    strategy: str = "fixed",
-    chunk_size: int | None = None,
-    overlap: int | None = None,
-    **kwargs,
-) -> list[str]:
+def _token_spans(text: str, tokenizer) -> list[tuple[int, int]]:
+    """(start, end) of every token of text (no special tokens), from one batched call to a fast tokenizer."""
+    bounds = []
+    pos = 0
+    while pos < len(text):
+        end = min(pos + TOKENIZE_PIECE_CHARS, len(text))
+        if end < len(text):
+            # Tokens never span whitespace, so cutting after it does not change tokenization
+            cut = max(text.rfind("\n", pos, end), text.rfind(" ", pos, end))
+            if cut > pos:
+                end = cut + 1
+        bounds.append((pos, end))
+        pos = end
+    encoded = tokenizer([text[s:e] for s, e in bounds], add_special_tokens=False, return_offsets_mapping=True)
+    spans = []
+    for (base, _), offsets in zip(bounds, encoded["offset_mapping"]):
+        spans.extend((base + s, base + e) for s, e in offsets if e > s)
+    return spans
+
+
+def _token_windows(text: str, tokens: list[tuple[int, int]], size: int, overlap: int) -> list[tuple[int, str]]:
     """
-    Split text into chunks. strategy: fixed, paragraph, sentence, recursive.
-    chunk_size/overlap: for fixed/paragraph/recursive in characters; for sentence, chunk_size = number of sentences.
+    Chunks of up to `size` tokens, consecutive chunks sharing about `overlap` tokens. Chunks start and end at
+    whitespace between words where possible, so a chunk never begins with a word-piece continuation and
+    re-tokenizes to the same tokens.
     """
+    size = max(1, size)
+    overlap = overlap if 0 <= overlap < size else 0
+    # Token indices that begin a whitespace-separated word, plus the end
+    words = [i for i in range(len(tokens)) if i == 0 or tokens[i][0] > tokens[i - 1][1]]
+    words.append(len(tokens))
+    chunks = []
+    i = 0
+    while i < len(tokens):
+        end = min(i + size, len(tokens))
+        if end < len(tokens):
+            # Cut at the last word boundary that fits; a single word longer than size is cut inside
+            k = words[bisect.bisect_right(words, end) - 1]
+            end = k if k > i else end
+        start, stop = tokens[i][0], tokens[end - 1][1]
+        chunks.append((start, text[start:stop]))
+        if end >= len(tokens):
+            break
+        i = min(words[bisect.bisect_left(words, max(end - overlap, i + 1))], end)
+    return chunks
+
+
+def _chunk_tokens(text: str, chunk_size: int = 512, overlap: int = 50, tokenizer=None) -> list[tuple[int, str]]:
+    """Split by tokens of the embedding model's tokenizer: chunk_size and overlap are in tokens."""
+    if tokenizer is None:
+        raise ValueError("The token chunk strategy needs the embedding model's tokenizer")
+    return _token_windows(text, _token_spans(text, tokenizer), chunk_size, overlap)
+
+
+def limit_chunk_tokens(
+    chunks: Iterable[tuple[str, int | None]],
+    tokenizer,
+    max_tokens: int,
+) -> Iterator[tuple[str, int | None]]:
+    """
+    Token-limit mode for any strategy: (chunk, page) pairs pass through unless longer than max_tokens, in which
+    case they are split into consecutive max_tokens pieces (same page). Chunks are tokenized in batches.
+    """
+    batch: list[tuple[str, int | None]] = []
+
+    def flush() -> Iterator[tuple[str, int | None]]:
+        encoded = tokenizer([c for c, _ in batch], add_special_tokens=False, return_offsets_mapping=True)
+        for (chunk, page), offsets in zip(batch, encoded["offset_mapping"]):
+            tokens = [(s, e) for s, e in offsets if e > s]
+            if len(tokens) <= max_tokens:
+                yield chunk, page
+                continue
+            for _, piece in _token_windows(chunk, tokens, max_tokens, 0):
+                yield piece, page
+
+    for item in chunks:
+        batch.append(item)
+        if len(batch) >= TOKEN_LIMIT_BATCH_SIZE:
+            yield from flush()
+            batch = []
+    if batch:
+        yield from flush()
+
+
+def _chunk_spans(text: str, strategy: str, chunk_size: int | None, overlap: int | None, **kwargs) -> list[tuple[int, str]]:
+    """chunk_text, with each chunk's start offset in text: [(offset, chunk), ...]."""
     if not text or not text.strip():
         return []
     strategy = (strategy or DEFAULT_STRATEGY).lower()
@@ -164,17 +289,131 @@ def chunk_text(
     size = chunk_size if chunk_size is not None else DEFAULT_CHUNK_SIZE
     ov = overlap if overlap is not None else DEFAULT_CHUNK_OVERLAP
 
-    if strategy == "fixed":
-        return _chunk_fixed(text, size, ov)
     if strategy == "paragraph":
         return _chunk_paragraph(text, size, ov)
     if strategy == "sentence":
         return _chunk_sentence(text, size, ov)
     if strategy == "recursive":
         return _chunk_recursive(text, size, ov, kwargs.get("separators"))
+    if strategy == "token":
+        return _chunk_tokens(text, size, ov, kwargs.get("tokenizer"))
     return _chunk_fixed(text, size, ov)
 
 
+def chunk_text(
+    text: str,
+    strategy: str = "fixed",
+    chunk_size: int | None = None,
+    overlap: int | None = None,
+    **kwargs,
+) -> list[str]:
+    """
+    Split text into chunks. strategy: fixed, paragraph, sentence, recursive, token.
+    chunk_size/overlap: for fixed/paragraph/recursive in characters; for sentence, chunk_size = number of sentences;
+    for token, in tokens of kwargs["tokenizer"] (a fast Hugging Face tokenizer, see embedding_registry.get_tokenizer).
+    All strategies work on offsets into text and run in linear time.
+    """
+    return [chunk for _, chunk in _chunk_spans(text, strategy, chunk_size, overlap, **kwargs)]
+
+
+def _page_at(starts: list[tuple[int, int | None]], offset: int) -> int | None:
+    """Page of the segment containing offset; starts = [(segment offset, page), ...] ascending."""
+    i = bisect.bisect_right(starts, offset, key=lambda s: s[0]) - 1
+    return starts[max(i, 0)][1]
+
+
+def iter_chunks(
+    segments: Iterable[tuple[int | None, str]],
+    strategy: str = "fixed",
+    chunk_size: int | None = None,
+    overlap: int | None = None,
+    **kwargs,
+) -> Iterator[tuple[str, int | None]]:
+    """
+    Lazy chunk_text over a stream of (page, text) segments (see iter_segments): yields (chunk, page of the chunk
+    start). Segments are joined with newlines, as extract_text_from_file does, and chunked one window at a
+    time; the last chunk of each window is re-chunked with the next one, so chunks follow chunk_text on the
+    whole text except occasionally around window edges. Text in which the strategy finds no break (paragraphs
+    without blank lines, sentences without end marks) is cut as fixed chunks once it fills
+    CHUNK_WINDOW_MAX_WINDOWS windows, so memory is bounded by that many windows plus one segment.
+    """
+    size = chunk_size if chunk_size is not None else DEFAULT_CHUNK_SIZE
+    window = max(CHUNK_WINDOW_MIN_CHARS, size * CHUNK_WINDOW_CHUNKS)
+    buf = ""
+    starts: list[tuple[int, int | None]] = []
+    # Chunk again once buf holds this many characters: one more window after a window without a break
+    needed = window
+
+    def chunk_window(final: bool) -> tuple[list[tuple[str, int | None]], int | None]:
+        """Chunks to emit, and the offset to carry over from (None = nothing)."""
+        spans = _chunk_spans(buf, strategy, chunk_size, overlap, **kwargs)
+        if not final and len(spans) < 2:
+            if len(buf) < window * CHUNK_WINDOW_MAX_WINDOWS:
+                return [], 0  # keep accumulating
+            spans = _chunk_fixed(buf, size, overlap if overlap is not None else DEFAULT_CHUNK_OVERLAP)
+        if final or len(spans) < 2 or spans[-1][0] <= spans[-2][0]:
+            return [(c, _page_at(starts, o)) for o, c in spans], None
+        return [(c, _page_at(starts, o)) for o, c in spans[:-1]], spans[-1][0]
+
+    for page, text in segments:
+        if buf or starts:
+            buf += "\n"
+        starts.append((len(buf), page))
+        buf += text
+        if len(buf) < needed:
+            continue
+        emitted, carry = chunk_window(final=False)
+        yield from emitted
+        needed = min(len(buf) + window, window * CHUNK_WINDOW_MAX_WINDOWS) if carry == 0 else window
+        if carry is None:
+            buf, starts = "", []
+        elif carry:
+            starts = [(0, _page_at(starts, carry))] + [(o - carry, p) for o, p in starts if o > carry]
+            buf = buf[carry:]
+    if buf.strip():
+        emitted, _ = chunk_window(final=True)
+        yield from emitted
+
+
+def iter_segments(file_path: str) -> Iterator[tuple[int | None, str]]:
+    """
+    Extract text incrementally as (page, text) segments. PDFs yield one segment per page (1-based page
+    numbers); text files yield blocks of lines, DOCX blocks of paragraphs and HTML blocks of text strings. page
+    is None where there are no pages. "\n".join of the texts equals extract_text_from_file().
+    """
+    path = Path(file_path)
+    suffix = path.suffix.lower()
+    if suffix == ".pdf":
+        try:
+            from pypdf import PdfReader
+
+            reader = PdfReader(file_path)
+            for i, page in enumerate(reader.pages, start=1):
+                yield i, page.extract_text() or ""
+        except MemoryError:
+            raise
+        except Exception:
+            return
+        return
+    if suffix in (".docx", ".doc", ".html", ".htm"):
+        for block in _text_blocks(file_path):
+            yield None, block
+        return
+    with open(file_path, encoding="utf-8", errors="replace") as f:
+        lines: list[str] = []
+        size = 0
+        for line in f:
+            lines.append(line)
+            size += len(line)
+            if size >= TEXT_BLOCK_CHARS:
+                block = "".join(lines)
+                lines, size = [], 0
+                # The newline that ends a block is the separator between segments
+                yield None, block[:-1] if block.endswith("\n") else block
+        if lines:
+            yield None, "".join(lines)
+
+
 def extract_text_from_file(file_path: str) -> str:
     """Extract raw text from file based on extension."""
     path = Path(file_path)
@@ -183,23 +422,170 @@ def extract_text_from_file(file_path: str) -> str:
         return path.read_text(encoding="utf-8", errors="replace")
     if suffix == ".pdf":
         try:
-            from pypdf import PdfReader
-            reader = PdfReader(file_path)
-            return "\n".join(p.extract_text() or "" for p in reader.pages)
+            return "\n".join(_extract_pdf_pages(file_path, 0, None))
+        except MemoryError:
+            raise
         except Exception:
             return ""
-    if suffix in (".docx", ".doc"):
+    if suffix in (".docx", ".doc", ".html", ".htm"):
+        return "\n".join(_text_parts(file_path))
+    return path.read_text(encoding="utf-8", errors="replace")
+
+
+def _text_parts(file_path: str) -> list[str]:
+    """
+    DOCX paragraphs, or HTML text strings (as get_text(separator="\n", strip=True) joins them). Unreadable
+    DOCX gives nothing, unparsable HTML its raw text.
+    """
+    path = Path(file_path)
+    if path.suffix.lower() in (".docx", ".doc"):
         try:
             import docx
-            doc = docx.Document(file_path)
-            return "\n".join(p.text for p in doc.paragraphs)
+            return [p.text for p in docx.Document(file_path).paragraphs]
+        except MemoryError:
+            raise
         except Exception:
-            return ""
-    if suffix in (".html", ".htm"):
+            return []
+    try:
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(path.read_text(encoding="utf-8", errors="replace"), "html.parser")
+        return list(soup.stripped_strings)
+    except MemoryError:
+        raise
+    except Exception:
+        return [path.read_text(encoding="utf-8", errors="replace")]
+
+
+def _text_blocks(file_path: str) -> list[str]:
+    """_text_parts joined by newlines into blocks of about TEXT_BLOCK_CHARS, each ending at a part."""
+    blocks = []
+    parts: list[str] = []
+    size = 0
+    for part in _text_parts(file_path):
+        parts.append(part)
+        size += len(part) + 1
+        if size >= TEXT_BLOCK_CHARS:
+            blocks.append("\n".join(parts))
+            parts, size = [], 0
+    if parts:
+        blocks.append("\n".join(parts))
+    return blocks
+
+
+class ExtractionError(Exception):
+    """Extraction exceeded its time or memory budget, or the extraction process died."""
+
+
+def _extract_pdf_pages(file_path: str, start: int, end: int | None) -> list[str]:
+    """Texts of pages [start, end)."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    return [p.extract_text() or "" for p in reader.pages[start:end]]
+
+
+def _pdf_page_count(file_path: str) -> int:
+    try:
+        from pypdf import PdfReader
+
+        return len(PdfReader(file_path).pages)
+    except MemoryError:
+        raise
+    except Exception:
+        return 0
+
+
+def _pdf_shard(file_path: str, start: int, end: int) -> list[str]:
+    try:
+        return _extract_pdf_pages(file_path, start, end)
+    except MemoryError:
+        raise
+    except Exception:
+        return []
+
+
+def _terminate(pool: ProcessPoolExecutor) -> None:
+    """Stop the pool's processes now, even mid-task (shutdown alone lets running tasks finish)."""
+    if hasattr(pool, "terminate_workers"):  # Python 3.14+
+        pool.terminate_workers()
+        return
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+
+def _limit_memory(max_bytes: int) -> None:
+    """Pool initializer: cap the extraction process's address space (MemoryError instead of swapping the host)."""
+    if resource is not None and max_bytes > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (max_bytes, max_bytes))
+
+
+def iter_segments_isolated(
+    file_path: str,
+    timeout: float = 300.0,
+    max_memory_mb: int = 2048,
+    workers: int | None = None,
+    pdf_shard_pages: int = 50,
+) -> Iterator[tuple[int | None, str]]:
+    """
+    iter_segments in child processes, so a pathological file cannot hang or exhaust the caller. PDFs are split
+    into page ranges of pdf_shard_pages, extracted in parallel (up to `workers` processes, default CPU count)
+    ahead of the consumer and yielded in page order; at most two ranges per process are in flight. DOCX and HTML
+    are one parse each (a single XML / HTML tree), done in one process and yielded in blocks. .txt files are
+    read directly (nothing to parse). timeout bounds the time spent waiting for extraction (not the consumer's
+    time between segments), max_memory_mb each process; exceeding either, or a process dying (killed at the
+    memory cap, a parser crash), raises ExtractionError at once.
+    """
+    suffix = Path(file_path).suffix.lower()
+    if suffix == ".txt":
+        yield from iter_segments(file_path)
+        return
+    remaining = timeout
+    # spawn: children start clean, without the parent's threads or loaded models
+    ctx = multiprocessing.get_context("spawn")
+    initargs = (max_memory_mb * 1024 * 1024,)
+
+    def new_pool(processes: int) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(processes, mp_context=ctx, initializer=_limit_memory, initargs=initargs)
+
+    def wait(future):
+        nonlocal remaining
+        started = time.monotonic()
         try:
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(path.read_text(encoding="utf-8", errors="replace"), "html.parser")
-            return soup.get_text(separator="\n", strip=True)
-        except Exception:
-            return path.read_text(encoding="utf-8", errors="replace")
-    return path.read_text(encoding="utf-8", errors="replace")
+            return future.result(timeout=max(remaining, 0))
+        finally:
+            remaining -= time.monotonic() - started
+
+    pool = new_pool(1)
+    try:
+        if suffix != ".pdf":
+            for block in wait(pool.submit(_text_blocks, file_path)):
+                yield None, block
+            return
+        n_pages = wait(pool.submit(_pdf_page_count, file_path))
+        ranges = deque((start, start + pdf_shard_pages) for start in range(0, n_pages, pdf_shard_pages))
+        processes = min(workers or os.cpu_count() or 1, len(ranges)) or 1
+        if processes > 1:
+            _terminate(pool)
+            pool = new_pool(processes)
+        in_flight: deque = deque()
+        while ranges or in_flight:
+            while ranges and len(in_flight) < 2 * processes:
+                start, end = ranges.popleft()
+                in_flight.append((start, pool.submit(_pdf_shard, file_path, start, end)))
+            start, future = in_flight.popleft()
+            for i, text in enumerate(wait(future)):
+                yield start + i + 1, text
+    except FuturesTimeoutError:
+        raise ExtractionError(f"Text extraction timed out after {timeout:.0f}s")
+    except MemoryError:
+        raise ExtractionError(f"Text extraction exceeded the {max_memory_mb} MB memory cap")
+    except BrokenProcessPool:
+        # Killed (the OOM killer, a crash at the RLIMIT_AS cap) rather than raising MemoryError
+        raise ExtractionError(f"Text extraction process died (killed, e.g. past the {max_memory_mb} MB memory cap)")
+    finally:
+        # Not shutdown: a timed-out child may still be running
+        _terminate(pool)
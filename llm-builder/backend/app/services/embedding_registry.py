@@ -1,6 +1,16 @@
 """Embedding model registry: model_id -> vector size, optional query/passage prefixes. Used at ingest and RAG."""
 from __future__ import annotations
 
+import hashlib
+import queue
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from app.core.config import get_settings
+
 # Model ID (sentence-transformers) -> (vector_size, default_query_prefix, default_passage_prefix)
 # None prefix = no prefix applied
 EMBEDDING_MODELS: dict[str, tuple[int, str | None, str | None]] = {
@@ -14,6 +24,17 @@ EMBEDDING_MODELS: dict[str, tuple[int, str | None, str | None]] = {
 
 DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
+# Model ID -> max input tokens (sentence-transformers max_seq_length); longer passages are truncated at encode.
+# Unknown models are read from the loaded model.
+EMBEDDING_MAX_TOKENS: dict[str, int] = {
+    "all-MiniLM-L6-v2": 256,
+    "all-mpnet-base-v2": 384,
+    "BAAI/bge-small-en-v1.5": 512,
+    "BAAI/bge-base-en-v1.5": 512,
+    "intfloat/e5-small-v2": 512,
+    "intfloat/e5-base-v2": 512,
+}
+
 
 def get_vector_size(model_id: str) -> int:
     """Return vector dimension for model_id. Falls back to default model size if unknown."""
@@ -60,13 +81,214 @@ def get_embedding_model(model_id: str | None = None):
     return _loaded_models[mid]
 
 
+_loaded_tokenizers: dict[str, object] = {}
+
+
+def get_tokenizer(model_id: str | None = None):
+    """
+    Fast (Rust) tokenizer of the embedding model, cached by model_id. Loaded on its own (much lighter than the
+    model) unless the model is already in memory.
+    """
+    mid = model_id or DEFAULT_EMBEDDING_MODEL
+    if mid not in _loaded_tokenizers:
+        if mid in _loaded_models:
+            _loaded_tokenizers[mid] = _loaded_models[mid].tokenizer
+        else:
+            from transformers import AutoTokenizer
+
+            # Short sentence-transformers ids live under the sentence-transformers org on the hub
+            name = mid if "/" in mid else f"sentence-transformers/{mid}"
+            _loaded_tokenizers[mid] = AutoTokenizer.from_pretrained(name, use_fast=True)
+    return _loaded_tokenizers[mid]
+
+
+def preload_embedding_models(model_ids: list[str]) -> None:
+    """Load models and their tokenizers into this process's caches (the RQ worker, before it forks)."""
+    for mid in model_ids:
+        get_embedding_model(mid)
+        get_tokenizer(mid)
+
+
+def get_passage_token_budget(model_id: str | None = None) -> int:
+    """Tokens of chunk text the model embeds in full: max input length minus special tokens and passage prefix."""
+    mid = model_id or DEFAULT_EMBEDDING_MODEL
+    max_tokens = EMBEDDING_MAX_TOKENS.get(mid) or get_embedding_model(mid).max_seq_length
+    tokenizer = get_tokenizer(mid)
+    prefix = get_passage_prefix(mid)
+    prefix_tokens = len(tokenizer(prefix, add_special_tokens=False)["input_ids"]) if prefix else 0
+    return max(1, max_tokens - tokenizer.num_special_tokens_to_add(pair=False) - prefix_tokens)
+
+
+# Query embedding cache: (model_id, prefix, normalized query) -> vector. In-process LRU with TTL, optionally
+# backed by Redis so all API replicas share it. encode_query runs in worker threads, hence the lock.
+_query_cache: OrderedDict[tuple, tuple[float, list[float]]] = OrderedDict()
+_query_cache_lock = threading.Lock()
+_query_cache_stats = {"hits": 0, "misses": 0}
+_query_cache_redis = None
+QUERY_CACHE_REDIS_PREFIX = "qemb:"
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.split())
+
+
+def _get_query_cache_redis():
+    global _query_cache_redis
+    if _query_cache_redis is None:
+        from redis import Redis
+
+        # Short timeouts: a slow Redis must cost less than the forward pass it saves
+        _query_cache_redis = Redis.from_url(get_settings().redis_url, socket_timeout=0.2, socket_connect_timeout=0.2)
+    return _query_cache_redis
+
+
+def _redis_key(key: tuple) -> str:
+    return QUERY_CACHE_REDIS_PREFIX + hashlib.sha256("\x1f".join(key).encode("utf-8")).hexdigest()
+
+
+def _cache_get(key: tuple) -> list[float] | None:
+    settings = get_settings()
+    now = time.monotonic()
+    with _query_cache_lock:
+        entry = _query_cache.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                _query_cache.move_to_end(key)
+                _query_cache_stats["hits"] += 1
+                return entry[1]
+            del _query_cache[key]
+    if settings.query_embedding_cache_redis:
+        try:
+            raw = _get_query_cache_redis().get(_redis_key(key))
+        except Exception:
+            raw = None
+        if raw:
+            vector = array("f", raw).tolist()
+            _cache_put(key, vector, to_redis=False)
+            with _query_cache_lock:
+                _query_cache_stats["hits"] += 1
+            return vector
+    with _query_cache_lock:
+        _query_cache_stats["misses"] += 1
+    return None
+
+
+def _cache_put(key: tuple, vector: list[float], to_redis: bool = True) -> None:
+    settings = get_settings()
+    if settings.query_embedding_cache_size <= 0:
+        return
+    with _query_cache_lock:
+        _query_cache[key] = (time.monotonic() + settings.query_embedding_cache_ttl, vector)
+        _query_cache.move_to_end(key)
+        while len(_query_cache) > settings.query_embedding_cache_size:
+            _query_cache.popitem(last=False)
+    if to_redis and settings.query_embedding_cache_redis:
+        try:
+            # float32 bytes: the model's native precision, so round-tripping is exact
+            _get_query_cache_redis().set(
+                _redis_key(key), array("f", vector).tobytes(), ex=settings.query_embedding_cache_ttl
+            )
+        except Exception:
+            pass
+
+
+def query_cache_stats() -> dict:
+    """Hit/miss counters and current size of the in-process query embedding cache."""
+    with _query_cache_lock:
+        return {**_query_cache_stats, "size": len(_query_cache)}
+
+
+def clear_query_cache() -> None:
+    """Drop in-process entries and reset counters (Redis entries expire by TTL)."""
+    with _query_cache_lock:
+        _query_cache.clear()
+        _query_cache_stats.update(hits=0, misses=0)
+
+
 def encode_query(query: str, model_id: str | None = None, query_prefix: str | None = None) -> list[float]:
-    """Encode a single query for retrieval. Applies query_prefix if provided (or from registry)."""
+    """
+    Encode a single query for retrieval. Applies query_prefix if provided (or from registry).
+    Repeated queries (same model, prefix and whitespace-normalized text) are served from the cache.
+    """
     mid = model_id or DEFAULT_EMBEDDING_MODEL
     prefix = get_query_prefix(mid, query_prefix)
+    query = _normalize_query(query)
+    key = (mid, prefix or "", query)
+    cached = _cache_get(key)
+    if cached is not None:
+        return list(cached)
     text = (prefix + query).strip() if prefix else query
-    model = get_embedding_model(mid)
-    return model.encode(text).tolist()
+    vector = _encode_query_text(mid, text)
+    _cache_put(key, vector)
+    return list(vector)
+
+
+class _QueryBatcher:
+    """
+    Dynamic batching for one model: callers (request threads) enqueue a text and block on a Future; a single
+    daemon thread takes the first waiting text, collects more for up to max_wait or max_size, runs one
+    model.encode() over the batch and hands each caller its row. Only this thread touches the model for queries.
+    """
+
+    def __init__(self, model_id: str, max_size: int, max_wait: float):
+        self.model_id = model_id
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._queue: queue.SimpleQueue[tuple[str, Future]] = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=f"query-batcher-{model_id}", daemon=True)
+        self._thread.start()
+
+    def encode(self, text: str) -> list[float]:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _collect(self) -> list[tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                model = get_embedding_model(self.model_id)
+                rows = model.encode([text for text, _ in batch], batch_size=len(batch))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), row in zip(batch, rows):
+                future.set_result(row.tolist())
+
+
+_batchers: dict[str, _QueryBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def _encode_query_text(model_id: str, text: str) -> list[float]:
+    """Encode one prepared query text, through the model's batcher unless batching is disabled."""
+    settings = get_settings()
+    if settings.embedding_batch_max_size <= 1:
+        return get_embedding_model(model_id).encode(text).tolist()
+    batcher = _batchers.get(model_id)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(model_id)
+            if batcher is None:
+                batcher = _QueryBatcher(
+                    model_id, settings.embedding_batch_max_size, settings.embedding_batch_max_wait_ms / 1000.0
+                )
+                _batchers[model_id] = batcher
+    return batcher.encode(text)
 
 
 def encode_passages(
@@ -0,0 +1,189 @@
+"""Per-KB inverted keyword index with BM25 scoring, plus BM25 sparse vectors for hybrid Qdrant collections.
+Written by the ingest worker, read by RAG keyword retrieval."""
+import math
+import zlib
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.keyword_index import KeywordChunk, KeywordPosting
+from app.services.keywords import extract_keywords_from_text, term_frequencies
+
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Terms longer than the column are noise (hashes, base64); skip them rather than truncate
+MAX_TERM_LEN = 64
+# Rows per bulk insert statement
+INSERT_BATCH_SIZE = 5_000
+
+
+def delete_document_from_index(db: Session, document_id: str) -> None:
+    """Remove all postings and chunks of a document. Caller commits."""
+    db.execute(delete(KeywordPosting).where(KeywordPosting.document_id == document_id))
+    db.execute(delete(KeywordChunk).where(KeywordChunk.document_id == document_id))
+
+
+def index_document_chunks(
+    db: Session,
+    knowledge_base_id: str,
+    document_id: str,
+    chunks: list[tuple[str, str]],
+) -> None:
+    """
+    Replace the document's entries in the KB index. chunks = [(point_id, text), ...].
+    Incremental: only this document's rows change, BM25 stats are derived at query time. Caller commits.
+    """
+    delete_document_from_index(db, document_id)
+    add_chunks_to_index(db, knowledge_base_id, document_id, chunks)
+
+
+def add_chunks_to_index(
+    db: Session,
+    knowledge_base_id: str,
+    document_id: str,
+    chunks: list[tuple[str, str]],
+) -> None:
+    """Index more chunks of a document (streaming ingest, after delete_document_from_index). Caller commits."""
+    chunk_rows = []
+    posting_rows = []
+    for point_id, text in chunks:
+        tf = {t: n for t, n in term_frequencies(text).items() if len(t) <= MAX_TERM_LEN}
+        if not tf:
+            continue
+        chunk_rows.append({
+            "point_id": point_id,
+            "knowledge_base_id": knowledge_base_id,
+            "document_id": document_id,
+            "length": sum(tf.values()),
+        })
+        for term, n in tf.items():
+            posting_rows.append({
+                "knowledge_base_id": knowledge_base_id,
+                "term": term,
+                "point_id": point_id,
+                "document_id": document_id,
+                "tf": n,
+            })
+    for i in range(0, len(chunk_rows), INSERT_BATCH_SIZE):
+        db.execute(insert(KeywordChunk), chunk_rows[i : i + INSERT_BATCH_SIZE])
+    for i in range(0, len(posting_rows), INSERT_BATCH_SIZE):
+        db.execute(insert(KeywordPosting), posting_rows[i : i + INSERT_BATCH_SIZE])
+
+
+def _stats_query(knowledge_base_id: str):
+    return select(func.count(KeywordChunk.point_id), func.avg(KeywordChunk.length)).where(
+        KeywordChunk.knowledge_base_id == knowledge_base_id
+    )
+
+
+def _postings_query(knowledge_base_id: str, terms: list[str]):
+    return (
+        select(KeywordPosting.point_id, KeywordPosting.term, KeywordPosting.tf, KeywordChunk.length)
+        .join(KeywordChunk, KeywordChunk.point_id == KeywordPosting.point_id)
+        .where(KeywordPosting.knowledge_base_id == knowledge_base_id, KeywordPosting.term.in_(terms))
+    )
+
+
+def kb_index_stats(db: Session, knowledge_base_id: str) -> tuple[int, float]:
+    """(number of indexed chunks, average chunk length) for the KB."""
+    n, avgdl = db.execute(_stats_query(knowledge_base_id)).one()
+    return int(n or 0), float(avgdl or 0.0)
+
+
+def bm25_idf(n_chunks: int, df: int) -> float:
+    return math.log(1.0 + (n_chunks - df + 0.5) / (df + 0.5))
+
+
+def bm25_term_score(tf: int, length: int, avgdl: float, idf: float) -> float:
+    norm = 1.0 - BM25_B + BM25_B * (length / avgdl if avgdl else 1.0)
+    return idf * tf * (BM25_K1 + 1.0) / (tf + BM25_K1 * norm)
+
+
+def _rank(rows, n_chunks: int, avgdl: float, limit: int) -> list[tuple[int, float, str]]:
+    """BM25 over (point_id, term, tf, length) posting rows; df is exact since rows hold every posting of each term."""
+    df: dict[str, int] = {}
+    for _, term, _, _ in rows:
+        df[term] = df.get(term, 0) + 1
+    idf = {term: bm25_idf(n_chunks, d) for term, d in df.items()}
+    # point_id -> [n_matched, score]
+    acc: dict[str, list] = {}
+    for point_id, term, tf, length in rows:
+        entry = acc.setdefault(point_id, [0, 0.0])
+        entry[0] += 1
+        entry[1] += bm25_term_score(tf, length, avgdl, idf[term])
+    ranked = sorted(acc.items(), key=lambda x: (-x[1][0], -x[1][1]))[:limit]
+    return [(n_matched, score, point_id) for point_id, (n_matched, score) in ranked]
+
+
+def search_keyword_index(
+    db: Session,
+    knowledge_base_id: str,
+    keywords: set[str],
+    limit: int,
+) -> list[tuple[int, float, str]] | None:
+    """
+    Exact BM25 search over the KB index. Returns [(n_matched, bm25_score, point_id), ...] sorted by
+    (n_matched desc, score desc), at most limit. None if the KB has no index yet (e.g. ingested before
+    the index existed), so callers can fall back.
+    """
+    n_chunks, avgdl = kb_index_stats(db, knowledge_base_id)
+    if n_chunks == 0:
+        return None
+    terms = [k for k in keywords if len(k) <= MAX_TERM_LEN]
+    if not terms:
+        return []
+    rows = db.execute(_postings_query(knowledge_base_id, terms)).all()
+    return _rank(rows, n_chunks, avgdl, limit)
+
+
+async def asearch_keyword_index(
+    db: AsyncSession,
+    knowledge_base_id: str,
+    keywords: set[str],
+    limit: int,
+) -> list[tuple[int, float, str]] | None:
+    """Async search_keyword_index (same result shape and None semantics)."""
+    n, avgdl = (await db.execute(_stats_query(knowledge_base_id))).one()
+    n_chunks, avgdl = int(n or 0), float(avgdl or 0.0)
+    if n_chunks == 0:
+        return None
+    terms = [k for k in keywords if len(k) <= MAX_TERM_LEN]
+    if not terms:
+        return []
+    rows = (await db.execute(_postings_query(knowledge_base_id, terms))).all()
+    return _rank(rows, n_chunks, avgdl, limit)
+
+
+def sparse_term_index(term: str) -> int:
+    """Stable term -> sparse dimension (crc32), identical at ingest and query time."""
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def _to_sparse(weights: dict[int, float]) -> tuple[list[int], list[float]]:
+    indices = sorted(weights)
+    return indices, [weights[i] for i in indices]
+
+
+def sparse_document_vector(text: str, avgdl: float) -> tuple[list[int], list[float]]:
+    """
+    BM25 term-frequency component per keyword of the chunk, as (indices, values) for a Qdrant sparse
+    vector. IDF is applied server-side (collection uses Modifier.IDF), so scores stay exact as the KB grows.
+    """
+    tf = term_frequencies(text)
+    length = sum(tf.values())
+    weights: dict[int, float] = {}
+    for term in extract_keywords_from_text(text, min_len=2, stop=None):
+        n = tf.get(term, 0)
+        if not n:
+            continue
+        idx = sparse_term_index(term)
+        # idf=1: only the saturation / length-normalization part of BM25
+        weights[idx] = weights.get(idx, 0.0) + bm25_term_score(n, length, avgdl, 1.0)
+    return _to_sparse(weights)
+
+
+def sparse_query_vector(keywords: set[str]) -> tuple[list[int], list[float]]:
+    """Question keywords as a binary sparse vector (dot product = sum of matched BM25 term scores)."""
+    return _to_sparse({sparse_term_index(k): 1.0 for k in keywords})
@@ -53,3 +53,13 @@ def chunk_contains_any_keyword(chunk_text: str, keywords: set[str]) -> bool:
         return False
     lower = normalize_for_match(chunk_text)
     return any(kw in lower for kw in keywords)
+
+
+def term_frequencies(text: str, min_len: int = 2) -> dict[str, int]:
+    """Token -> count for the chunk (same tokenization as extract_keywords_from_text). Used for BM25."""
+    normalized = normalize_for_match(text)
+    counts: dict[str, int] = {}
+    for w in re.findall(r"[a-z0-9]+", normalized):
+        if len(w) >= min_len:
+            counts[w] = counts.get(w, 0) + 1
+    return counts
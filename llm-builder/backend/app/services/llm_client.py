@@ -1,75 +1,236 @@
-"""Unified LLM client: Ollama, vLLM (OpenAI-compatible), OpenAI, custom REST."""
+"""Unified LLM client: Ollama, vLLM (OpenAI-compatible), OpenAI, custom REST.
+
+HTTP goes through a process-wide pool of long-lived httpx.AsyncClients (one per endpoint origin and event
+loop), so chat turns reuse keep-alive connections instead of paying a TCP/TLS handshake each time.
+"""
+import asyncio
+import functools
+import json
+from collections.abc import AsyncIterator
+from urllib.parse import urlsplit
+
 import httpx
+from opentelemetry.trace import SpanKind
+
+from app.core.config import get_settings
+from app.core.tracing import current_context, detached_span, start_span, trace_headers
 from app.models.model_registry import ModelRegistry
 
 OLLAMA_DEFAULT_URL = "http://localhost:11434"
+OPENAI_DEFAULT_URL = "https://api.openai.com"
 
+# Defaults when ModelRegistry.config has no "timeout" / "connect_timeout" (seconds)
+DEFAULT_GENERATE_TIMEOUT = 120.0
+DEFAULT_HEALTH_TIMEOUT = 5.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
 
-def _ollama_complete(model_id: str, prompt: str, base_url: str, **kwargs) -> str:
-    url = (base_url or OLLAMA_DEFAULT_URL).rstrip("/") + "/api/generate"
-    with httpx.Client(timeout=120.0) as client:
-        r = client.post(
-            url,
-            json={"model": model_id, "prompt": prompt, "stream": False},
+# (id(event loop), origin) -> client. An AsyncClient's connections belong to the loop that opened them.
+_clients: dict[tuple[int, str], httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def get_http_client(url: str) -> httpx.AsyncClient:
+    """Pooled AsyncClient for the URL's origin on the running loop. Created on first use, reused after."""
+    loop = asyncio.get_running_loop()
+    key = (id(loop), _origin(url))
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        settings = get_settings()
+        client = httpx.AsyncClient(
+            http2=settings.llm_http2 and _http2_available(),
+            limits=httpx.Limits(
+                max_connections=settings.llm_http_max_connections,
+                max_keepalive_connections=settings.llm_http_max_keepalive_connections,
+                keepalive_expiry=settings.llm_http_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(DEFAULT_GENERATE_TIMEOUT, connect=DEFAULT_CONNECT_TIMEOUT),
         )
-        r.raise_for_status()
-        data = r.json()
-        return data.get("response", "")
+        _clients[key] = client
+    return client
+
+
+async def close_http_clients() -> None:
+    """Close pooled clients that belong to the running loop (API shutdown)."""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [k for k in _clients if k[0] == loop_id]:
+        await _clients.pop(key).aclose()
+
+
+def _timeout(config: dict, default: float) -> httpx.Timeout:
+    """Per-model timeout from ModelRegistry.config: timeout (read/write/pool) and connect_timeout."""
+    total = float(config.get("timeout") or default)
+    connect = float(config.get("connect_timeout") or min(total, DEFAULT_CONNECT_TIMEOUT))
+    return httpx.Timeout(total, connect=connect)
+
+
+def _resolve(model: ModelRegistry, extra_config: dict) -> dict:
+    config = dict(model.config or {})
+    config.update(extra_config)
+    return config
+
+
+async def _ollama_complete(model_id: str, prompt: str, base_url: str, headers: dict | None = None, **kwargs) -> str:
+    url = (base_url or OLLAMA_DEFAULT_URL).rstrip("/") + "/api/generate"
+    r = await get_http_client(url).post(
+        url,
+        headers=headers,
+        json={"model": model_id, "prompt": prompt, "stream": False},
+        timeout=_timeout(kwargs, DEFAULT_GENERATE_TIMEOUT),
+    )
+    r.raise_for_status()
+    data = r.json()
+    return data.get("response", "")
 
 
-def _openai_complete(model_id: str, prompt: str, base_url: str, api_key: str | None, **kwargs) -> str:
-    url = (base_url or "https://api.openai.com").rstrip("/") + "/v1/chat/completions"
-    headers = {}
+def _openai_request(
+    model_id: str, prompt: str, base_url: str, api_key: str | None, stream: bool, headers: dict | None = None, **kwargs
+):
+    url = (base_url or OPENAI_DEFAULT_URL).rstrip("/") + "/v1/chat/completions"
+    headers = dict(headers or {})
     if api_key:
         headers["Authorization"] = f"Bearer {api_key}"
-    with httpx.Client(timeout=120.0) as client:
-        r = client.post(
-            url,
-            headers=headers,
-            json={
-                "model": model_id,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": kwargs.get("max_tokens", 1024),
-                "temperature": kwargs.get("temperature", 0.7),
-            },
-        )
+    body = {
+        "model": model_id,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": kwargs.get("max_tokens", 1024),
+        "temperature": kwargs.get("temperature", 0.7),
+    }
+    if stream:
+        body["stream"] = True
+    return url, headers, body
+
+
+async def _openai_complete(model_id: str, prompt: str, base_url: str, api_key: str | None, **kwargs) -> str:
+    url, headers, body = _openai_request(model_id, prompt, base_url, api_key, False, **kwargs)
+    r = await get_http_client(url).post(
+        url, headers=headers, json=body, timeout=_timeout(kwargs, DEFAULT_GENERATE_TIMEOUT)
+    )
+    r.raise_for_status()
+    data = r.json()
+    choice = data.get("choices", [{}])[0]
+    return choice.get("message", {}).get("content", "")
+
+
+async def _ollama_stream(
+    model_id: str, prompt: str, base_url: str, headers: dict | None = None, **kwargs
+) -> AsyncIterator[str]:
+    """Yield response fragments from Ollama's NDJSON stream."""
+    url = (base_url or OLLAMA_DEFAULT_URL).rstrip("/") + "/api/generate"
+    async with get_http_client(url).stream(
+        "POST",
+        url,
+        headers=headers,
+        json={"model": model_id, "prompt": prompt, "stream": True},
+        timeout=_timeout(kwargs, DEFAULT_GENERATE_TIMEOUT),
+    ) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if data.get("error"):
+                raise RuntimeError(data["error"])
+            if data.get("response"):
+                yield data["response"]
+            if data.get("done"):
+                break
+
+
+async def _openai_stream(model_id: str, prompt: str, base_url: str, api_key: str | None, **kwargs) -> AsyncIterator[str]:
+    """Yield content deltas from an OpenAI-compatible SSE stream."""
+    url, headers, body = _openai_request(model_id, prompt, base_url, api_key, True, **kwargs)
+    async with get_http_client(url).stream(
+        "POST", url, headers=headers, json=body, timeout=_timeout(kwargs, DEFAULT_GENERATE_TIMEOUT)
+    ) as r:
         r.raise_for_status()
-        data = r.json()
-        choice = data.get("choices", [{}])[0]
-        return choice.get("message", {}).get("content", "")
+        async for line in r.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            payload = line[len("data:"):].strip()
+            if payload == "[DONE]":
+                break
+            data = json.loads(payload)
+            choice = (data.get("choices") or [{}])[0]
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+def _span_attributes(model: ModelRegistry, prompt: str) -> dict:
+    return {"llm.provider": model.provider, "llm.model": model.model_id, "llm.prompt_chars": len(prompt)}
 
 
-def complete(model: ModelRegistry, prompt: str, **extra_config) -> str:
+async def acomplete(model: ModelRegistry, prompt: str, **extra_config) -> str:
     """Run completion for the given registered model. Returns generated text."""
     base_url = model.endpoint_url or None
     api_key = model.api_key_encrypted  # stored in plain for now; can encrypt later
-    model_id = model.model_id
-    config = model.config or {}
-    config.update(extra_config)
+    config = _resolve(model, extra_config)
+
+    if model.provider not in ("ollama", "vllm", "openai", "custom"):
+        raise ValueError(f"Unsupported provider: {model.provider}")
+    with start_span("llm.complete", _span_attributes(model, prompt), kind=SpanKind.CLIENT):
+        if model.provider == "ollama":
+            return await _ollama_complete(
+                model.model_id, prompt, base_url or OLLAMA_DEFAULT_URL, headers=trace_headers(), **config
+            )
+        return await _openai_complete(model.model_id, prompt, base_url, api_key, headers=trace_headers(), **config)
+
+
+async def _traced_stream(stream, parent, attributes: dict) -> AsyncIterator[str]:
+    """stream(headers=...) in a span that runs from the request to the last fragment (first one as an event)."""
+    with detached_span("llm.stream", parent, attributes, kind=SpanKind.CLIENT) as span:
+        first = True
+        async for text in stream(headers=trace_headers(span)):
+            if first:
+                span.add_event("first_token")
+                first = False
+            yield text
+
+
+def astream_complete(model: ModelRegistry, prompt: str, **extra_config) -> AsyncIterator[str]:
+    """Streaming variant of acomplete(): yields text fragments as the model generates them."""
+    base_url = model.endpoint_url or None
+    api_key = model.api_key_encrypted
+    config = _resolve(model, extra_config)
 
     if model.provider == "ollama":
-        return _ollama_complete(model_id, prompt, base_url or OLLAMA_DEFAULT_URL, **config)
-    if model.provider in ("vllm", "openai", "custom"):
-        return _openai_complete(model_id, prompt, base_url, api_key, **config)
-    raise ValueError(f"Unsupported provider: {model.provider}")
+        stream = functools.partial(_ollama_stream, model.model_id, prompt, base_url or OLLAMA_DEFAULT_URL, **config)
+    elif model.provider in ("vllm", "openai", "custom"):
+        stream = functools.partial(_openai_stream, model.model_id, prompt, base_url, api_key, **config)
+    else:
+        raise ValueError(f"Unsupported provider: {model.provider}")
+    # Parent is the caller's span now, not whatever is current when the consumer starts iterating
+    return _traced_stream(stream, current_context(), _span_attributes(model, prompt))
 
 
-def health_check(model: ModelRegistry) -> bool:
+async def ahealth_check(model: ModelRegistry) -> bool:
     """Check if the model endpoint is reachable."""
+    timeout = _timeout({"timeout": (model.config or {}).get("health_timeout")}, DEFAULT_HEALTH_TIMEOUT)
     if model.provider == "ollama":
         url = (model.endpoint_url or OLLAMA_DEFAULT_URL).rstrip("/") + "/api/tags"
         try:
-            with httpx.Client(timeout=5.0) as client:
-                r = client.get(url)
-                return r.status_code == 200
+            r = await get_http_client(url).get(url, timeout=timeout)
+            return r.status_code == 200
         except Exception:
             return False
     if model.provider in ("vllm", "openai", "custom") and model.endpoint_url:
         try:
             base = model.endpoint_url.rstrip("/")
-            with httpx.Client(timeout=5.0) as client:
-                r = client.get(base + "/health" if "vllm" in base or "localhost" in base else base)
-                return r.status_code in (200, 404, 405)
+            url = base + "/health" if "vllm" in base or "localhost" in base else base
+            r = await get_http_client(url).get(url, timeout=timeout)
+            return r.status_code in (200, 404, 405)
         except Exception:
             return False
     return True
@@ -0,0 +1,143 @@
+"""
+Persistent chunk-embedding cache in Redis, shared by all ingest workers and knowledge bases:
+(model_id, passage_prefix, sha256(chunk)) -> float32 vector. Size-bounded with least-recently-used eviction;
+hit/miss counters live in Redis too, so passage_cache_stats() reports the hit rate across workers.
+"""
+import hashlib
+import math
+import time
+from array import array
+
+from redis import Redis
+
+from app.core.config import get_settings
+from app.services.document_chunks import chunk_hash
+from app.services.embedding_registry import DEFAULT_EMBEDDING_MODEL, encode_passages, get_passage_prefix
+
+KEY_PREFIX = "pemb:"
+LRU_KEY = KEY_PREFIX + "lru"  # sorted set: entry key -> last use (unix time)
+BYTES_KEY = KEY_PREFIX + "bytes"
+HITS_KEY = KEY_PREFIX + "hits"
+MISSES_KEY = KEY_PREFIX + "misses"
+# Evict down to this fraction of the limit, so eviction does not run on every put
+EVICT_TARGET = 0.9
+EVICT_BATCH = 512
+
+_redis: Redis | None = None
+
+
+def _get_redis() -> Redis:
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(get_settings().redis_url, socket_timeout=2.0, socket_connect_timeout=2.0)
+    return _redis
+
+
+def _entry_key(model_id: str, prefix: str, content_hash: str) -> str:
+    ident = hashlib.sha256(f"{model_id}\x1f{prefix}\x1f{content_hash}".encode("utf-8")).hexdigest()
+    return KEY_PREFIX + ident
+
+
+def _evict(redis: Redis, max_bytes: int) -> None:
+    target = int(max_bytes * EVICT_TARGET)
+    while True:
+        total = int(redis.get(BYTES_KEY) or 0)
+        entries = redis.zcard(LRU_KEY)
+        if not entries:
+            redis.set(BYTES_KEY, 0)
+            return
+        if total <= target:
+            return
+        # Least recently used first, about as many as needed to get under the target
+        count = min(EVICT_BATCH, max(1, math.ceil((total - target) / (total / entries))))
+        popped = redis.zpopmin(LRU_KEY, count)
+        keys = [key for key, _ in popped]
+        with redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.strlen(key)
+            sizes = pipe.execute()
+        with redis.pipeline(transaction=False) as pipe:
+            pipe.delete(*keys)
+            pipe.decrby(BYTES_KEY, sum(sizes))
+            pipe.execute()
+
+
+def _lookup(redis: Redis, keys: list[str]) -> list[list[float] | None]:
+    raw = redis.mget(keys)
+    now = time.time()
+    hit_keys = {key: now for key, value in zip(keys, raw) if value}
+    with redis.pipeline(transaction=False) as pipe:
+        if hit_keys:
+            pipe.zadd(LRU_KEY, hit_keys)
+        pipe.incrby(HITS_KEY, len(hit_keys))
+        pipe.incrby(MISSES_KEY, len(keys) - len(hit_keys))
+        pipe.execute()
+    return [array("f", value).tolist() if value else None for value in raw]
+
+
+def _store(redis: Redis, entries: dict[str, list[float]], max_bytes: int) -> None:
+    now = time.time()
+    payloads = {key: array("f", vector).tobytes() for key, vector in entries.items()}
+    with redis.pipeline(transaction=False) as pipe:
+        for key, value in payloads.items():
+            pipe.set(key, value, nx=True)
+        created = pipe.execute()
+    added = sum(len(value) for (key, value), ok in zip(payloads.items(), created) if ok)
+    with redis.pipeline(transaction=False) as pipe:
+        pipe.zadd(LRU_KEY, {key: now for key in payloads})
+        pipe.incrby(BYTES_KEY, added)
+        total = pipe.execute()[-1]
+    if total > max_bytes:
+        _evict(redis, max_bytes)
+
+
+def encode_passages_cached(
+    texts: list[str],
+    model_id: str | None = None,
+    hashes: list[str] | None = None,
+) -> list[list[float]]:
+    """
+    encode_passages with the persistent cache in front: cached chunks are not encoded again, new vectors
+    are stored afterwards. hashes = sha256 per text if already computed. Redis errors fall back to encoding.
+    """
+    settings = get_settings()
+    if settings.passage_cache_max_bytes <= 0 or not texts:
+        return encode_passages(texts, model_id=model_id)
+    mid = model_id or DEFAULT_EMBEDDING_MODEL
+    prefix = get_passage_prefix(mid) or ""
+    keys = [_entry_key(mid, prefix, h) for h in (hashes or [chunk_hash(t) for t in texts])]
+    redis = _get_redis()
+    try:
+        vectors = _lookup(redis, keys)
+    except Exception:
+        return encode_passages(texts, model_id=model_id)
+
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        encoded = encode_passages([texts[i] for i in missing], model_id=model_id)
+        for i, vector in zip(missing, encoded):
+            vectors[i] = vector
+        try:
+            _store(redis, {keys[i]: vectors[i] for i in missing}, settings.passage_cache_max_bytes)
+        except Exception:
+            pass
+    return vectors
+
+
+def passage_cache_stats() -> dict:
+    """Shared counters: hits, misses, hit_rate, entries, bytes."""
+    redis = _get_redis()
+    with redis.pipeline(transaction=False) as pipe:
+        pipe.get(HITS_KEY)
+        pipe.get(MISSES_KEY)
+        pipe.zcard(LRU_KEY)
+        pipe.get(BYTES_KEY)
+        hits, misses, entries, size = pipe.execute()
+    hits, misses = int(hits or 0), int(misses or 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "entries": int(entries or 0),
+        "bytes": int(size or 0),
+    }
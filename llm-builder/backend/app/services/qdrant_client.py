@@ -1,10 +1,39 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+import asyncio
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    Distance,
+    VectorParams,
+    PointStruct,
+    Filter,
+    FieldCondition,
+    MatchValue,
+    SparseVectorParams,
+    SparseVector,
+    Modifier,
+    Prefetch,
+    FusionQuery,
+    Fusion,
+)
 from app.core.config import get_settings
+from app.core.tracing import traced
 
 # Vector size for default embedding model (e.g. all-MiniLM-L6-v2 = 384, bge-small = 384)
 DEFAULT_VECTOR_SIZE = 384
 
+# Hybrid collections store a named dense vector next to a named sparse (BM25-style) vector.
+# Collections created before hybrid support have a single unnamed dense vector.
+DENSE_VECTOR_NAME = "dense"
+SPARSE_VECTOR_NAME = "keywords"
+
+# collection name -> has sparse vector. Only existing collections are cached (names are never reused).
+_hybrid_collections: dict[str, bool] = {}
+
+_SPAN_ATTRIBUTES = {"db.system": "qdrant"}
+
+# id(event loop) -> long-lived async client (its HTTP connections belong to that loop)
+_async_clients: dict[int, AsyncQdrantClient] = {}
+
 
 def get_qdrant() -> QdrantClient:
     settings = get_settings()
@@ -14,24 +43,181 @@ def get_qdrant() -> QdrantClient:
     )
 
 
+def get_async_qdrant() -> AsyncQdrantClient:
+    """Shared AsyncQdrantClient for the running loop, for request paths (RAG)."""
+    loop_id = id(asyncio.get_running_loop())
+    client = _async_clients.get(loop_id)
+    if client is None:
+        settings = get_settings()
+        client = AsyncQdrantClient(
+            url=settings.qdrant_url,
+            api_key=settings.qdrant_api_key or None,
+        )
+        _async_clients[loop_id] = client
+    return client
+
+
+async def close_async_qdrant() -> None:
+    client = _async_clients.pop(id(asyncio.get_running_loop()), None)
+    if client is not None:
+        await client.close()
+
+
+@traced("qdrant.ensure_collection", _SPAN_ATTRIBUTES)
 def ensure_collection(client: QdrantClient, collection_name: str, vector_size: int = DEFAULT_VECTOR_SIZE) -> None:
+    """Create a hybrid collection (dense + sparse with server-side IDF) if it does not exist."""
     collections = client.get_collections().collections
     if not any(c.name == collection_name for c in collections):
         client.create_collection(
             collection_name=collection_name,
-            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+            vectors_config={DENSE_VECTOR_NAME: VectorParams(size=vector_size, distance=Distance.COSINE)},
+            sparse_vectors_config={SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)},
         )
+        _hybrid_collections[collection_name] = True
 
 
+def is_hybrid_collection(client: QdrantClient, collection_name: str) -> bool:
+    """True if the collection has the sparse keyword vector (created by ensure_collection since hybrid support)."""
+    if collection_name in _hybrid_collections:
+        return _hybrid_collections[collection_name]
+    try:
+        info = client.get_collection(collection_name)
+    except Exception:
+        return False
+    hybrid = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+    _hybrid_collections[collection_name] = hybrid
+    return hybrid
+
+
+async def ais_hybrid_collection(client: AsyncQdrantClient, collection_name: str) -> bool:
+    """Async is_hybrid_collection (shares the cache)."""
+    if collection_name in _hybrid_collections:
+        return _hybrid_collections[collection_name]
+    try:
+        info = await client.get_collection(collection_name)
+    except Exception:
+        return False
+    hybrid = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+    _hybrid_collections[collection_name] = hybrid
+    return hybrid
+
+
+def make_point(
+    point_id: str,
+    dense: list[float],
+    sparse: tuple[list[int], list[float]] | None,
+    payload: dict,
+    hybrid: bool = True,
+) -> PointStruct:
+    """Build a point for a hybrid collection (named vectors) or a legacy dense-only one."""
+    if not hybrid:
+        return PointStruct(id=point_id, vector=dense, payload=payload)
+    vector = {DENSE_VECTOR_NAME: dense}
+    if sparse and sparse[0]:
+        vector[SPARSE_VECTOR_NAME] = SparseVector(indices=sparse[0], values=sparse[1])
+    return PointStruct(id=point_id, vector=vector, payload=payload)
+
+
+@traced("qdrant.upsert", _SPAN_ATTRIBUTES)
 def upsert_points(
     client: QdrantClient,
     collection_name: str,
     points: list[PointStruct],
+    wait: bool = True,
 ) -> None:
+    """wait=False returns once Qdrant has queued the batch (operations are applied in order)."""
     if points:
-        client.upsert(collection_name=collection_name, points=points)
+        client.upsert(collection_name=collection_name, points=points, wait=wait)
+
+
+@traced("qdrant.search_dense", _SPAN_ATTRIBUTES)
+def search_dense(client: QdrantClient, collection_name: str, vector: list[float], limit: int) -> list:
+    """Dense vector search on either collection layout. Returns scored points with payload."""
+    using = DENSE_VECTOR_NAME if is_hybrid_collection(client, collection_name) else None
+    return client.query_points(
+        collection_name=collection_name,
+        query=vector,
+        using=using,
+        limit=limit,
+        with_payload=True,
+    ).points
+
+
+def _hybrid_prefetch(
+    vector: list[float],
+    sparse: tuple[list[int], list[float]],
+    limit: int,
+    dense_limit: int | None,
+    sparse_limit: int | None,
+) -> list[Prefetch]:
+    prefetch = [Prefetch(query=vector, using=DENSE_VECTOR_NAME, limit=dense_limit or limit)]
+    if sparse[0]:
+        prefetch.append(
+            Prefetch(
+                query=SparseVector(indices=sparse[0], values=sparse[1]),
+                using=SPARSE_VECTOR_NAME,
+                limit=sparse_limit or limit,
+            )
+        )
+    return prefetch
+
+
+@traced("qdrant.search_hybrid", _SPAN_ATTRIBUTES)
+def search_hybrid(
+    client: QdrantClient,
+    collection_name: str,
+    vector: list[float],
+    sparse: tuple[list[int], list[float]],
+    limit: int,
+    dense_limit: int | None = None,
+    sparse_limit: int | None = None,
+) -> list:
+    """One server-side query: dense and sparse prefetch legs fused with reciprocal rank fusion."""
+    return client.query_points(
+        collection_name=collection_name,
+        prefetch=_hybrid_prefetch(vector, sparse, limit, dense_limit, sparse_limit),
+        query=FusionQuery(fusion=Fusion.RRF),
+        limit=limit,
+        with_payload=True,
+    ).points
 
 
+@traced("qdrant.search_dense", _SPAN_ATTRIBUTES)
+async def asearch_dense(client: AsyncQdrantClient, collection_name: str, vector: list[float], limit: int) -> list:
+    """Async search_dense."""
+    using = DENSE_VECTOR_NAME if await ais_hybrid_collection(client, collection_name) else None
+    response = await client.query_points(
+        collection_name=collection_name,
+        query=vector,
+        using=using,
+        limit=limit,
+        with_payload=True,
+    )
+    return response.points
+
+
+@traced("qdrant.search_hybrid", _SPAN_ATTRIBUTES)
+async def asearch_hybrid(
+    client: AsyncQdrantClient,
+    collection_name: str,
+    vector: list[float],
+    sparse: tuple[list[int], list[float]],
+    limit: int,
+    dense_limit: int | None = None,
+    sparse_limit: int | None = None,
+) -> list:
+    """Async search_hybrid."""
+    response = await client.query_points(
+        collection_name=collection_name,
+        prefetch=_hybrid_prefetch(vector, sparse, limit, dense_limit, sparse_limit),
+        query=FusionQuery(fusion=Fusion.RRF),
+        limit=limit,
+        with_payload=True,
+    )
+    return response.points
+
+
+@traced("qdrant.delete", _SPAN_ATTRIBUTES)
 def delete_points_by_document(client: QdrantClient, collection_name: str, document_id: str) -> None:
     """Delete all points in collection that belong to the given document."""
     from qdrant_client.models import FilterSelector
@@ -44,3 +230,70 @@ def delete_points_by_document(client: QdrantClient, collection_name: str, docume
         )
     except Exception:
         pass
+
+
+@traced("qdrant.delete", _SPAN_ATTRIBUTES)
+def delete_document_points_except(
+    client: QdrantClient,
+    collection_name: str,
+    document_id: str,
+    keep_ids: list[str],
+) -> None:
+    """Delete the document's points whose id is not in keep_ids (chunks that disappeared, legacy random ids)."""
+    from qdrant_client.models import FilterSelector, HasIdCondition
+
+    client.delete(
+        collection_name=collection_name,
+        points_selector=FilterSelector(
+            filter=Filter(
+                must=[FieldCondition(key="document_id", match=MatchValue(value=document_id))],
+                must_not=[HasIdCondition(has_id=keep_ids)] if keep_ids else None,
+            )
+        ),
+    )
+
+
+@traced("qdrant.retrieve_payload", _SPAN_ATTRIBUTES)
+def changed_payloads(
+    client: QdrantClient,
+    collection_name: str,
+    updates: list[tuple[str, dict]],
+    batch_size: int = 256,
+) -> list[tuple[str, dict]]:
+    """The updates of set_points_payload that would change something: a field the point does not hold as given."""
+    changed = []
+    for i in range(0, len(updates), batch_size):
+        batch = updates[i : i + batch_size]
+        records = client.retrieve(
+            collection_name=collection_name,
+            ids=[point_id for point_id, _ in batch],
+            with_payload=sorted({key for _, payload in batch for key in payload}),
+            with_vectors=False,
+        )
+        current = {str(r.id): r.payload or {} for r in records}
+        changed.extend(
+            (point_id, payload)
+            for point_id, payload in batch
+            if any(current.get(point_id, {}).get(key) != value for key, value in payload.items())
+        )
+    return changed
+
+
+@traced("qdrant.set_payload", _SPAN_ATTRIBUTES)
+def set_points_payload(
+    client: QdrantClient,
+    collection_name: str,
+    updates: list[tuple[str, dict]],
+    batch_size: int = 256,
+) -> None:
+    """Merge payload fields into existing points, [(point_id, payload), ...], batched into few requests."""
+    from qdrant_client.models import SetPayload, SetPayloadOperation
+
+    for i in range(0, len(updates), batch_size):
+        client.batch_update_points(
+            collection_name=collection_name,
+            update_operations=[
+                SetPayloadOperation(set_payload=SetPayload(payload=payload, points=[point_id]))
+                for point_id, payload in updates[i : i + batch_size]
+            ],
+        )
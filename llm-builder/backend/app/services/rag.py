@@ -1,16 +1,23 @@
 """RAG: hybrid retrieval (semantic + keyword), then LLM. Best-practice pipeline."""
+import asyncio
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from app.db.base import SessionLocal
+import time
+from collections.abc import AsyncIterator
+from app.core.metrics import count_cache, observe_rag_stage, rag_labels, rag_stage, set_rag_labels
+from app.core.tracing import set_span_attributes, traced
+from app.db.base import AsyncSessionLocal
 from app.models.deployment import Deployment
 from app.models.knowledge_base import KnowledgeBase
 from app.models.model_registry import ModelRegistry
 from app.models.prompt_template import PromptTemplate
-from app.services.qdrant_client import get_qdrant
+from app.services.qdrant_client import get_async_qdrant, ais_hybrid_collection, asearch_dense, asearch_hybrid
 from app.services.embedding_registry import encode_query as encode_query_with_model
 from app.schemas.rag_config import resolve_embedding_for_kb
-from app.services.llm_client import complete
+from app.services.llm_client import acomplete, astream_complete
 from app.services.keywords import question_keywords, chunk_contains_any_keyword
+from app.services.keyword_index import asearch_keyword_index, sparse_query_vector
+from app.services.answer_cache import answer_fingerprint, lookup_answer, semantic_cache_settings, store_answer
+from app.services.retrieval_cache import get_cached_retrieval, retrieval_cache_key, set_cached_retrieval
 
 # Cap for keyword-only path; prefer chunks that match more question keywords.
 KEYWORD_TOP_K_MAX = 30
@@ -39,14 +46,15 @@ def _rerank_with_keyword_boost(candidates: list, question: str, top_k: int) -> l
     return [r for _, r in scored[:top_k]]
 
 
-def _scroll_all_keyword_matches(
+async def _scroll_all_keyword_matches(
     client,
     collection_name: str,
     keywords: set[str],
     seen_texts: set,
     min_keywords: int = 1,
 ) -> list:
-    """Scroll collection; return points whose text contains at least min_keywords of the question keywords."""
+    """Legacy fallback for KBs without a keyword index: scroll collection; return points whose text
+    contains at least min_keywords of the question keywords."""
     if not keywords:
         return []
     out = []
@@ -55,7 +63,7 @@ def _scroll_all_keyword_matches(
     max_points = 2_000  # cap to avoid slow full scans; increase if KB is huge and you need more recall
     total = 0
     while total < max_points:
-        points, next_offset = client.scroll(
+        points, next_offset = await client.scroll(
             collection_name=collection_name,
             offset=offset,
             limit=scroll_limit,
@@ -87,16 +95,59 @@ def _cap_and_rank_keyword_matches(keyword_scored: list, cap: int) -> list:
     return keyword_scored[:cap]
 
 
-def _keyword_retrieval(client, collection_name: str, keywords: set, keyword_top_k: int) -> list:
-    """Run keyword scroll + cap/rank. Used in parallel with vector retrieval."""
-    seen_texts = set()
-    keyword_scored = _scroll_all_keyword_matches(
-        client, collection_name, keywords, seen_texts, min_keywords=MIN_KEYWORDS_REQUIRED
+async def _keyword_retrieval(
+    client,
+    collection_name: str,
+    knowledge_base_id: str,
+    keywords: set,
+    keyword_top_k: int,
+) -> list:
+    """
+    BM25 lookup in the KB's inverted index, then one retrieve for the payloads. Used in parallel
+    with vector retrieval. KBs not yet indexed (ingested before the index existed) fall back to scroll.
+    """
+    if not keywords:
+        return []
+    # Own session: runs concurrently with the other retrieval leg
+    async with AsyncSessionLocal() as db:
+        hits = await asearch_keyword_index(db, knowledge_base_id, keywords, keyword_top_k)
+    if hits is None:
+        seen_texts = set()
+        keyword_scored = await _scroll_all_keyword_matches(
+            client, collection_name, keywords, seen_texts, min_keywords=MIN_KEYWORDS_REQUIRED
+        )
+        return _cap_and_rank_keyword_matches(keyword_scored, keyword_top_k)
+    hits = [h for h in hits if h[0] >= MIN_KEYWORDS_REQUIRED]
+    if not hits:
+        return []
+    points = await client.retrieve(
+        collection_name=collection_name,
+        ids=[point_id for _, _, point_id in hits],
+        with_payload=True,
+        with_vectors=False,
     )
-    return _cap_and_rank_keyword_matches(keyword_scored, keyword_top_k)
+    by_id = {str(p.id): p for p in points}
+    out = []
+    seen_texts = set()
+    for n_matched, _, point_id in hits:
+        point = by_id.get(point_id)
+        text = (point.payload or {}).get("text", "") if point else ""
+        if not text or text in seen_texts:
+            continue
+        seen_texts.add(text)
+        out.append((n_matched, point))
+    return out
+
 
+async def _encode_query(question: str, embedding_model: str | None, embedding_query_prefix: str | None) -> list[float]:
+    """Query embedding off the event loop (CPU-bound model forward pass)."""
+    with rag_stage("query_embedding"):
+        return await asyncio.to_thread(
+            encode_query_with_model, question, model_id=embedding_model, query_prefix=embedding_query_prefix
+        )
 
-def _vector_retrieval(
+
+async def _vector_retrieval(
     client,
     collection_name: str,
     question: str,
@@ -106,16 +157,39 @@ def _vector_retrieval(
     embedding_query_prefix: str | None = None,
 ) -> list:
     """Run embedding + vector search + keyword re-rank. Used in parallel with keyword retrieval."""
-    vector = encode_query_with_model(question, model_id=embedding_model, query_prefix=embedding_query_prefix)
-    raw = client.search(
-        collection_name=collection_name,
-        query_vector=vector,
-        limit=fetch,
-        with_payload=True,
-    )
+    vector = await _encode_query(question, embedding_model, embedding_query_prefix)
+    with rag_stage("vector_search"):
+        raw = await asearch_dense(client, collection_name, vector, fetch)
     return _rerank_with_keyword_boost(raw, question, top_k)
 
 
+async def _hybrid_retrieval(
+    client,
+    collection_name: str,
+    question: str,
+    keywords: set[str],
+    fetch: int,
+    keyword_top_k: int,
+    embedding_model: str | None = None,
+    embedding_query_prefix: str | None = None,
+) -> list:
+    """
+    Dense + sparse (BM25) legs fused server-side (RRF) in a single query. Replaces the separate
+    keyword and vector passes for hybrid collections; results are ranked again in _merge_and_take_top_k.
+    """
+    vector = await _encode_query(question, embedding_model, embedding_query_prefix)
+    with rag_stage("vector_search"):
+        return await asearch_hybrid(
+            client,
+            collection_name,
+            vector,
+            sparse_query_vector(keywords),
+            limit=fetch,
+            dense_limit=fetch,
+            sparse_limit=keyword_top_k,
+        )
+
+
 def _merge_and_take_top_k(
     keyword_scored: list,
     vector_results: list,
@@ -127,140 +201,312 @@ def _merge_and_take_top_k(
     so chunks that match more question keywords always rank higher (e.g. CCCS+instance+parameters
     beats generic "instance parameters"). Return top_k chunks.
     """
-    # text -> (n_matched, score, source)
+    # text -> (n_matched, score, source, page)
     best = {}
     for n_matched, point in keyword_scored:
         text = (point.payload or {}).get("text", "")
         source = (point.payload or {}).get("source", "")
+        page = (point.payload or {}).get("page")
         if not text:
             continue
         score = 0.5 + 0.2 * n_matched
         prev = best.get(text)
         if prev is None or (n_matched > prev[0]) or (n_matched == prev[0] and score > prev[1]):
-            best[text] = (n_matched, score, source)
+            best[text] = (n_matched, score, source, page)
     for r in vector_results:
         text = (r.payload or {}).get("text", "")
         source = (r.payload or {}).get("source", "")
+        page = (r.payload or {}).get("page")
         if not text:
             continue
         n_matched = _count_keyword_matches(text, keywords) if keywords else 0
         score = r.score + 0.25 * n_matched
         prev = best.get(text)
         if prev is None or (n_matched > prev[0]) or (n_matched == prev[0] and score > prev[1]):
-            best[text] = (n_matched, score, source)
+            best[text] = (n_matched, score, source, page)
     # Sort by more keyword matches first, then by score
     ordered = sorted(best.items(), key=lambda x: (-x[1][0], -x[1][1]))[:top_k]
     context_parts = [text for text, _ in ordered]
     citations = [
-        {"text": text, "source": source, "score": score}
-        for text, (_, score, source) in ordered
+        {"text": text, "source": source, "score": score, **({"page": page} if page is not None else {})}
+        for text, (_, score, source, page) in ordered
     ]
     return context_parts, citations
 
 
-def run_rag(
-    deployment_id: str,
+async def _timed(stage: str, awaitable):
+    with rag_stage(stage):
+        return await awaitable
+
+
+async def _retrieve(
+    kb: KnowledgeBase,
     question: str,
-    chat_history: list[dict] | None = None,
-) -> tuple[str, list[dict]]:
+    top_k: int,
+    embedding_model: str | None,
+    embedding_query_prefix: str | None,
+) -> tuple[list[str], list[dict], bool]:
     """
-    Hybrid RAG: (1) Keyword-first pass over full KB so no fact is missed.
-    (2) Vector search + keyword re-rank for relevance. (3) Merge, dedupe, prompt, generate.
+    Keyword + vector retrieval and merge for one KB. Returns (context_parts, citations, complete);
+    complete is False if a retrieval leg failed and the result is partial.
     """
-    db = SessionLocal()
-    try:
-        dep = db.query(Deployment).filter(Deployment.id == deployment_id).first()
+    client = get_async_qdrant()
+    keywords = question_keywords(question)
+    keyword_top_k = min(KEYWORD_TOP_K_MAX, top_k * 2)
+
+    keyword_scored = []
+    vector_results = []
+    complete = True
+    fetch = min(top_k * 5, 150)
+    if await ais_hybrid_collection(client, kb.qdrant_collection_name):
+        try:
+            vector_results = await _hybrid_retrieval(
+                client,
+                kb.qdrant_collection_name,
+                question,
+                keywords,
+                fetch,
+                keyword_top_k,
+                embedding_model=embedding_model,
+                embedding_query_prefix=embedding_query_prefix,
+            )
+        except Exception:
+            complete = False
+    else:
+        kw_result, vec_result = await asyncio.gather(
+            _timed(
+                "keyword_retrieval",
+                _keyword_retrieval(client, kb.qdrant_collection_name, kb.id, keywords, keyword_top_k),
+            ),
+            _vector_retrieval(
+                client,
+                kb.qdrant_collection_name,
+                question,
+                top_k,
+                fetch,
+                embedding_model=embedding_model,
+                embedding_query_prefix=embedding_query_prefix,
+            ),
+            return_exceptions=True,
+        )
+        # A failed leg contributes nothing; the other is still merged
+        if isinstance(kw_result, BaseException):
+            complete = False
+        else:
+            keyword_scored = kw_result
+        if isinstance(vec_result, BaseException):
+            complete = False
+        else:
+            vector_results = vec_result
+
+    # 3) Merge both streams: dedupe by text, score, take top_k total (works with partial results)
+    if keyword_scored or vector_results:
+        with rag_stage("merge"):
+            context_parts, citations = _merge_and_take_top_k(
+                keyword_scored,
+                vector_results,
+                keywords,
+                top_k,
+            )
+        return context_parts, citations, complete
+    return [], [], complete
+
+
+async def _load_deployment(
+    deployment_id: str,
+) -> tuple[Deployment, ModelRegistry, KnowledgeBase | None, PromptTemplate | None]:
+    """Load everything the pipeline needs in one short session, so no DB connection is held during retrieval or generation."""
+    async with AsyncSessionLocal() as db:
+        dep = await db.get(Deployment, deployment_id)
         if not dep:
             raise ValueError("Deployment not found")
-        model = db.query(ModelRegistry).filter(ModelRegistry.id == dep.model_id).first()
+        model = await db.get(ModelRegistry, dep.model_id)
         if not model:
             raise ValueError("Model not found")
+        kb = await db.get(KnowledgeBase, dep.knowledge_base_id) if dep.knowledge_base_id else None
+        prompt_template = await db.get(PromptTemplate, dep.prompt_template_id) if dep.prompt_template_id else None
+    return dep, model, kb, prompt_template
+
 
-        context_parts = []
-        citations = []
-
-        if dep.knowledge_base_id:
-            kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == dep.knowledge_base_id).first()
-            if kb:
-                config = dep.config or {}
-                top_k = min(int(config.get("top_k", 10)), 20)
-                emb = resolve_embedding_for_kb(kb.config)
-                embedding_model = emb.get("embedding_model")
-                embedding_query_prefix = emb.get("embedding_query_prefix")
-                client = get_qdrant()
-                keywords = question_keywords(question)
-                keyword_top_k = min(KEYWORD_TOP_K_MAX, top_k * 2)
-
-                keyword_scored = []
-                vector_results = []
-                fetch = min(top_k * 5, 150)
-                try:
-                    with ThreadPoolExecutor(max_workers=2) as executor:
-                        fut_kw = executor.submit(
-                            _keyword_retrieval,
-                            client,
-                            kb.qdrant_collection_name,
-                            keywords,
-                            keyword_top_k,
-                        )
-                        fut_vec = executor.submit(
-                            _vector_retrieval,
-                            client,
-                            kb.qdrant_collection_name,
-                            question,
-                            top_k,
-                            fetch,
-                            embedding_model=embedding_model,
-                            embedding_query_prefix=embedding_query_prefix,
-                        )
-                        keyword_scored = fut_kw.result()
-                        vector_results = fut_vec.result()
-                except Exception:
-                    pass  # Keep keyword_scored and vector_results (possibly partial) for merge
-
-                # 3) Merge both streams: dedupe by text, score, take top_k total (works with partial results)
-                if keyword_scored or vector_results:
-                    context_parts, citations = _merge_and_take_top_k(
-                        keyword_scored,
-                        vector_results,
-                        keywords,
-                        top_k,
-                    )
-
-        context = "\n\n".join(context_parts) if context_parts else "No relevant context found."
-        prompt_template = None
-        if dep.prompt_template_id:
-            prompt_template = db.query(PromptTemplate).filter(PromptTemplate.id == dep.prompt_template_id).first()
-        memory_block = ""
-        if chat_history:
-            memory_block = "Previous conversation:\n" + "\n".join(
-                f"{m.get('role', 'user')}: {m.get('content', '')}" for m in chat_history[-20:]
-            ) + "\n\n"
-
-        if prompt_template:
-            prompt = prompt_template.content.replace("{context}", context).replace("{question}", question)
-            if "{memory}" in prompt_template.content:
-                prompt = prompt.replace("{memory}", memory_block)
-            else:
-                prompt = memory_block + prompt
+async def _semantic_lookup(
+    dep: Deployment,
+    kb: KnowledgeBase | None,
+    prompt_template: PromptTemplate | None,
+    question: str,
+    chat_history: list[dict] | None,
+) -> tuple[tuple[str, list[dict]] | None, tuple | None]:
+    """
+    Deployment semantic answer cache. Returns (hit, slot): hit is a cached (answer, citations); on a miss,
+    slot is what _semantic_store needs to cache the generated answer. (None, None) when the cache is off
+    or the answer depends on chat history.
+    """
+    settings = semantic_cache_settings(dep)
+    if settings is None or chat_history:
+        return None, None
+    threshold, ttl = settings
+    emb = resolve_embedding_for_kb(kb.config) if kb else {}
+    try:
+        vector = await _encode_query(question, emb.get("embedding_model"), emb.get("embedding_query_prefix"))
+        fingerprint = answer_fingerprint(dep, kb, prompt_template, emb)
+        hit = await lookup_answer(get_async_qdrant(), dep.id, vector, fingerprint, threshold, ttl)
+    except Exception:
+        return None, None
+    count_cache("semantic_answer", hit is not None)
+    return hit, (dep.id, vector, fingerprint, ttl)
+
+
+async def _semantic_store(slot: tuple | None, question: str, answer: str, citations: list[dict]) -> None:
+    if slot is None:
+        return
+    deployment_id, vector, fingerprint, ttl = slot
+    try:
+        await store_answer(get_async_qdrant(), deployment_id, vector, fingerprint, ttl, question, answer, citations)
+    except Exception:
+        pass
+
+
+async def _prepare_rag(
+    dep: Deployment,
+    kb: KnowledgeBase | None,
+    prompt_template: PromptTemplate | None,
+    question: str,
+    chat_history: list[dict] | None = None,
+) -> tuple[str, list[dict]]:
+    """Hybrid retrieval + prompt build, shared by run_rag and stream_rag. Returns (prompt, citations)."""
+    context_parts = []
+    citations = []
+
+    if kb:
+        config = dep.config or {}
+        top_k = min(int(config.get("top_k", 10)), 20)
+        emb = resolve_embedding_for_kb(kb.config)
+        embedding_model = emb.get("embedding_model")
+        embedding_query_prefix = emb.get("embedding_query_prefix")
+        cache_key = retrieval_cache_key(kb, embedding_model, embedding_query_prefix, question, top_k)
+        cached = await get_cached_retrieval(kb.id, cache_key)
+        if cached is not None:
+            context_parts, citations = cached
         else:
-            # Generic RAG instruction: answer only from context
-            prompt = memory_block + (
-                "Answer the question using only the context below. "
-                "Do not use external knowledge. Use information, numbers, and names exactly as they appear in the context. "
-                "Do not invent or assume meanings for abbreviations or acronyms; use only what the context states. "
-                "If the context contains a section that directly defines or lists what is asked, base your answer on that section. "
-                "If the answer is not in the context, say so briefly.\n\n"
-                "Context:\n{context}\n\n"
-                "Question: {question}\n\n"
-                "Answer:"
-            ).format(context=context, question=question)
+            context_parts, citations, complete = await _retrieve(
+                kb, question, top_k, embedding_model, embedding_query_prefix
+            )
+            # Don't cache results degraded by a failed retrieval leg
+            if complete:
+                await set_cached_retrieval(kb.id, cache_key, context_parts, citations)
 
+    prompt_started = time.perf_counter()
+    context = "\n\n".join(context_parts) if context_parts else "No relevant context found."
+    memory_block = ""
+    if chat_history:
+        memory_block = "Previous conversation:\n" + "\n".join(
+            f"{m.get('role', 'user')}: {m.get('content', '')}" for m in chat_history[-20:]
+        ) + "\n\n"
+
+    if prompt_template:
+        prompt = prompt_template.content.replace("{context}", context).replace("{question}", question)
+        if "{memory}" in prompt_template.content:
+            prompt = prompt.replace("{memory}", memory_block)
+        else:
+            prompt = memory_block + prompt
+    else:
+        # Generic RAG instruction: answer only from context
+        prompt = memory_block + (
+            "Answer the question using only the context below. "
+            "Do not use external knowledge. Use information, numbers, and names exactly as they appear in the context. "
+            "Do not invent or assume meanings for abbreviations or acronyms; use only what the context states. "
+            "If the context contains a section that directly defines or lists what is asked, base your answer on that section. "
+            "If the answer is not in the context, say so briefly.\n\n"
+            "Context:\n{context}\n\n"
+            "Question: {question}\n\n"
+            "Answer:"
+        ).format(context=context, question=question)
+    observe_rag_stage("prompt_build", time.perf_counter() - prompt_started)
+    return prompt, citations
+
+
+def _set_labels(dep: Deployment, kb: KnowledgeBase | None) -> None:
+    """Deployment / KB of this request for metrics and the current span."""
+    set_rag_labels(dep.id, kb.id if kb else None)
+    set_span_attributes({"deployment.id": dep.id, "knowledge_base.id": kb.id if kb else ""})
+
+
+@traced("rag.run")
+async def run_rag(
+    deployment_id: str,
+    question: str,
+    chat_history: list[dict] | None = None,
+) -> tuple[str, list[dict]]:
+    """
+    Hybrid RAG: (1) Keyword pass (sparse BM25 leg, or the KB's inverted index for dense-only
+    collections) so no fact is missed. (2) Vector search + keyword re-rank for relevance.
+    (3) Merge, dedupe, prompt, generate. Fully async: DB, Qdrant and LLM calls never hold a worker thread.
+    With the deployment's semantic cache on, a near-duplicate question is answered from the cache instead.
+    Raises ValueError if the deployment or its model does not exist.
+    """
+    started = time.perf_counter()
+    dep, model, kb, prompt_template = await _load_deployment(deployment_id)
+    _set_labels(dep, kb)
+    hit, slot = await _semantic_lookup(dep, kb, prompt_template, question, chat_history)
+    if hit is not None:
+        observe_rag_stage("total", time.perf_counter() - started)
+        return hit
+    prompt, citations = await _prepare_rag(dep, kb, prompt_template, question, chat_history)
+    try:
+        with rag_stage("llm_total"):
+            response_text = await acomplete(model, prompt, **(dep.config or {}))
+    except Exception as e:
+        response_text = "Error generating response: " + str(e)
+        # Keep existing citations so the user can see what context was retrieved
+    else:
+        await _semantic_store(slot, question, response_text, citations)
+    observe_rag_stage("total", time.perf_counter() - started)
+    return response_text, citations
+
+
+@traced("rag.stream")
+async def stream_rag(
+    deployment_id: str,
+    question: str,
+    chat_history: list[dict] | None = None,
+) -> tuple[list[dict], AsyncIterator[str]]:
+    """
+    Same pipeline as run_rag, but generation is streamed. Retrieval runs before returning (so a
+    missing deployment raises ValueError up front) and citations are available before the first token.
+    """
+    started = time.perf_counter()
+    dep, model, kb, prompt_template = await _load_deployment(deployment_id)
+    _set_labels(dep, kb)
+    hit, slot = await _semantic_lookup(dep, kb, prompt_template, question, chat_history)
+    if hit is not None:
+        answer, cached_citations = hit
+        observe_rag_stage("total", time.perf_counter() - started)
+
+        async def cached_tokens() -> AsyncIterator[str]:
+            yield answer
+
+        return cached_citations, cached_tokens()
+    prompt, citations = await _prepare_rag(dep, kb, prompt_template, question, chat_history)
+    config = dict(dep.config or {})
+    # Tokens are consumed by the response, after this request's context is gone
+    labels = rag_labels()
+
+    async def tokens() -> AsyncIterator[str]:
+        parts = []
+        llm_started = time.perf_counter()
         try:
-            response_text = complete(model, prompt, **(dep.config or {}))
+            async for text in astream_complete(model, prompt, **config):
+                if not parts:
+                    observe_rag_stage("llm_time_to_first_token", time.perf_counter() - llm_started, labels)
+                parts.append(text)
+                yield text
         except Exception as e:
-            response_text = "Error generating response: " + str(e)
-            # Keep existing citations so the user can see what context was retrieved
-        return response_text, citations
-    finally:
-        db.close()
+            # Same behaviour as run_rag: the error becomes the answer, citations are kept
+            yield "Error generating response: " + str(e)
+            return
+        finally:
+            now = time.perf_counter()
+            observe_rag_stage("llm_total", now - llm_started, labels)
+            observe_rag_stage("total", now - started, labels)
+        await _semantic_store(slot, question, "".join(parts), citations)
+
+    return citations, tokens()
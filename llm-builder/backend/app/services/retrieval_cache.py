@@ -0,0 +1,99 @@
+"""
+Retrieval result cache for RAG: (KB, content version, embedding model, question, top_k) -> (context_parts,
+citations). Stored in Redis so API replicas share it. Every ingest or delete in a KB bumps
+KnowledgeBase.content_version, so entries of older versions are never read again and expire by TTL.
+"""
+import hashlib
+import json
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.metrics import count_cache
+from app.core.queue import get_async_redis
+from app.models.knowledge_base import KnowledgeBase
+
+KEY_PREFIX = "rcache:"
+
+
+def bump_content_version(db: Session, knowledge_base_id: str) -> None:
+    """Invalidate cached retrievals for the KB (atomic increment). Caller commits."""
+    db.execute(
+        update(KnowledgeBase)
+        .where(KnowledgeBase.id == knowledge_base_id)
+        .values(content_version=KnowledgeBase.content_version + 1)
+    )
+
+
+def retrieval_cache_key(
+    kb: KnowledgeBase,
+    embedding_model: str | None,
+    embedding_query_prefix: str | None,
+    question: str,
+    top_k: int,
+) -> str:
+    parts = [
+        kb.id,
+        str(kb.content_version or 0),
+        kb.qdrant_collection_name,
+        embedding_model or "",
+        embedding_query_prefix or "",
+        " ".join(question.split()),
+        str(top_k),
+    ]
+    digest = hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    return f"{KEY_PREFIX}{kb.id}:{digest}"
+
+
+def _index_key(knowledge_base_id: str) -> str:
+    return f"{KEY_PREFIX}{knowledge_base_id}:keys"
+
+
+async def get_cached_retrieval(knowledge_base_id: str, key: str) -> tuple[list[str], list[dict]] | None:
+    """Cached (context_parts, citations) or None (miss, cache disabled or Redis unavailable)."""
+    if get_settings().retrieval_cache_ttl <= 0:
+        return None
+    try:
+        raw = await get_async_redis().get(key)
+    except Exception:
+        raw = None
+    count_cache("retrieval", bool(raw))
+    if not raw:
+        return None
+    data = json.loads(raw)
+    return data["context_parts"], data["citations"]
+
+
+async def set_cached_retrieval(
+    knowledge_base_id: str,
+    key: str,
+    context_parts: list[str],
+    citations: list[dict],
+) -> None:
+    """
+    Store a retrieval result. Entries larger than retrieval_cache_max_entry_bytes are skipped; each KB keeps
+    at most retrieval_cache_max_entries_per_kb entries (oldest evicted first).
+    """
+    settings = get_settings()
+    if settings.retrieval_cache_ttl <= 0:
+        return
+    raw = json.dumps({"context_parts": context_parts, "citations": citations})
+    if len(raw) > settings.retrieval_cache_max_entry_bytes:
+        return
+    index_key = _index_key(knowledge_base_id)
+    try:
+        redis = get_async_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.set(key, raw, ex=settings.retrieval_cache_ttl)
+            pipe.rpush(index_key, key)
+            pipe.expire(index_key, settings.retrieval_cache_ttl)
+            pipe.llen(index_key)
+            length = (await pipe.execute())[-1]
+        overflow = length - settings.retrieval_cache_max_entries_per_kb
+        if overflow > 0:
+            evicted = await redis.lpop(index_key, overflow)
+            if evicted:
+                await redis.delete(*evicted)
+    except Exception:
+        pass
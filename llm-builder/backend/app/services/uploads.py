@@ -0,0 +1,216 @@
+"""
+Upload storage: an UploadFile is copied in fixed-size blocks to a temp file next to its destination, hashing
+(sha256), counting and size-checking as it goes, in a worker thread so the event loop never does file I/O. The
+leading bytes are sniffed against the file extension. The caller then commits the temp file into place
+(os.replace, atomic on the same filesystem) or discards it. Memory per upload is one block, whatever the size.
+receive_files does the same for many files at once, unpacking zip and tar archives member by member.
+
+The UploadFile is Starlette's spool of the part: by the time this runs the whole request body has been received
+and written once (to memory up to 1 MB, then to disk), so the limits here only decide what is kept. The body
+itself is capped while it arrives by the endpoint's max_body_bytes (core/body_limit.py).
+"""
+import asyncio
+import hashlib
+import os
+import tarfile
+import tempfile
+import zipfile
+from dataclasses import dataclass
+
+MB = 1024 * 1024
+BLOCK_SIZE = MB
+SNIFF_BYTES = 8192
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# Content kinds by leading bytes (see sniff_kind), and the kinds each extension may contain
+EXPECTED_KINDS = {
+    ".pdf": {"pdf"},
+    ".docx": {"zip"},
+    ".doc": {"zip", "ole"},
+    ".txt": {"text"},
+    ".html": {"text"},
+    ".htm": {"text"},
+    ".json": {"text"},
+    ".jsonl": {"text"},
+}
+
+
+class UploadRejected(Exception):
+    """Upload refused; status_code is the HTTP status to answer with."""
+
+    status_code = 400
+
+
+class UploadTooLarge(UploadRejected):
+    status_code = 413
+
+
+class UploadTypeMismatch(UploadRejected):
+    status_code = 400
+
+
+@dataclass
+class ReceivedUpload:
+    temp_path: str
+    size: int
+    sha256: str
+    kind: str
+    newlines: int
+
+    def commit(self, final_path: str) -> None:
+        """Move the temp file to final_path (same directory, so the rename is atomic)."""
+        os.replace(self.temp_path, final_path)
+
+    def discard(self) -> None:
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+
+def sniff_kind(head: bytes) -> str:
+    """pdf, zip (docx), ole (legacy .doc), text (no NUL bytes) or binary."""
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return "zip"
+    if head.startswith(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"):
+        return "ole"
+    return "binary" if b"\x00" in head else "text"
+
+
+def _check_kind(head: bytes, ext: str) -> str:
+    kind = sniff_kind(head)
+    if kind not in EXPECTED_KINDS.get(ext, {kind}):
+        raise UploadTypeMismatch(f"File content does not match its {ext} extension")
+    return kind
+
+
+def _copy(source, directory: str, ext: str, max_bytes: int | None) -> ReceivedUpload:
+    fd, temp_path = tempfile.mkstemp(prefix=".upload-", suffix=ext + ".part", dir=directory)
+    digest = hashlib.sha256()
+    size = newlines = 0
+    head = b""
+    kind = None
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = source.read(BLOCK_SIZE)
+                if not block:
+                    break
+                size += len(block)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLarge(f"File too large. Max size: {max_bytes // MB} MB")
+                if kind is None:
+                    # Reject a mismatched file as soon as enough of it has arrived
+                    head += block[: SNIFF_BYTES - len(head)]
+                    if len(head) >= SNIFF_BYTES:
+                        kind = _check_kind(head, ext)
+                digest.update(block)
+                newlines += block.count(b"\n")
+                out.write(block)
+        if kind is None:
+            kind = _check_kind(head, ext)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return ReceivedUpload(temp_path, size, digest.hexdigest(), kind, newlines)
+
+
+async def receive_upload(file, directory: str, ext: str, max_bytes: int | None = None) -> ReceivedUpload:
+    """
+    Copy file (a FastAPI UploadFile, already received) into a temp file in directory. Raises UploadTooLarge past
+    max_bytes and UploadTypeMismatch when the content does not look like ext (both UploadRejected); no temp file
+    is left.
+    """
+    os.makedirs(directory, exist_ok=True)
+    return await asyncio.to_thread(_copy, file.file, directory, ext.lower(), max_bytes)
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _archive_members(source, filename: str):
+    """(name, readable) for each regular file of a zip or tar archive, in archive order."""
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    with archive.open(info) as member:
+                        yield info.filename, member
+        return
+    # Stream mode: members are read in order, never seeking back
+    with tarfile.open(fileobj=source, mode="r|*") as archive:
+        for info in archive:
+            if info.isfile():
+                yield info.name, archive.extractfile(info)
+
+
+def _members(files: list[tuple[str, object]]):
+    """(name, readable) of each plain file and of each member of each archive."""
+    for filename, source in files:
+        if not is_archive(filename):
+            yield filename, source
+            continue
+        try:
+            yield from _archive_members(source, filename)
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+            raise UploadTypeMismatch(f"Not a valid archive: {os.path.basename(filename)}") from e
+
+
+def _receive_all(
+    files: list[tuple[str, object]],
+    directory: str,
+    allowed_exts: set[str],
+    max_file_bytes: int,
+    max_files: int,
+    max_total_bytes: int,
+) -> list[tuple[str, "ReceivedUpload | UploadRejected"]]:
+    results: list[tuple[str, ReceivedUpload | UploadRejected]] = []
+    total = 0
+    try:
+        for name, source in _members(files):
+            # Rejected members count too: each one is a result, and an archive may hold millions of them
+            if len(results) >= max_files:
+                raise UploadTooLarge(f"Too many files. Max: {max_files}")
+            ext = os.path.splitext(name)[1].lower()
+            if ext not in allowed_exts:
+                results.append((name, UploadRejected(f"File type not allowed: {ext or 'no extension'}")))
+                continue
+            remaining = max_total_bytes - total
+            try:
+                upload = _copy(source, directory, ext, min(max_file_bytes, remaining))
+            except UploadTooLarge:
+                if remaining < max_file_bytes:
+                    raise UploadTooLarge(f"Upload too large. Max total size: {max_total_bytes // MB} MB")
+                results.append((name, UploadTooLarge(f"File too large. Max size: {max_file_bytes // MB} MB")))
+                continue
+            except UploadRejected as e:
+                results.append((name, e))
+                continue
+            total += upload.size
+            results.append((name, upload))
+    except BaseException:
+        for _, result in results:
+            if isinstance(result, ReceivedUpload):
+                result.discard()
+        raise
+    return results
+
+
+async def receive_files(
+    files: list, directory: str, allowed_exts: set[str], max_file_bytes: int, max_files: int, max_total_bytes: int
+) -> list[tuple[str, "ReceivedUpload | UploadRejected"]]:
+    """
+    Copy many UploadFiles into temp files in directory, as receive_upload does; zip and tar archives
+    (is_archive) contribute their members instead. Returns (name, ReceivedUpload or the UploadRejected it failed
+    with) per file or member, so one bad file does not fail the rest; files whose extension is not in
+    allowed_exts are rejected unread. Raises UploadRejected, keeping nothing, for an invalid archive, past
+    max_files files and members (rejected ones included) or past max_total_bytes.
+    """
+    os.makedirs(directory, exist_ok=True)
+    sources = [(f.filename or "", f.file) for f in files]
+    return await asyncio.to_thread(
+        _receive_all, sources, directory, allowed_exts, max_file_bytes, max_files, max_total_bytes
+    )
@@ -1,28 +1,214 @@
 """Ingest document: parse, chunk, embed, store in Qdrant."""
+import contextvars
 import os
-import uuid
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 from app.core.config import get_settings
+from app.core.metrics import record_ingest
+from app.core.tracing import set_span_attributes, start_span
 from app.db.base import SessionLocal
 from app.models.document import Document, DocumentStatus
 from app.models.knowledge_base import KnowledgeBase
 from app.schemas.rag_config import resolve_effective_config, resolve_embedding_for_kb
-from app.services.document_parser import extract_text_from_file, chunk_text
-from app.services.embedding_registry import encode_passages, get_vector_size
-from app.services.keywords import extract_keywords_from_text
+from app.services.document_parser import iter_chunks, iter_segments_isolated, limit_chunk_tokens
+from app.services.embedding_registry import get_passage_token_budget, get_tokenizer, get_vector_size
+from app.services.passage_cache import encode_passages_cached
+from app.services.keywords import extract_keywords_from_text, term_frequencies
+from app.services.keyword_index import (
+    add_chunks_to_index,
+    delete_document_from_index,
+    kb_index_stats,
+    sparse_document_vector,
+)
+from app.services.retrieval_cache import bump_content_version
+from app.services.document_chunks import (
+    chunk_hash,
+    chunk_point_ids,
+    add_document_chunks,
+    delete_document_chunks,
+    document_chunk_points,
+    file_sha256,
+)
 from app.services.qdrant_client import (
     get_qdrant,
     ensure_collection,
+    is_hybrid_collection,
+    make_point,
     upsert_points,
-    delete_points_by_document,
+    changed_payloads,
+    delete_document_points_except,
+    set_points_payload,
 )
-from qdrant_client.models import PointStruct
 
 MAX_KEYWORDS_PER_CHUNK = 300
+_DONE = object()
+
+
+def _chunk_points(doc: Document, items: list[tuple], vectors, avgdl: float, hybrid: bool) -> list:
+    """items = [(chunk_index, text, page, point_id, content_hash), ...]"""
+    points = []
+    for (i, chunk, page, point_id, content_hash), vec in zip(items, vectors):
+        kw = extract_keywords_from_text(chunk, min_len=2, stop=None)[:MAX_KEYWORDS_PER_CHUNK]
+        payload = {
+            "document_id": doc.id,
+            "chunk_index": i,
+            "text": chunk,
+            "source": doc.name,
+            "keywords": kw,
+            "content_hash": content_hash,
+        }
+        if page is not None:
+            payload["page"] = page
+        points.append(
+            make_point(
+                point_id,
+                vec,
+                sparse_document_vector(chunk, avgdl) if hybrid else None,
+                payload,
+                hybrid=hybrid,
+            )
+        )
+    return points
+
+
+@contextmanager
+def _timed(timings: dict[str, float], stage: str):
+    """Add the block's duration to timings[stage], in a span ingest.<stage>."""
+    started = time.perf_counter()
+    try:
+        with start_span(f"ingest.{stage}"):
+            yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+
+def _timed_iter(iterable, timings: dict[str, float], stage: str):
+    """Yield from iterable, adding the time spent producing items to timings[stage] (no span per item)."""
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        item = next(iterator, _DONE)
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+        if item is _DONE:
+            return
+        yield item
+
+
+def _write_batch(
+    client, collection_name: str, points: list, kept: list[tuple[str, dict]], timings: dict[str, float]
+) -> bool:
+    """Upsert the new points and update the kept ones whose payload changed. Returns whether any did."""
+    with _timed(timings, "upsert"):
+        upsert_points(client, collection_name, points, wait=False)
+        kept = changed_payloads(client, collection_name, kept)
+        set_points_payload(client, collection_name, kept)
+    return bool(kept)
+
+
+def _batched(iterable, size: int):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _ingest_chunks(
+    db,
+    client,
+    collection_name: str,
+    kb: KnowledgeBase,
+    doc: Document,
+    chunks,
+    existing: dict[str, int],
+    embedding_model: str,
+    hybrid: bool,
+    timings: dict[str, float],
+) -> tuple[list[str], int, bool]:
+    """
+    Index a stream of (text, page) chunks in fixed-size batches. Chunks whose text is unchanged keep their
+    point (same deterministic id) and vector; new ones are embedded and upserted without waiting for Qdrant,
+    while the next batch is extracted and encoded. At most one batch of vectors/points is in flight, so memory
+    does not grow with document size. The document's keyword index and chunk rows are rewritten along the way
+    (caller commits). Stage durations are added to timings. Returns (point ids in chunk order, number of new
+    chunks, whether a kept chunk's payload changed: its index, page or document name).
+    """
+    batch_size = max(1, get_settings().ingest_embed_batch_size)
+    avgdl = kb_index_stats(db, kb.id)[1]
+    delete_document_from_index(db, doc.id)
+    delete_document_chunks(db, doc.id)
+    point_ids: list[str] = []
+    seen: dict[str, int] = {}
+    n_new = 0
+    kept_changed = False
+    with ThreadPoolExecutor(max_workers=1) as uploader:
+        pending = None
+        for batch in _batched(chunks, batch_size):
+            texts = [text for text, _ in batch]
+            hashes = [chunk_hash(t) for t in texts]
+            ids = chunk_point_ids(doc.id, embedding_model, hashes, seen)
+            items = [
+                (len(point_ids) + j, text, page, point_id, h)
+                for j, ((text, page), point_id, h) in enumerate(zip(batch, ids, hashes))
+            ]
+            # First document of the KB: BM25 avgdl from its first batch
+            avgdl = avgdl or _mean_chunk_length(texts)
+            new = [item for item in items if item[3] not in existing]
+            # Kept chunks may have moved or the document been renamed
+            kept = [
+                (point_id, {"chunk_index": i, "source": doc.name, **({"page": page} if page is not None else {})})
+                for i, _, page, point_id, _ in items
+                if point_id in existing
+            ]
+            with _timed(timings, "embed"):
+                vectors = encode_passages_cached(
+                    [text for _, text, _, _, _ in new],
+                    model_id=embedding_model,
+                    hashes=[h for _, _, _, _, h in new],
+                )
+            with _timed(timings, "keywords"):
+                points = _chunk_points(doc, new, vectors, avgdl, hybrid)
+            if pending is not None:
+                kept_changed |= pending.result()
+            # copy_context: the upload span joins the job's trace
+            pending = uploader.submit(
+                contextvars.copy_context().run, _write_batch, client, collection_name, points, kept, timings
+            )
+            with _timed(timings, "index"):
+                add_chunks_to_index(db, kb.id, doc.id, list(zip(ids, texts)))
+                add_document_chunks(db, kb.id, doc.id, len(point_ids), ids, hashes)
+            point_ids.extend(ids)
+            n_new += len(new)
+        if pending is not None:
+            kept_changed |= pending.result()
+    return point_ids, n_new, kept_changed
+
+
+def _mean_chunk_length(chunks: list[str]) -> float:
+    """Average terms per chunk; BM25 avgdl for the first document of a KB."""
+    if not chunks:
+        return 0.0
+    return sum(sum(term_frequencies(c).values()) for c in chunks) / len(chunks)
+
+
+def _stage_seconds(timings: dict[str, float], started: float) -> dict[str, float]:
+    seconds = dict(timings)
+    if "chunk" in seconds:
+        seconds["chunk"] = max(0.0, seconds["chunk"] - seconds.get("extract", 0.0))
+    seconds["total"] = time.perf_counter() - started
+    return seconds
 
 
 def run_ingest(document_id: str) -> None:
     db = SessionLocal()
+    # Stage durations for /metrics: extract, chunk, embed, keywords, upsert, index, total
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
     try:
         doc = db.query(Document).filter(Document.id == document_id).first()
         if not doc:
@@ -32,12 +218,21 @@ def run_ingest(document_id: str) -> None:
         doc.status = DocumentStatus.PROCESSING
         db.commit()
 
-        kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == doc.knowledge_base_id).first()
+        # FOR SHARE waits for a hybrid migration switching the KB's collection (workers/maintenance.py), so the
+        # name read here is never one about to be dropped; committing releases the lock for the rest of the run
+        kb = (
+            db.query(KnowledgeBase)
+            .filter(KnowledgeBase.id == doc.knowledge_base_id)
+            .with_for_update(read=True)
+            .first()
+        )
         if not kb:
             doc.status = DocumentStatus.FAILED
             doc.error_message = "Knowledge base not found"
             db.commit()
             return
+        collection_name = kb.qdrant_collection_name
+        db.commit()
 
         # Resolve full path for file uploads
         if doc.source_type == "file" and doc.storage_path:
@@ -55,62 +250,91 @@ def run_ingest(document_id: str) -> None:
             db.commit()
             return
 
-        text = extract_text_from_file(full_path)
-        if not text.strip():
-            doc.status = DocumentStatus.COMPLETED
-            doc.error_message = None
-            db.commit()
-            return
+        if not doc.content_hash:
+            doc.content_hash = file_sha256(full_path)
 
-        # Chunking: full effective config (document can override)
-        effective = resolve_effective_config(doc.config, kb.config)
-        strategy = effective.get("chunk_strategy") or "fixed"
-        chunk_size = effective.get("chunk_size") or 512
-        chunk_overlap = effective.get("chunk_overlap") or 50
-        chunks = chunk_text(text, strategy=strategy, chunk_size=chunk_size, overlap=chunk_overlap)
-        if not chunks:
-            doc.status = DocumentStatus.COMPLETED
-            db.commit()
-            return
+        settings = get_settings()
+        segments = _timed_iter(
+            iter_segments_isolated(
+                full_path,
+                timeout=settings.extraction_timeout_seconds,
+                max_memory_mb=settings.extraction_max_memory_mb,
+                workers=settings.extraction_workers or None,
+                pdf_shard_pages=settings.extraction_pdf_shard_pages,
+            ),
+            timings,
+            "extract",
+        )
 
         # Embedding: KB-level only so one collection = one vector size
         emb_config = resolve_embedding_for_kb(kb.config)
         embedding_model = emb_config.get("embedding_model") or "all-MiniLM-L6-v2"
         vector_size = get_vector_size(embedding_model)
 
+        # Chunking: full effective config (document can override)
+        effective = resolve_effective_config(doc.config, kb.config)
+        strategy = effective.get("chunk_strategy") or "fixed"
+        chunk_size = effective.get("chunk_size") or 512
+        chunk_overlap = effective.get("chunk_overlap") or 50
+        token_limit = bool(effective.get("chunk_token_limit"))
+        tokenizer = None
+        if strategy == "token" or token_limit:
+            # Sized by the embedding model's own tokenizer, so each vector covers its whole chunk
+            tokenizer = get_tokenizer(embedding_model)
+            budget = get_passage_token_budget(embedding_model)
+            if strategy == "token":
+                chunk_size = min(chunk_size, budget)
+        chunks = iter_chunks(
+            segments, strategy=strategy, chunk_size=chunk_size, overlap=chunk_overlap, tokenizer=tokenizer
+        )
+        if token_limit and strategy != "token":
+            chunks = limit_chunk_tokens(chunks, tokenizer, budget)
+        # Includes the extraction it pulls; subtracted below
+        chunks = _timed_iter(chunks, timings, "chunk")
+
         client = get_qdrant()
-        ensure_collection(client, kb.qdrant_collection_name, vector_size=vector_size)
-        delete_points_by_document(client, kb.qdrant_collection_name, doc.id)
-
-        vectors = encode_passages(chunks, model_id=embedding_model)
-
-        points = []
-        for i, (chunk, vec) in enumerate(zip(chunks, vectors)):
-            kw = extract_keywords_from_text(chunk, min_len=2, stop=None)[:MAX_KEYWORDS_PER_CHUNK]
-            points.append(
-                PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=vec,
-                    payload={
-                        "document_id": doc.id,
-                        "chunk_index": i,
-                        "text": chunk,
-                        "source": doc.name,
-                        "keywords": kw,
-                    },
-                )
-            )
-        upsert_points(client, kb.qdrant_collection_name, points)
+        ensure_collection(client, collection_name, vector_size=vector_size)
+        hybrid = is_hybrid_collection(client, collection_name)
+
+        # Incremental: only new chunks are embedded, and only points of chunks that disappeared are deleted
+        existing = document_chunk_points(db, doc.id)
+        point_ids, n_new, kept_changed = _ingest_chunks(
+            db, client, collection_name, kb, doc, chunks, existing, embedding_model, hybrid, timings
+        )
+        # Waits: Qdrant applies updates in order, so every batch above is applied before this returns
+        with _timed(timings, "upsert"):
+            delete_document_points_except(client, collection_name, doc.id, point_ids)
+        # Cached retrievals hold chunk payloads (page, source) too, not only which chunks there are
+        if n_new or kept_changed or len(point_ids) != len(existing):
+            bump_content_version(db, kb.id)
 
         doc.status = DocumentStatus.COMPLETED
         doc.error_message = None
-        db.commit()
+        with _timed(timings, "index"):
+            db.commit()
+        seconds = _stage_seconds(timings, started)
+        record_ingest(kb.id, "completed", seconds, len(point_ids))
+        set_span_attributes(
+            {
+                "document.id": doc.id,
+                "knowledge_base.id": kb.id,
+                "ingest.chunks": len(point_ids),
+                "ingest.new_chunks": n_new,
+                **{f"ingest.{stage}_seconds": value for stage, value in seconds.items()},
+            }
+        )
     except Exception as e:
         if db:
+            # Drop this run's partial keyword index / chunk rows; the previous ones stay
+            db.rollback()
             doc = db.query(Document).filter(Document.id == document_id).first()
             if doc:
                 doc.status = DocumentStatus.FAILED
                 doc.error_message = str(e)[:2000]
+                # Batches written before the failure (new points, kept chunks' payloads) stay in Qdrant until
+                # the next successful run; the old points are only deleted at the end of one
+                bump_content_version(db, doc.knowledge_base_id)
+                record_ingest(doc.knowledge_base_id, "failed", _stage_seconds(timings, started))
             db.commit()
         raise
     finally:
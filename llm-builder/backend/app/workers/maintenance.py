@@ -0,0 +1,124 @@
+"""Maintenance jobs: migrate dense-only Qdrant collections to hybrid (dense + sparse keyword vector)."""
+import uuid
+from collections import defaultdict
+
+from app.db.base import SessionLocal
+from app.models.document import Document, DocumentStatus
+from app.models.knowledge_base import KnowledgeBase
+from app.services.keyword_index import index_document_chunks, kb_index_stats, sparse_document_vector
+from app.services.qdrant_client import (
+    get_qdrant,
+    ensure_collection,
+    is_hybrid_collection,
+    make_point,
+    upsert_points,
+)
+
+MIGRATE_BATCH_SIZE = 256
+
+
+def _scroll(client, collection_name: str, with_vectors: bool):
+    """Yield batches of points (payload always, vectors if asked)."""
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            offset=offset,
+            limit=MIGRATE_BATCH_SIZE,
+            with_payload=True,
+            with_vectors=with_vectors,
+        )
+        if points:
+            yield points
+        if offset is None:
+            break
+
+
+class MigrationConflict(Exception):
+    """Documents of the KB were queued, ingested or changed while its collection was being copied."""
+
+
+def _document_states(db, knowledge_base_id: str) -> dict[str, tuple]:
+    rows = db.query(Document.id, Document.status, Document.updated_at).filter(
+        Document.knowledge_base_id == knowledge_base_id
+    )
+    return {doc_id: (status, updated_at) for doc_id, status, updated_at in rows}
+
+
+def _ingest_active(states: dict[str, tuple]) -> bool:
+    return any(status in (DocumentStatus.PENDING, DocumentStatus.PROCESSING) for status, _ in states.values())
+
+
+def run_migrate_collection(knowledge_base_id: str) -> None:
+    """
+    Copy a KB's dense-only collection into a new hybrid collection (same point ids and payloads, sparse
+    BM25 vectors computed from payload text), switch the KB to it, drop the old one. Also builds the
+    keyword index if the KB predates it. Points written to the old collection after the copy would be lost, so
+    the switch happens only if no document is pending or processing and none changed since the copy started;
+    otherwise the copy is dropped and MigrationConflict raised (retry once ingest is done).
+    """
+    db = SessionLocal()
+    try:
+        kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == knowledge_base_id).first()
+        if not kb:
+            return
+        client = get_qdrant()
+        old_name = kb.qdrant_collection_name
+        if not any(c.name == old_name for c in client.get_collections().collections):
+            return  # never ingested; first ingest creates a hybrid collection
+        if is_hybrid_collection(client, old_name):
+            return
+        states = _document_states(db, kb.id)
+        if _ingest_active(states):
+            raise MigrationConflict("Documents are pending or processing; retry once ingest is done")
+
+        if kb_index_stats(db, kb.id)[0] == 0:
+            by_document = defaultdict(list)
+            for points in _scroll(client, old_name, with_vectors=False):
+                for p in points:
+                    payload = p.payload or {}
+                    if payload.get("document_id") and payload.get("text"):
+                        by_document[payload["document_id"]].append((str(p.id), payload["text"]))
+            for document_id, chunks in by_document.items():
+                index_document_chunks(db, kb.id, document_id, chunks)
+            db.commit()
+        avgdl = kb_index_stats(db, kb.id)[1]
+
+        # Keep the existing dimension: the stored vectors were made with whatever model was configured then
+        vector_size = client.get_collection(old_name).config.params.vectors.size
+        new_name = f"kb_{uuid.uuid4().hex[:16]}"
+        try:
+            ensure_collection(client, new_name, vector_size=vector_size)
+            for points in _scroll(client, old_name, with_vectors=True):
+                upsert_points(
+                    client,
+                    new_name,
+                    [
+                        make_point(
+                            str(p.id),
+                            p.vector,
+                            sparse_document_vector((p.payload or {}).get("text", ""), avgdl),
+                            p.payload or {},
+                        )
+                        for p in points
+                    ],
+                )
+            db.commit()
+            # Row lock until the switch commits: an ingest reads the collection name FOR SHARE (workers/ingest.py),
+            # so one that starts now waits and gets the new collection; one that started earlier shows up here
+            kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == knowledge_base_id).with_for_update().one()
+            current = _document_states(db, kb.id)
+            if _ingest_active(current) or current != states:
+                raise MigrationConflict("Documents changed during the migration; retry once ingest is done")
+            kb.qdrant_collection_name = new_name
+            db.commit()
+        except BaseException:
+            db.rollback()
+            try:
+                client.delete_collection(new_name)
+            except Exception:
+                pass
+            raise
+        client.delete_collection(old_name)
+    finally:
+        db.close()
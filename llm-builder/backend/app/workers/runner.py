@@ -1,20 +1,149 @@
-"""RQ worker runner. Tasks will be added in Phase 2 (ingestion) and Phase 6 (fine-tuning)."""
+"""
+RQ worker runner. Starts one worker process per slot of the worker_pools setting (e.g. two on ingest-small,
+one on ingest-large, one on maintenance, one on training) and restarts any that dies. By default each worker forks
+a work-horse process per job; everything loaded before that (job modules, embedding models in
+worker_preload_embedding_models) is loaded once here, inherited by all workers and work-horses and shared
+copy-on-write, so jobs do not pay for imports and model loads. worker_fork false runs jobs in the worker
+process instead.
+"""
+import gc
+import importlib
+import logging
 import os
+import signal
 import sys
+import time
 
 # Ensure app is on path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from redis import Redis
-from rq import Worker
+from rq import SimpleWorker, Worker
+from rq.job import Job
 
 from app.core.config import get_settings
+from app.core.logging_config import setup_logging
+from app.core.queue import DEFAULT_QUEUE, QUEUES
+from app.core.tracing import flush_tracing, job_span, setup_tracing
 
-def main():
+logger = logging.getLogger(__name__)
+
+# Modules of the functions enqueued on the job queues
+JOB_MODULES = ["app.workers.ingest", "app.workers.maintenance", "app.workers.training"]
+
+
+class TracedJob(Job):
+    """Runs in a span continuing the trace of the request that enqueued it (trace_meta() in job.meta)."""
+
+    def perform(self):
+        try:
+            with job_span(
+                f"rq.job {self.func_name}",
+                self.meta or {},
+                attributes={"messaging.system": "rq", "messaging.message.id": self.id, "rq.queue": self.origin},
+            ):
+                return super().perform()
+        finally:
+            # The work-horse process exits right after the job
+            flush_tracing()
+
+
+def preload(model_ids: list[str]) -> None:
+    """Import the job modules and load the embedding models once, in the worker process."""
+    from app.services.embedding_registry import preload_embedding_models
+
+    started = time.perf_counter()
+    for name in JOB_MODULES:
+        importlib.import_module(name)
+    try:
+        preload_embedding_models(model_ids)
+    except Exception:
+        logger.exception("Could not preload embedding models %s; jobs will load them", model_ids)
+    # Stop tracking what is loaded so far: garbage collections in work-horses would otherwise write to these
+    # objects and copy their pages, one private copy per job
+    gc.freeze()
+    logger.info("Preloaded job modules and embedding models %s in %.1fs", model_ids, time.perf_counter() - started)
+
+
+def parse_worker_pools(spec: str) -> list[tuple[list[str], int]]:
+    """Parse worker_pools: "ingest-small=2 ingest-large,ingest-small" -> [(["ingest-small"], 2), (queues, 1)]."""
+    pools = []
+    for entry in spec.split():
+        names, _, count = entry.partition("=")
+        queues = [q.strip() for q in names.split(",") if q.strip()]
+        unknown = [q for q in queues if q not in QUEUES and q != DEFAULT_QUEUE]
+        if not queues or unknown:
+            raise ValueError(f"Invalid worker pool {entry!r}: queues must be from {', '.join(QUEUES)}")
+        pools.append((queues, int(count or 1)))
+    if not pools:
+        raise ValueError("worker_pools is empty")
+    return pools
+
+
+def work(queues: list[str]) -> None:
+    """One RQ worker taking jobs from queues in order (runs in its own process)."""
     settings = get_settings()
-    redis_conn = Redis.from_url(settings.redis_url)
-    worker = Worker(["default"], connection=redis_conn)
+    # Jobs enqueued before the queues were split are on the old single queue
+    queues = queues + [DEFAULT_QUEUE] if DEFAULT_QUEUE not in queues else queues
+    worker_class = Worker if settings.worker_fork else SimpleWorker
+    worker = worker_class(queues, connection=Redis.from_url(settings.redis_url), job_class=TracedJob)
     worker.work()
 
+
+def supervise(pools: list[tuple[list[str], int]]) -> None:
+    """Run the pools' workers as child processes until SIGTERM / SIGINT, which is passed on to them."""
+    children: dict[int, list[str]] = {}
+    stopping = False
+
+    def start(queues: list[str]) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 1
+            try:
+                work(queues)
+                code = 0
+            except Exception:
+                logger.exception("Worker on %s failed", queues)
+            finally:
+                os._exit(code)
+        children[pid] = queues
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for queues, count in pools:
+        for _ in range(count):
+            start(queues)
+    logger.info("Started %d workers: %s", len(children), list(children.values()))
+    while children:
+        pid, status = os.wait()
+        queues = children.pop(pid, None)
+        if queues is not None and not stopping:
+            logger.warning("Worker on %s exited (code %s); restarting", queues, os.waitstatus_to_exitcode(status))
+            time.sleep(1)
+            start(queues)
+
+
+def main():
+    settings = get_settings()
+    setup_logging(use_json=not settings.debug, level="DEBUG" if settings.debug else "INFO")
+    setup_tracing("llm-builder-worker")
+    pools = parse_worker_pools(settings.worker_pools)
+    preload([m.strip() for m in settings.worker_preload_embedding_models.split(",") if m.strip()])
+    if len(pools) == 1 and pools[0][1] == 1:
+        work(pools[0][0])
+    else:
+        supervise(pools)
+
 if __name__ == "__main__":
     main()
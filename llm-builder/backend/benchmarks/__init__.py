@@ -0,0 +1,2 @@
+"""Offline benchmarks for the backend. Run from backend/, e.g. `python -m benchmarks.retrieval --help`.
+Results are written as JSON (benchmarks/results/ by default) and compared with `python -m benchmarks.compare`."""
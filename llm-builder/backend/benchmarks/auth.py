@@ -0,0 +1,187 @@
+"""
+Auth benchmark: per-request cost of resolving the caller (core/deps.get_current_user), with and without the
+principal cache (core/auth_cache).
+
+    python -m benchmarks.auth --requests 2000
+    python -m benchmarks.auth --users 50 --concurrency 8
+
+Creates --users temporary users, each with an API key, in DATABASE_URL (removed afterwards), then resolves
+--requests requests round-robin over them, the way FastAPI does: a session per request (get_db) and
+get_current_user in a pool of --concurrency threads. Per credential (bearer JWT, X-API-Key) and mode:
+  uncached  AUTH_CACHE_TTL_SECONDS=0, every request queries users (and api_keys)
+  cached    the default cache, started empty; the first request per user (and key) misses
+It reports latency, SQL statements per request and the cache hit rate. The invalidation listener is not
+started, so no Redis is needed. Compare runs with `python -m benchmarks.compare`.
+"""
+import argparse
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+
+from app.core import auth_cache
+from app.core.api_key_auth import create_api_key_secret, hash_key, key_prefix
+from app.core.config import get_settings
+from app.core.deps import get_current_user
+from app.core.security import create_access_token, get_password_hash
+from app.db.base import SessionLocal, engine
+from app.models.audit import ApiKey
+from app.models.user import Role, User
+from benchmarks.common import latency_summary, write_results
+
+CREDENTIALS = ["bearer", "api_key"]
+MODES = ["uncached", "cached"]
+
+
+class _StatementCounter:
+    """SQL statements executed on the sync engine, from any thread."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args) -> None:
+        with self._lock:
+            self.count += 1
+
+    def close(self) -> None:
+        event.remove(engine, "before_cursor_execute", self._on_execute)
+
+
+def _create_principals(n: int) -> list[dict]:
+    """n users with an access token and an API key each."""
+    hashed_password = get_password_hash(uuid.uuid4().hex)
+    principals = []
+    db = SessionLocal()
+    try:
+        for i in range(n):
+            user_id = str(uuid.uuid4())
+            secret = create_api_key_secret()
+            db.add(
+                User(
+                    id=user_id,
+                    email=f"bench-auth-{user_id}@example.invalid",
+                    hashed_password=hashed_password,
+                    full_name=f"Auth benchmark {i}",
+                    role=Role.USER,
+                    is_active=True,
+                )
+            )
+            db.add(
+                ApiKey(
+                    id=str(uuid.uuid4()),
+                    user_id=user_id,
+                    name="auth benchmark",
+                    key_hash=hash_key(secret),
+                    key_prefix=key_prefix(secret),
+                )
+            )
+            principals.append({"user_id": user_id, "token": create_access_token(user_id), "api_key": secret})
+        db.commit()
+    finally:
+        db.close()
+    return principals
+
+
+def _delete_principals(principals: list[dict]) -> None:
+    user_ids = [p["user_id"] for p in principals]
+    db = SessionLocal()
+    try:
+        db.query(ApiKey).filter(ApiKey.user_id.in_(user_ids)).delete(synchronize_session=False)
+        db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _request(credential: str, principal: dict) -> float:
+    """One request's authentication, session included (as get_db opens and closes it)."""
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        if credential == "bearer":
+            bearer = HTTPAuthorizationCredentials(scheme="Bearer", credentials=principal["token"])
+            user = get_current_user(db, bearer, None)
+        else:
+            user = get_current_user(db, None, principal["api_key"])
+    finally:
+        db.close()
+    if user.id != principal["user_id"]:
+        raise SystemExit(f"resolved {user.id}, expected {principal['user_id']}")
+    return time.perf_counter() - started
+
+
+def run_mode(credential: str, mode: str, principals: list[dict], counter: _StatementCounter, args) -> dict:
+    settings = get_settings()
+    settings.auth_cache_ttl_seconds = 0 if mode == "uncached" else args.ttl
+    auth_cache.clear()
+    statements = counter.count
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        samples = list(pool.map(lambda i: _request(credential, principals[i % len(principals)]), range(args.requests)))
+    result = latency_summary(samples, time.perf_counter() - started)
+    result["statements_per_request"] = round((counter.count - statements) / args.requests, 3)
+    stats = auth_cache.auth_cache_stats()
+    lookups = sum(stats[c]["hits"] + stats[c]["misses"] for c in ("user", "api_key"))
+    hits = sum(stats[c]["hits"] for c in ("user", "api_key"))
+    result["cache_hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+    return result
+
+
+def _print_report(results: dict) -> None:
+    print(f"{'credential/mode':<20}{'p50 ms':>10}{'p95 ms':>10}{'req/s':>11}{'SQL/req':>9}{'hit rate':>10}")
+    for name, s in results["stages"].items():
+        print(
+            f"{name:<20}{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}{s['throughput_per_s']:>11.1f}"
+            f"{s['statements_per_request']:>9.2f}{s['cache_hit_rate']:>10.1%}"
+        )
+
+
+def main(args) -> None:
+    principals = _create_principals(args.users)
+    counter = _StatementCounter()
+    stages = {}
+    try:
+        # Warm the connection pool and imports so the first mode is not charged for them
+        for credential in args.credentials:
+            _request(credential, principals[0])
+        for credential in args.credentials:
+            for mode in args.modes:
+                stages[f"{credential}/{mode}"] = run_mode(credential, mode, principals, counter, args)
+    finally:
+        counter.close()
+        _delete_principals(principals)
+    results = {"stages": stages}
+    _print_report(results)
+    params = {k: v for k, v in vars(args).items() if k != "out"}
+    params["database"] = engine.url.get_backend_name()
+    print("results:", write_results("auth", params, results, args.out))
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--requests", type=int, default=2000, help="requests per credential and mode")
+    p.add_argument("--users", type=int, default=10, help="distinct principals, used round-robin")
+    p.add_argument("--concurrency", type=int, default=1, help="threads resolving requests at once")
+    p.add_argument("--ttl", type=float, default=30.0, help="cache TTL in the cached mode")
+    p.add_argument(
+        "--credentials",
+        type=lambda s: s.split(","),
+        default=CREDENTIALS,
+        help=f"comma-separated, of {','.join(CREDENTIALS)}",
+    )
+    p.add_argument("--modes", type=lambda s: s.split(","), default=MODES, help=f"comma-separated, of {','.join(MODES)}")
+    p.add_argument("--out", default=None, help="result JSON path (default benchmarks/results/)")
+    args = p.parse_args(argv)
+    unknown = [v for v in args.credentials + args.modes if v not in CREDENTIALS + MODES]
+    if unknown:
+        p.error(f"unknown credentials or modes: {', '.join(unknown)}")
+    return args
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,97 @@
+"""Shared helpers: latency statistics and JSON result files."""
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0..100) of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def latency_summary(seconds: list[float], wall_seconds: float | None = None) -> dict:
+    """p50/p95/p99/mean/max in milliseconds, and throughput (per second of wall time, or of summed latency)."""
+    values = sorted(seconds)
+    total = wall_seconds if wall_seconds is not None else sum(values)
+    return {
+        "n": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+        "throughput_per_s": round(len(values) / total, 3) if total > 0 else 0.0,
+    }
+
+
+class Timings:
+    """Named lists of durations: `with timings.measure("stage"): ...`."""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.samples.setdefault(name, []).append(seconds)
+
+    def measure(self, name: str) -> "_Measure":
+        return _Measure(self, name)
+
+    def summary(self) -> dict:
+        return {name: latency_summary(values) for name, values in self.samples.items()}
+
+
+class _Measure:
+    def __init__(self, timings: Timings, name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.add(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+            cwd=os.path.dirname(__file__),
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def write_results(benchmark: str, params: dict, results: dict, out_path: str | None = None) -> str:
+    """Write {benchmark, timestamp, git_commit, host, params, results} as JSON. Returns the path."""
+    now = datetime.now(timezone.utc)
+    if not out_path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out_path = os.path.join(RESULTS_DIR, f"{benchmark}-{now.strftime('%Y%m%dT%H%M%SZ')}.json")
+    doc = {
+        "benchmark": benchmark,
+        "timestamp": now.isoformat(),
+        "git_commit": _git_commit(),
+        "host": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "params": params,
+        "results": results,
+    }
+    with open(out_path, "w") as f:
+        json.dump(doc, f, indent=2)
+    return out_path
@@ -0,0 +1,68 @@
+"""
+Compare two benchmark result files (same benchmark):
+
+    python -m benchmarks.compare benchmarks/results/retrieval-A.json benchmarks/results/retrieval-B.json
+
+Prints the per-stage metrics of both runs (latency percentiles and throughput for retrieval, worker and auth,
+plus work-horse USS for worker and SQL statements per request for auth; seconds, chunks/s, MB/s and peak RSS
+for ingest) with the relative change, plus any recall figures. Exits non-zero if a stage's p95 (ingest: seconds)
+regressed by more than --max-regression percent.
+"""
+import argparse
+import json
+import sys
+
+METRICS = [
+    "p50_ms", "p95_ms", "p99_ms", "throughput_per_s", "seconds", "chunks_per_s", "mb_per_s", "peak_rss_mb", "uss_mb",
+    "statements_per_request",
+]
+
+
+def _change(old: float, new: float) -> str:
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def compare(old: dict, new: dict, max_regression: float | None = None) -> bool:
+    """Print the comparison; False if p95 (or seconds) of some stage regressed beyond max_regression percent."""
+    ok = True
+    old_stages = old["results"].get("stages", {})
+    new_stages = new["results"].get("stages", {})
+    print(f"old: {old.get('git_commit')} {old['timestamp']}\nnew: {new.get('git_commit')} {new['timestamp']}")
+    for name in [s for s in old_stages if s in new_stages]:
+        print(f"\n{name}")
+        for metric in [m for m in METRICS if m in old_stages[name] and m in new_stages[name]]:
+            a, b = old_stages[name][metric], new_stages[name][metric]
+            print(f"  {metric:<24}{a:>12.3f}{b:>12.3f}{_change(a, b):>10}")
+        key = "p95_ms" if "p95_ms" in new_stages[name] else "seconds"
+        a, b = old_stages[name].get(key, 0.0), new_stages[name].get(key, 0.0)
+        if max_regression is not None and a and (b - a) / a * 100 > max_regression:
+            ok = False
+    for key in [k for k in new["results"] if k.startswith("recall_at_") and k in old["results"]]:
+        print(f"\n{key}")
+        for name, b in new["results"][key].items():
+            a = old["results"][key].get(name)
+            if a is not None:
+                print(f"  {name:<24}{a:>8.3f}{b:>8.3f}")
+    return ok
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--max-regression", type=float, default=None, help="fail if any p95 (ingest: seconds) grew by more than this %%")
+    args = p.parse_args(argv)
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if old.get("benchmark") != new.get("benchmark"):
+        print(f"different benchmarks: {old.get('benchmark')} vs {new.get('benchmark')}", file=sys.stderr)
+        return 2
+    return 0 if compare(old, new, args.max_regression) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Synthetic, labelled corpus. Chunk i is generated on demand from (seed, i), so even 1M-chunk corpora need no
+fixture files or memory: every chunk states one fact about a unique entity, surrounded by topic filler, and
+a labelled query asks for that fact, so its relevant chunk is known exactly.
+"""
+import random
+import zlib
+
+import numpy as np
+
+from app.services.keywords import term_frequencies
+
+SYLLABLES = [
+    "ka", "lo", "mi", "ra", "ven", "tor", "shi", "qu", "den", "pal", "zu", "ber", "nix", "sol", "tra", "gor",
+]
+ATTRIBUTES = [
+    "capacity", "latency", "voltage", "budget", "owner", "region", "version", "temperature", "threshold",
+    "quota", "priority", "lifetime", "weight", "frequency", "margin", "deadline",
+]
+UNITS = ["units", "ms", "volts", "credits", "nodes", "percent", "hours", "kg", "mhz", "days"]
+FILLER = (
+    "the system process value result report service during after before under within between should could "
+    "would normally usually reviewed measured configured expected updated monitored described recorded"
+).split()
+WORDS_PER_TOPIC = 40
+FILLER_SENTENCES = 6
+
+
+def _syllable_word(n: int, min_len: int = 3) -> str:
+    """Unique pronounceable word for n (base-16 over SYLLABLES)."""
+    parts = []
+    while n or len(parts) < min_len:
+        n, d = divmod(n, len(SYLLABLES))
+        parts.append(SYLLABLES[d])
+    return "".join(parts)
+
+
+class SyntheticCorpus:
+    def __init__(self, n_chunks: int, seed: int = 0):
+        self.n_chunks = n_chunks
+        self.seed = seed
+        self.n_topics = max(10, n_chunks // 1000)
+
+    def _rng(self, i: int, stream: int) -> random.Random:
+        return random.Random((self.seed * 1_000_003 + i) * 2 + stream)
+
+    def _topic_words(self, topic: int) -> list[str]:
+        return [_syllable_word(1_000_000 + topic * WORDS_PER_TOPIC + k, 2) for k in range(WORDS_PER_TOPIC)]
+
+    def fact(self, i: int) -> tuple[str, str, str]:
+        """(entity, attribute, value) stated by chunk i."""
+        rng = self._rng(i, 0)
+        entity = _syllable_word(i, 4)
+        attribute = rng.choice(ATTRIBUTES)
+        value = f"{rng.randint(1, 99_999)} {rng.choice(UNITS)}"
+        return entity, attribute, value
+
+    def chunk(self, i: int) -> str:
+        entity, attribute, value = self.fact(i)
+        rng = self._rng(i, 1)
+        topic_words = self._topic_words(i % self.n_topics)
+        sentences = []
+        for _ in range(FILLER_SENTENCES):
+            words = rng.sample(topic_words, 4) + rng.sample(FILLER, 4)
+            rng.shuffle(words)
+            sentences.append(" ".join(words).capitalize() + ".")
+        sentences.insert(rng.randint(0, len(sentences)), f"The {attribute} of {entity} is {value}.")
+        return " ".join(sentences)
+
+    def query(self, i: int) -> str:
+        entity, attribute, _ = self.fact(i)
+        return f"What is the {attribute} of {entity}?"
+
+    def sample_queries(self, n: int) -> list[tuple[str, int]]:
+        """n labelled queries: (question, index of the one relevant chunk)."""
+        rng = random.Random(self.seed + 7)
+        targets = rng.sample(range(self.n_chunks), min(n, self.n_chunks))
+        return [(self.query(i), i) for i in targets]
+
+
+class HashEmbedder:
+    """
+    Deterministic bag-of-words embedding (feature hashing with signed buckets, log-scaled tf, L2-normalized).
+    No model download and microseconds per text, yet texts sharing terms are close, so dense recall is meaningful.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for term, n in term_frequencies(text).items():
+                h = zlib.crc32(term.encode("utf-8"))
+                out[row, h % self.dim] += (1.0 if (h >> 16) & 1 else -1.0) * (1.0 + np.log(n))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+    def encode_query(self, text: str, model_id: str | None = None, query_prefix: str | None = None) -> list[float]:
+        """Drop-in for embedding_registry.encode_query."""
+        return self.encode([text])[0].tolist()
+
+
+class ModelEmbedder:
+    """The real sentence-transformers model, through the same functions ingest and RAG use."""
+
+    def __init__(self, model_id: str):
+        from app.services.embedding_registry import encode_passages, get_vector_size
+
+        self.model_id = model_id
+        self.dim = get_vector_size(model_id)
+        self._encode_passages = encode_passages
+
+    def encode(self, texts: list[str]):
+        return self._encode_passages(texts, model_id=self.model_id)
@@ -0,0 +1,112 @@
+"""
+Fixture corpus for the ingest benchmark: the same synthetic text (benchmarks.corpus) written as .txt, .html,
+.docx and .pdf files of a given size, so file types can be compared on equal content.
+"""
+import html
+import os
+
+from benchmarks.corpus import SyntheticCorpus
+
+FILE_TYPES = ["txt", "html", "docx", "pdf"]
+PDF_LINES_PER_PAGE = 50
+PDF_CHARS_PER_LINE = 95
+
+
+def _paragraphs(size_bytes: int, seed: int) -> list[str]:
+    corpus = SyntheticCorpus(n_chunks=10**9, seed=seed)
+    out, total, i = [], 0, 0
+    while total < size_bytes:
+        text = corpus.chunk(i)
+        out.append(text)
+        total += len(text) + 2
+        i += 1
+    return out
+
+
+def _wrap(text: str, width: int) -> list[str]:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def write_pdf(path: str, paragraphs: list[str]) -> None:
+    """Minimal text PDF (Helvetica, one content stream per page) that pypdf extracts; no writer dependency."""
+    lines = []
+    for p in paragraphs:
+        lines.extend(_wrap(p, PDF_CHARS_PER_LINE))
+        lines.append("")
+    pages = [lines[i : i + PDF_LINES_PER_PAGE] for i in range(0, len(lines), PDF_LINES_PER_PAGE)]
+    n = len(pages)
+    # Objects: 1 catalog, 2 pages, 3 font, then (page, content) pairs
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids ["
+        + b" ".join(f"{4 + 2 * k} 0 R".encode() for k in range(n))
+        + f"] /Count {n} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for k, page in enumerate(pages):
+        ops = ["BT /F1 10 Tf 12 TL 40 770 Td"]
+        for line in page:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({escaped}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", errors="replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {5 + 2 * k} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for num, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(f"{num} 0 obj\n".encode() + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+        for off in offsets:
+            f.write(f"{off:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+def write_fixture(path: str, file_type: str, paragraphs: list[str]) -> None:
+    if file_type == "txt":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n\n".join(paragraphs))
+    elif file_type == "html":
+        body = "\n".join(f"<p>{html.escape(p)}</p>" for p in paragraphs)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"<html><head><title>fixture</title></head><body>\n{body}\n</body></html>")
+    elif file_type == "docx":
+        import docx
+
+        document = docx.Document()
+        for p in paragraphs:
+            document.add_paragraph(p)
+        document.save(path)
+    elif file_type == "pdf":
+        write_pdf(path, paragraphs)
+    else:
+        raise ValueError(f"Unsupported fixture type: {file_type}")
+
+
+def generate_corpus(directory: str, size_mb: float, file_types: list[str], seed: int = 0) -> list[str]:
+    """One file per type with about size_mb of text each (files are reused if present). Returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paragraphs = None
+    paths = []
+    for file_type in file_types:
+        path = os.path.join(directory, f"fixture-{size_mb:g}mb-seed{seed}.{file_type}")
+        if not os.path.exists(path):
+            paragraphs = paragraphs or _paragraphs(int(size_mb * 1024 * 1024), seed)
+            write_fixture(path, file_type, paragraphs)
+        paths.append(path)
+    return paths
@@ -0,0 +1,242 @@
+"""
+Ingest benchmark: throughput and memory of each stage of run_ingest (workers/ingest.py), per file type and
+chunk strategy.
+
+    python -m benchmarks.ingest --size-mb 5
+    python -m benchmarks.ingest --corpus ~/docs --strategies fixed,recursive --embedder hash --profile sample
+
+Files come from --corpus (every .pdf/.docx/.txt/.md/.html/... in it) or, by default, generated fixtures
+(benchmarks.fixtures: the same synthetic text as .txt, .html, .docx and .pdf, --size-mb each). Each file is
+extracted once and then, for every strategy, run through the worker's stages one after the other:
+  extract   iter_segments in-process (--isolated: iter_segments_isolated, the worker's child processes)
+  chunk     iter_chunks with --chunk-size / --overlap
+  keywords  payload keywords, BM25 term frequencies (keyword index rows) and the sparse vector
+  embed     passages in ingest_embed_batch_size batches (--embedder model, or hash: no model at all)
+  upsert    make_point + upsert_points (waiting) into a throwaway hybrid collection, in-memory by default
+Stages run back to back rather than overlapped as in the worker, so each one is measured on its own. Per
+stage it reports seconds, chunks/s, MB/s of source file and peak RSS, sampled by a background thread (with
+--isolated, extraction children's peak is reported separately). --profile cprofile writes a .prof (snakeviz,
+pstats), --profile sample a folded-stacks file for flamegraph.pl or speedscope, each next to the result JSON
+in benchmarks/results/. Compare two runs with `python -m benchmarks.compare old.json new.json`.
+"""
+import argparse
+import os
+import tempfile
+import uuid
+
+from app.core.config import get_settings
+from app.services.document_chunks import chunk_hash, chunk_point_ids
+from app.services.document_parser import CHUNK_STRATEGIES, iter_chunks, iter_segments, iter_segments_isolated
+from app.services.keyword_index import sparse_document_vector
+from app.services.keywords import extract_keywords_from_text, term_frequencies
+from app.services.qdrant_client import ensure_collection, make_point, upsert_points
+from app.workers.ingest import MAX_KEYWORDS_PER_CHUNK, _batched, _mean_chunk_length
+from benchmarks.common import write_results
+from benchmarks.corpus import HashEmbedder, ModelEmbedder
+from benchmarks.fixtures import FILE_TYPES, generate_corpus
+from benchmarks.profiling import StageMonitor, children_peak_rss_bytes
+
+SUPPORTED_SUFFIXES = {".pdf", ".docx", ".txt", ".md", ".html", ".htm"}
+STAGES = ["extract", "chunk", "keywords", "embed", "upsert"]
+MB = 1024 * 1024
+
+
+def _corpus_files(args) -> list[str]:
+    if args.corpus:
+        files = []
+        for root, _, names in os.walk(args.corpus):
+            files.extend(
+                os.path.join(root, n) for n in sorted(names) if os.path.splitext(n)[1].lower() in SUPPORTED_SUFFIXES
+            )
+        return files
+    directory = args.fixtures_dir or os.path.join(tempfile.gettempdir(), "llm-builder-ingest-fixtures")
+    return generate_corpus(directory, args.size_mb, args.types.split(","), seed=args.seed)
+
+
+def _extract(path: str, args) -> list[tuple[int | None, str]]:
+    if args.isolated:
+        settings = get_settings()
+        return list(
+            iter_segments_isolated(
+                path,
+                timeout=settings.extraction_timeout_seconds,
+                max_memory_mb=settings.extraction_max_memory_mb,
+                workers=settings.extraction_workers or None,
+                pdf_shard_pages=settings.extraction_pdf_shard_pages,
+            )
+        )
+    return list(iter_segments(path))
+
+
+def _keywords(texts: list[str]) -> list[tuple[list[str], dict, object]]:
+    avgdl = _mean_chunk_length(texts)
+    return [
+        (
+            extract_keywords_from_text(text, min_len=2, stop=None)[:MAX_KEYWORDS_PER_CHUNK],
+            term_frequencies(text),
+            sparse_document_vector(text, avgdl),
+        )
+        for text in texts
+    ]
+
+
+def _upsert(client, collection_name: str, doc_id: str, model_id: str, chunks, keywords, vectors, batch_size: int):
+    seen: dict[str, int] = {}
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start : start + batch_size]
+        hashes = [chunk_hash(text) for text, _ in batch]
+        ids = chunk_point_ids(doc_id, model_id, hashes, seen)
+        points = []
+        for j, ((text, page), point_id, h) in enumerate(zip(batch, ids, hashes)):
+            kw, _, sparse = keywords[start + j]
+            payload = {"document_id": doc_id, "chunk_index": start + j, "text": text, "keywords": kw, "content_hash": h}
+            if page is not None:
+                payload["page"] = page
+            points.append(make_point(point_id, vectors[start + j], sparse, payload, hybrid=True))
+        upsert_points(client, collection_name, points, wait=True)
+
+
+def _stage_result(seconds: float, n_chunks: int | None, n_bytes: int, peak_rss: int) -> dict:
+    """n_chunks None for extraction, which runs before chunking."""
+    result = {"seconds": round(seconds, 4)}
+    if n_chunks is not None:
+        result["chunks_per_s"] = round(n_chunks / seconds, 1) if seconds else 0.0
+    result["mb_per_s"] = round(n_bytes / MB / seconds, 3) if seconds else 0.0
+    result["peak_rss_mb"] = round(peak_rss / MB, 1)
+    return result
+
+
+def run(args, files: list[str], embedder, client, collection_name: str, monitor: StageMonitor) -> dict:
+    settings = get_settings()
+    batch_size = max(1, settings.ingest_embed_batch_size)
+    tokenizer = None
+    if "token" in args.strategies:
+        from app.services.embedding_registry import get_tokenizer
+
+        tokenizer = get_tokenizer(args.embedding_model)
+    model_id = getattr(embedder, "model_id", "hash")
+    # Totals over all files of a type, and per (file type, strategy)
+    extracted: dict[str, dict] = {}
+    totals: dict[tuple[str, str], dict] = {}
+    for path in files:
+        file_type = os.path.splitext(path)[1].lstrip(".").lower()
+        n_bytes = os.path.getsize(path)
+        with monitor.stage(f"{file_type}/extract"):
+            segments = _extract(path, args)
+        print(f"{os.path.basename(path)}: {n_bytes / MB:.2f} MB, {len(segments)} segments")
+        type_total = extracted.setdefault(file_type, {"files": 0, "bytes": 0, "segments": 0})
+        type_total["files"] += 1
+        type_total["bytes"] += n_bytes
+        type_total["segments"] += len(segments)
+        for strategy in args.strategies:
+            prefix = f"{file_type}/{strategy}"
+            with monitor.stage(f"{prefix}/chunk"):
+                chunks = list(
+                    iter_chunks(
+                        segments,
+                        strategy=strategy,
+                        chunk_size=args.chunk_size,
+                        overlap=args.overlap,
+                        tokenizer=tokenizer,
+                    )
+                )
+            texts = [text for text, _ in chunks]
+            with monitor.stage(f"{prefix}/keywords"):
+                keywords = _keywords(texts)
+            with monitor.stage(f"{prefix}/embed"):
+                vectors = []
+                for batch in _batched(texts, batch_size):
+                    vectors.extend(embedder.encode(batch))
+            with monitor.stage(f"{prefix}/upsert"):
+                _upsert(client, collection_name, str(uuid.uuid4()), model_id, chunks, keywords, vectors, batch_size)
+            total = totals.setdefault((file_type, strategy), {"bytes": 0, "chunks": 0})
+            total["bytes"] += n_bytes
+            total["chunks"] += len(chunks)
+
+    stages = {}
+    for file_type, total in extracted.items():
+        name = f"{file_type}/extract"
+        stages[name] = _stage_result(monitor.seconds[name], None, total["bytes"], monitor.peak_rss.get(name, 0))
+    for (file_type, strategy), total in totals.items():
+        for stage in STAGES[1:]:
+            name = f"{file_type}/{strategy}/{stage}"
+            stages[name] = _stage_result(
+                monitor.seconds[name], total["chunks"], total["bytes"], monitor.peak_rss.get(name, 0)
+            )
+    results = {
+        "stages": stages,
+        "files": extracted,
+        "chunks": {f"{t}/{s}": total["chunks"] for (t, s), total in totals.items()},
+    }
+    if args.isolated:
+        results["extract_children_peak_rss_mb"] = round(children_peak_rss_bytes() / MB, 1)
+    return results
+
+
+def _print_report(results: dict) -> None:
+    print(f"{'file/strategy/stage':<32}{'seconds':>10}{'chunks/s':>12}{'MB/s':>10}{'peak RSS MB':>13}")
+    for name, s in results["stages"].items():
+        print(
+            f"{name:<32}{s['seconds']:>10.3f}{s.get('chunks_per_s', float('nan')):>12.1f}"
+            f"{s['mb_per_s']:>10.2f}{s['peak_rss_mb']:>13.1f}"
+        )
+    if "extract_children_peak_rss_mb" in results:
+        print(f"extraction children peak RSS: {results['extract_children_peak_rss_mb']} MB")
+
+
+def main(args) -> None:
+    from qdrant_client import QdrantClient
+
+    files = _corpus_files(args)
+    if not files:
+        raise SystemExit("no supported files in the corpus")
+    embedder = HashEmbedder() if args.embedder == "hash" else ModelEmbedder(args.embedding_model)
+    client = QdrantClient(url=args.qdrant_url) if args.qdrant_url else QdrantClient(location=":memory:")
+    collection_name = f"bench_{uuid.uuid4().hex[:12]}"
+    ensure_collection(client, collection_name, vector_size=embedder.dim)
+    try:
+        with StageMonitor(profile=args.profile) as monitor:
+            results = run(args, files, embedder, client, collection_name, monitor)
+    finally:
+        client.delete_collection(collection_name)
+        client.close()
+    _print_report(results)
+    params = {k: v for k, v in vars(args).items() if k != "out"}
+    params["files"] = [os.path.basename(f) for f in files]
+    out = write_results("ingest", params, results, args.out)
+    print("results:", out)
+    profile = monitor.write_profile(os.path.splitext(out)[0])
+    if profile:
+        print("profile:", profile)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--corpus", default=None, help="directory of documents; default: generated fixtures")
+    p.add_argument("--types", default=",".join(FILE_TYPES), help="fixture file types to generate")
+    p.add_argument("--size-mb", type=float, default=2.0, help="text per generated fixture file")
+    p.add_argument("--fixtures-dir", default=None, help="where fixtures are generated and reused (default: tmp)")
+    p.add_argument(
+        "--strategies",
+        type=lambda s: s.split(","),
+        default=[s for s in CHUNK_STRATEGIES if s != "token"],
+        help=f"comma-separated, of {','.join(CHUNK_STRATEGIES)} (token loads the model's tokenizer)",
+    )
+    p.add_argument("--chunk-size", type=int, default=512)
+    p.add_argument("--overlap", type=int, default=50)
+    p.add_argument("--isolated", action="store_true", help="extract in child processes like the worker")
+    p.add_argument("--embedder", choices=["hash", "model"], default="model", help="hash: skip the model")
+    p.add_argument("--embedding-model", default="all-MiniLM-L6-v2")
+    p.add_argument("--qdrant-url", default=None, help="Qdrant server; default is an in-memory stand-in")
+    p.add_argument("--profile", choices=["cprofile", "sample"], default=None, help="also write a profile")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", default=None, help="result JSON path (default benchmarks/results/)")
+    args = p.parse_args(argv)
+    unknown = [s for s in args.strategies if s not in CHUNK_STRATEGIES]
+    if unknown:
+        p.error(f"unknown strategies: {', '.join(unknown)}")
+    return args
+
+
+if __name__ == "__main__":
+    main(parse_args())
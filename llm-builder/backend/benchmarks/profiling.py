@@ -0,0 +1,143 @@
+"""
+Stage monitor for benchmarks: wall time and peak RSS per named stage, sampled by a background thread, plus
+optional profiles: cProfile (.prof, for snakeviz / pstats) or a sampling profiler that writes folded stacks
+("stage;file:function;... count" lines, the py-spy / flamegraph.pl / speedscope input format).
+"""
+import cProfile
+import os
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+
+SAMPLE_INTERVAL = 0.005
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_bytes() -> int:
+    """Resident set size now (Linux /proc), else the process peak so far."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def children_peak_rss_bytes() -> int:
+    """Largest peak RSS of any finished child process (e.g. isolated extraction)."""
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def shared_memory_split() -> dict[str, int]:
+    """
+    uss (pages only this process maps) and pss (shared pages divided among their sharers) in bytes, from
+    /proc/self/smaps_rollup (Linux); empty elsewhere.
+    """
+    fields = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in ("Pss", "Private_Clean", "Private_Dirty"):
+                    fields[name] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        return {}
+    return {"uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0), "pss": fields.get("Pss", 0)}
+
+
+class StageMonitor:
+    """
+    `with monitor.stage("embed"): ...` records seconds and peak RSS of the stage; stages may repeat and are
+    accumulated. profile: None, "cprofile" or "sample".
+    """
+
+    def __init__(self, profile: str | None = None, interval: float = SAMPLE_INTERVAL):
+        self.profile = profile
+        self.interval = interval
+        self.seconds: dict[str, float] = {}
+        self.peak_rss: dict[str, int] = {}
+        self.stacks: Counter = Counter()
+        self._stage: str | None = None
+        self._stop = threading.Event()
+        self._main_thread = threading.main_thread().ident
+        self._profiler = cProfile.Profile() if profile == "cprofile" else None
+        self._thread = threading.Thread(target=self._run, name="stage-monitor", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            stage = self._stage
+            if stage is None:
+                continue
+            rss = current_rss_bytes()
+            if rss > self.peak_rss.get(stage, 0):
+                self.peak_rss[stage] = rss
+            if self.profile == "sample":
+                frame = sys._current_frames().get(self._main_thread)
+                if frame is not None:
+                    self.stacks[stage + ";" + _folded(frame)] += 1
+
+    def stage(self, name: str) -> "_Stage":
+        return _Stage(self, name)
+
+    def write_profile(self, path_without_suffix: str) -> str | None:
+        """Write the collected profile; returns its path (None if profiling was off)."""
+        if self._profiler is not None:
+            path = path_without_suffix + ".prof"
+            self._profiler.dump_stats(path)
+            return path
+        if self.profile == "sample":
+            path = path_without_suffix + ".folded"
+            with open(path, "w") as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            return path
+        return None
+
+
+class _Stage:
+    def __init__(self, monitor: StageMonitor, name: str):
+        self.monitor = monitor
+        self.name = name
+
+    def __enter__(self):
+        m = self.monitor
+        m._stage = self.name
+        rss = current_rss_bytes()
+        m.peak_rss[self.name] = max(m.peak_rss.get(self.name, 0), rss)
+        if m._profiler is not None:
+            m._profiler.enable()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        m = self.monitor
+        elapsed = time.perf_counter() - self.started
+        if m._profiler is not None:
+            m._profiler.disable()
+        m.seconds[self.name] = m.seconds.get(self.name, 0.0) + elapsed
+        m.peak_rss[self.name] = max(m.peak_rss.get(self.name, 0), current_rss_bytes())
+        m._stage = None
+        return False
+
+
+def _folded(frame) -> str:
+    """Root-to-leaf "file:function" frames joined by ';'."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
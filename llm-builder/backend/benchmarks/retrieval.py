@@ -0,0 +1,286 @@
+"""
+Retrieval benchmark: latency, throughput and recall of the RAG path in services/rag.py on a synthetic KB.
+
+    python -m benchmarks.retrieval --chunks 10000 --queries 200
+    python -m benchmarks.retrieval --chunks 1000000 --qdrant-url http://localhost:6333 --layout dense
+
+Loads --chunks labelled chunks (benchmarks.corpus) into a throwaway Qdrant collection, in-memory by default
+(fine up to ~100k chunks) or on a real server with --qdrant-url. Per query it times the retrieval stages of the
+chosen collection layout:
+  hybrid  _hybrid_retrieval (dense + sparse BM25 in one query), then _merge_and_take_top_k
+  dense   _keyword_retrieval (KB inverted index in DATABASE_URL) and _vector_retrieval, then the merge
+and finally run_rag end to end with a stubbed LLM (--concurrency requests in flight). recall@k is the share of
+queries whose labelled chunk is among the top_k results. The Redis retrieval cache is off. Results go to
+benchmarks/results/ as JSON; compare two runs with `python -m benchmarks.compare old.json new.json`.
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+# Measure retrieval itself, not the Redis result cache (read when settings are first loaded)
+os.environ.setdefault("RETRIEVAL_CACHE_TTL", "0")
+
+from qdrant_client import AsyncQdrantClient  # noqa: E402
+from qdrant_client.models import Distance, SparseVectorParams, Modifier, VectorParams  # noqa: E402
+
+from app.services import rag  # noqa: E402
+from app.services.keyword_index import sparse_document_vector  # noqa: E402
+from app.services.keywords import extract_keywords_from_text, question_keywords, term_frequencies  # noqa: E402
+from app.services.qdrant_client import DENSE_VECTOR_NAME, SPARSE_VECTOR_NAME, make_point  # noqa: E402
+from benchmarks.common import Timings, latency_summary, write_results  # noqa: E402
+from benchmarks.corpus import HashEmbedder, ModelEmbedder, SyntheticCorpus  # noqa: E402
+
+POINT_ID_NAMESPACE = uuid.UUID("0b5e1d9c-7a43-4c6e-9f27-52d8a3e1c6b4")
+
+
+def _point_id(i: int) -> str:
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, str(i)))
+
+
+async def _create_collection(client: AsyncQdrantClient, name: str, dim: int, layout: str) -> None:
+    if layout == "hybrid":
+        await client.create_collection(
+            collection_name=name,
+            vectors_config={DENSE_VECTOR_NAME: VectorParams(size=dim, distance=Distance.COSINE)},
+            sparse_vectors_config={SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)},
+        )
+    else:
+        # Dense-only collections (created before hybrid support) have one unnamed vector
+        await client.create_collection(
+            collection_name=name, vectors_config=VectorParams(size=dim, distance=Distance.COSINE)
+        )
+
+
+def _index_session(kb_id: str, collection_name: str, doc_id: str):
+    """Session with a throwaway KB + document row to hang the keyword index on (dense layout)."""
+    from app.db.base import SessionLocal
+    from app.models.document import Document, DocumentStatus
+    from app.models.knowledge_base import KnowledgeBase
+
+    db = SessionLocal()
+    db.add(KnowledgeBase(id=kb_id, name="benchmark", qdrant_collection_name=collection_name, config={}))
+    db.flush()
+    db.add(
+        Document(
+            id=doc_id,
+            knowledge_base_id=kb_id,
+            name="synthetic",
+            source_type="file",
+            status=DocumentStatus.COMPLETED,
+        )
+    )
+    db.commit()
+    return db
+
+
+async def build_kb(args, corpus: SyntheticCorpus, embedder, client: AsyncQdrantClient, collection_name: str, kb_id: str):
+    """Load the corpus; returns load stats. Dense layout also fills the KB keyword index in the database."""
+    await _create_collection(client, collection_name, embedder.dim, args.layout)
+    db = None
+    if args.layout == "dense":
+        from app.services.keyword_index import add_chunks_to_index
+
+        doc_id = str(uuid.uuid4())
+        db = _index_session(kb_id, collection_name, doc_id)
+    avgdl = 0.0
+    started = time.perf_counter()
+    try:
+        for start in range(0, corpus.n_chunks, args.batch_size):
+            indices = range(start, min(start + args.batch_size, corpus.n_chunks))
+            texts = [corpus.chunk(i) for i in indices]
+            if not avgdl:
+                avgdl = sum(sum(term_frequencies(t).values()) for t in texts) / len(texts)
+            vectors = embedder.encode(texts)
+            hybrid = args.layout == "hybrid"
+            points = [
+                make_point(
+                    _point_id(i),
+                    list(map(float, vec)),
+                    sparse_document_vector(text, avgdl) if hybrid else None,
+                    {
+                        "document_id": "synthetic",
+                        "chunk_index": i,
+                        "text": text,
+                        "source": "synthetic",
+                        "keywords": extract_keywords_from_text(text, min_len=2, stop=None),
+                    },
+                    hybrid=hybrid,
+                )
+                for i, text, vec in zip(indices, texts, vectors)
+            ]
+            await client.upsert(collection_name=collection_name, points=points, wait=True)
+            if db is not None:
+                add_chunks_to_index(db, kb_id, doc_id, [(_point_id(i), t) for i, t in zip(indices, texts)])
+                db.commit()
+    finally:
+        if db is not None:
+            db.close()
+    elapsed = time.perf_counter() - started
+    return {"chunks": corpus.n_chunks, "seconds": round(elapsed, 3), "chunks_per_s": round(corpus.n_chunks / elapsed, 1)}
+
+
+def _drop_kb_rows(kb_id: str) -> None:
+    from sqlalchemy import delete
+
+    from app.db.base import SessionLocal
+    from app.models.knowledge_base import KnowledgeBase
+
+    db = SessionLocal()
+    try:
+        # Documents and keyword index rows cascade
+        db.execute(delete(KnowledgeBase).where(KnowledgeBase.id == kb_id))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _stub_pipeline(args, client: AsyncQdrantClient, embedder, kb_id: str, collection_name: str) -> str:
+    """Point rag at the benchmark collection and a canned LLM; deployment/KB come from memory, not the DB."""
+    from app.models.deployment import Deployment
+    from app.models.knowledge_base import KnowledgeBase
+    from app.models.model_registry import ModelRegistry
+
+    deployment_id = str(uuid.uuid4())
+    kb_config = {"embedding_model": args.embedding_model} if args.embedder == "model" else {}
+    kb = KnowledgeBase(id=kb_id, name="benchmark", qdrant_collection_name=collection_name, config=kb_config, content_version=0)
+    model = ModelRegistry(id=str(uuid.uuid4()), name="stub", provider="custom", model_id="stub")
+    dep = Deployment(
+        id=deployment_id,
+        name="benchmark",
+        model_id=model.id,
+        knowledge_base_id=kb_id,
+        config={"top_k": args.top_k},
+    )
+
+    async def load_deployment(_deployment_id):
+        return dep, model, kb, None
+
+    async def complete(_model, prompt, **_config):
+        if args.llm_latency_ms:
+            await asyncio.sleep(args.llm_latency_ms / 1000)
+        return "stub answer"
+
+    rag._load_deployment = load_deployment
+    rag.acomplete = complete
+    rag.get_async_qdrant = lambda: client
+    if isinstance(embedder, HashEmbedder):
+        rag.encode_query_with_model = embedder.encode_query
+    return deployment_id
+
+
+def _hit(results_texts: list[str], target_text: str, k: int) -> bool:
+    return target_text in results_texts[:k]
+
+
+async def run_queries(args, corpus: SyntheticCorpus, client, kb_id: str, collection_name: str, deployment_id: str) -> dict:
+    queries = corpus.sample_queries(args.queries)
+    top_k = args.top_k
+    fetch = min(top_k * 5, 150)
+    keyword_top_k = min(rag.KEYWORD_TOP_K_MAX, top_k * 2)
+    emb_model = args.embedding_model if args.embedder == "model" else None
+    timings = Timings()
+    hits: dict[str, int] = {}
+
+    def record(name: str, texts: list[str], target: str) -> None:
+        hits[name] = hits.get(name, 0) + _hit(texts, target, top_k)
+
+    for question, target in queries:
+        target_text = corpus.chunk(target)
+        keywords = question_keywords(question)
+        keyword_scored = []
+        if args.layout == "hybrid":
+            with timings.measure("hybrid_retrieval"):
+                vector_results = await rag._hybrid_retrieval(
+                    client, collection_name, question, keywords, fetch, keyword_top_k, embedding_model=emb_model
+                )
+            record("hybrid_retrieval", [(r.payload or {}).get("text", "") for r in vector_results], target_text)
+        else:
+            with timings.measure("keyword_retrieval"):
+                keyword_scored = await rag._keyword_retrieval(client, collection_name, kb_id, keywords, keyword_top_k)
+            record("keyword_retrieval", [(p.payload or {}).get("text", "") for _, p in keyword_scored], target_text)
+            with timings.measure("vector_retrieval"):
+                vector_results = await rag._vector_retrieval(
+                    client, collection_name, question, top_k, fetch, embedding_model=emb_model
+                )
+            record("vector_retrieval", [(r.payload or {}).get("text", "") for r in vector_results], target_text)
+        with timings.measure("merge_and_take_top_k"):
+            context_parts, _ = rag._merge_and_take_top_k(keyword_scored, vector_results, keywords, top_k)
+        record("merge_and_take_top_k", context_parts, target_text)
+
+    # End to end, --concurrency requests in flight
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(question: str, target: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            _, citations = await rag.run_rag(deployment_id, question)
+            timings.add("run_rag", time.perf_counter() - started)
+            record("run_rag", [c["text"] for c in citations], corpus.chunk(target))
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one(q, t) for q, t in queries))
+    wall = time.perf_counter() - wall_started
+
+    stages = timings.summary()
+    stages["run_rag"] = latency_summary(timings.samples["run_rag"], wall_seconds=wall)
+    return {
+        "stages": stages,
+        f"recall_at_{top_k}": {name: round(n / len(queries), 4) for name, n in hits.items()},
+    }
+
+
+def _print_report(results: dict, top_k: int) -> None:
+    print(f"{'stage':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per s':>10}{'recall@' + str(top_k):>12}")
+    recall = results[f"recall_at_{top_k}"]
+    for name, s in results["stages"].items():
+        print(
+            f"{name:<24}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}"
+            f"{s['throughput_per_s']:>10.1f}{recall.get(name, 0.0):>12.3f}"
+        )
+
+
+async def main(args) -> None:
+    corpus = SyntheticCorpus(args.chunks, seed=args.seed)
+    embedder = HashEmbedder() if args.embedder == "hash" else ModelEmbedder(args.embedding_model)
+    client = AsyncQdrantClient(url=args.qdrant_url) if args.qdrant_url else AsyncQdrantClient(location=":memory:")
+    collection_name = f"bench_{uuid.uuid4().hex[:12]}"
+    kb_id = str(uuid.uuid4())
+    try:
+        load = await build_kb(args, corpus, embedder, client, collection_name, kb_id)
+        print(f"loaded {load['chunks']} chunks in {load['seconds']}s ({load['chunks_per_s']}/s)")
+        deployment_id = _stub_pipeline(args, client, embedder, kb_id, collection_name)
+        results = await run_queries(args, corpus, client, kb_id, collection_name, deployment_id)
+        results["load"] = load
+    finally:
+        if not args.keep:
+            await client.delete_collection(collection_name)
+            if args.layout == "dense":
+                _drop_kb_rows(kb_id)
+        await client.close()
+    _print_report(results, args.top_k)
+    params = {k: v for k, v in vars(args).items() if k != "out"}
+    print("results:", write_results("retrieval", params, results, args.out))
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--chunks", type=int, default=10_000, help="KB size in chunks")
+    p.add_argument("--queries", type=int, default=200, help="labelled queries to run")
+    p.add_argument("--top-k", type=int, default=10)
+    p.add_argument("--layout", choices=["hybrid", "dense"], default="hybrid", help="dense needs DATABASE_URL")
+    p.add_argument("--qdrant-url", default=None, help="Qdrant server; default is an in-memory stand-in")
+    p.add_argument("--embedder", choices=["hash", "model"], default="hash", help="hash: fast deterministic stand-in")
+    p.add_argument("--embedding-model", default="all-MiniLM-L6-v2", help="with --embedder model")
+    p.add_argument("--batch-size", type=int, default=1000, help="chunks per load batch")
+    p.add_argument("--concurrency", type=int, default=1, help="run_rag requests in flight")
+    p.add_argument("--llm-latency-ms", type=float, default=0.0, help="simulated LLM latency")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--keep", action="store_true", help="keep the collection (and index rows) afterwards")
+    p.add_argument("--out", default=None, help="result JSON path (default benchmarks/results/)")
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,153 @@
+"""
+Worker benchmark: per-job overhead of model loading in the RQ worker (workers/runner.py), with and without
+preloading.
+
+    python -m benchmarks.worker --jobs 10
+    python -m benchmarks.worker --modes cold,preload --embedding-model BAAI/bge-small-en-v1.5
+
+Each job imports the job modules, gets the embedding model and encodes --passages synthetic chunks, run the
+way the worker runs jobs. Each mode runs in a fresh Python process:
+  cold     a work-horse is forked per job from a process that has loaded nothing (the runner without
+           preloading): every job imports the modules and loads the model itself
+  preload  runner.preload() first, then a work-horse forked per job (the default worker)
+  inline   runner.preload() first, then jobs run in the process itself (WORKER_FORK=false, SimpleWorker)
+Per mode it reports job latency (fork to exit), its setup part (imports and model load) and encode part,
+and each work-horse's private (USS) and proportional (PSS) memory: a low USS means the model pages are
+shared with the worker rather than copied. Compare runs with `python -m benchmarks.compare`.
+"""
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import latency_summary, write_results
+from benchmarks.corpus import SyntheticCorpus
+from benchmarks.profiling import shared_memory_split
+
+MODES = ["cold", "preload", "inline"]
+MB = 1024 * 1024
+
+
+def _job(model_id: str, texts: list[str]) -> dict:
+    """What run_ingest does around the model: import the job modules, get the model, encode."""
+    from app.services.embedding_registry import encode_passages, get_embedding_model
+    from app.workers.runner import JOB_MODULES
+
+    started = time.perf_counter()
+    for name in JOB_MODULES:
+        importlib.import_module(name)
+    get_embedding_model(model_id)
+    loaded = time.perf_counter()
+    encode_passages(texts, model_id=model_id)
+    return {"setup": loaded - started, "encode": time.perf_counter() - loaded, **shared_memory_split()}
+
+
+def _forked_job(model_id: str, texts: list[str]) -> dict:
+    """Run _job in a forked child, like an RQ work-horse (which also leaves with os._exit)."""
+    read_fd, write_fd = os.pipe()
+    started = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            out = _job(model_id, texts)
+        except BaseException as e:
+            out = {"error": repr(e)}
+        with os.fdopen(write_fd, "w") as f:
+            f.write(json.dumps(out))
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        out = json.loads(f.read() or '{"error": "work-horse died"}')
+    os.waitpid(pid, 0)
+    out["job"] = time.perf_counter() - started
+    return out
+
+
+def run_mode(mode: str, args) -> dict:
+    """One mode, in this (fresh) process."""
+    corpus = SyntheticCorpus(args.passages * args.jobs, seed=args.seed)
+    startup = 0.0
+    if mode != "cold":
+        from app.workers.runner import preload
+
+        started = time.perf_counter()
+        preload([args.embedding_model])
+        startup = time.perf_counter() - started
+    samples = []
+    for j in range(args.jobs):
+        texts = [corpus.chunk(j * args.passages + i) for i in range(args.passages)]
+        if mode == "inline":
+            out = _job(args.embedding_model, texts)
+            out["job"] = out["setup"] + out["encode"]
+        else:
+            out = _forked_job(args.embedding_model, texts)
+        if "error" in out:
+            raise SystemExit(f"{mode} job failed: {out['error']}")
+        samples.append(out)
+    result = {"startup_seconds": round(startup, 3)}
+    for part in ("job", "setup", "encode"):
+        result[part] = latency_summary([s[part] for s in samples])
+    if samples[0].get("uss") is not None:
+        result["uss_mb"] = round(sum(s["uss"] for s in samples) / len(samples) / MB, 1)
+        result["pss_mb"] = round(sum(s["pss"] for s in samples) / len(samples) / MB, 1)
+    return result
+
+
+def _print_report(results: dict) -> None:
+    print(f"{'mode/part':<18}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'USS MB':>9}{'PSS MB':>9}")
+    for name, s in results["stages"].items():
+        print(
+            f"{name:<18}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['max_ms']:>10.1f}"
+            f"{s.get('uss_mb', float('nan')):>9.1f}{s.get('pss_mb', float('nan')):>9.1f}"
+        )
+    for mode, seconds in results["startup_seconds"].items():
+        print(f"{mode}: worker startup spent {seconds:.2f}s preloading")
+
+
+def main(args) -> None:
+    if args.run_mode:
+        print(json.dumps(run_mode(args.run_mode, args)))
+        return
+    stages, startup = {}, {}
+    for mode in args.modes:
+        argv = [sys.executable, "-m", "benchmarks.worker", "--run-mode", mode]
+        argv += ["--jobs", str(args.jobs), "--passages", str(args.passages)]
+        argv += ["--embedding-model", args.embedding_model, "--seed", str(args.seed)]
+        proc = subprocess.run(argv, capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+        if proc.returncode:
+            raise SystemExit(f"{mode} failed:\n{proc.stderr}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        seconds = result.pop("startup_seconds")
+        if mode != "cold":
+            startup[mode] = seconds
+        memory = {k: result.pop(k) for k in ("uss_mb", "pss_mb") if k in result}
+        for part, summary in result.items():
+            stages[f"{mode}/{part}"] = summary | (memory if part == "job" and mode != "inline" else {})
+    results = {"stages": stages, "startup_seconds": startup}
+    _print_report(results)
+    params = {k: v for k, v in vars(args).items() if k not in ("out", "run_mode")}
+    print("results:", write_results("worker", params, results, args.out))
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--modes", type=lambda s: s.split(","), default=MODES, help=f"comma-separated, of {','.join(MODES)}")
+    p.add_argument("--jobs", type=int, default=5, help="jobs per mode")
+    p.add_argument("--passages", type=int, default=64, help="chunks encoded per job")
+    p.add_argument("--embedding-model", default="all-MiniLM-L6-v2")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", default=None, help="result JSON path (default benchmarks/results/)")
+    p.add_argument("--run-mode", choices=MODES, default=None, help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+    unknown = [m for m in args.modes if m not in MODES]
+    if unknown:
+        p.error(f"unknown modes: {', '.join(unknown)}")
+    return args
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,91 @@
+"""
+Deterministic inputs for the chunker golden tests (test_chunking_golden.py, fixtures/generate_chunker_golden.py):
+texts of several shapes, short (outputs stored in full) and long (outputs stored as digests), and the
+(strategy, chunk_size, overlap) cases they are chunked with.
+"""
+import hashlib
+import json
+import random
+
+STRATEGIES = ["fixed", "paragraph", "sentence", "recursive"]
+# Overlap at most half the chunk size: beyond that the previous fixed chunker could loop forever and the previous
+# recursive one failed (see test_chunking_golden for those cases)
+SIZES = [(8, 0), (16, 4), (32, 16), (64, 10), (100, 50), (512, 50)]
+SHORT_CHARS = 1000
+LONG_CHARS = 60_000
+
+_WORDS = ["the", "index", "vector", "query", "retrieval", "model", "a", "of", "chunk", "document", "page", "is"]
+_ACCENTED = ["café", "naïve", "façade", "Zürich", "élan", "über"]
+
+
+def _sentence(rng: random.Random, words: list[str]) -> str:
+    text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 18)))
+    return text[0].upper() + text[1:] + rng.choice([".", ".", ".", "!", "?"])
+
+
+def _prose(rng: random.Random) -> str:
+    """Sentences in paragraphs, with the odd single line break."""
+    paragraph = " ".join(_sentence(rng, _WORDS) for _ in range(rng.randint(1, 6)))
+    return paragraph + rng.choice(["\n\n", "\n\n", "\n"])
+
+
+def _messy(rng: random.Random) -> str:
+    """Irregular whitespace: tabs, blank lines holding spaces, runs of newlines, sentence ends without spaces."""
+    piece = rng.choice(_WORDS) + rng.choice([" ", "  ", "\t", ".", ". ", ".\n", "\n \n", "\n\n\n", " \n\t\n "])
+    return piece
+
+
+def _long_words(rng: random.Random) -> str:
+    """Words longer than small chunk sizes, with no break point inside."""
+    if rng.random() < 0.3:
+        return rng.choice("abcdef") * rng.randint(20, 300) + rng.choice([" ", "\n", ". ", "\n\n"])
+    return _sentence(rng, _WORDS) + " "
+
+
+def _unicode(rng: random.Random) -> str:
+    """Accented words, unspaced CJK runs and emoji."""
+    kind = rng.random()
+    if kind < 0.2:
+        return "".join(chr(0x4E00 + rng.randrange(500)) for _ in range(rng.randint(5, 80))) + "。\n"
+    if kind < 0.3:
+        return "🙂🚀 "
+    return _sentence(rng, _ACCENTED + _WORDS) + rng.choice([" ", "\n\n"])
+
+
+def _lists(rng: random.Random) -> str:
+    """Short lines without sentence punctuation, grouped under headings."""
+    if rng.random() < 0.15:
+        return "\n\n## " + rng.choice(_WORDS).title() + "\n\n"
+    return "- " + " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 6))) + "\n"
+
+
+SHAPES = {"prose": _prose, "messy": _messy, "long_words": _long_words, "unicode": _unicode, "lists": _lists}
+
+
+def make_text(shape: str, n_chars: int, seed: int = 0) -> str:
+    rng = random.Random(f"{shape}-{n_chars}-{seed}")
+    make = SHAPES[shape]
+    parts, length = ["  \n"], 3
+    while length < n_chars:
+        part = make(rng)
+        parts.append(part)
+        length += len(part)
+    parts.append("\n\n  ")
+    return "".join(parts)
+
+
+def texts() -> dict[str, str]:
+    """name -> text: "<shape>/short" and "<shape>/long" for every shape."""
+    out = {}
+    for shape in SHAPES:
+        out[f"{shape}/short"] = make_text(shape, SHORT_CHARS)
+        out[f"{shape}/long"] = make_text(shape, LONG_CHARS)
+    return out
+
+
+def case_id(text_name: str, strategy: str, size: int, overlap: int) -> str:
+    return f"{text_name}/{strategy}/{size}/{overlap}"
+
+
+def digest(chunks: list[str]) -> str:
+    return hashlib.sha256(json.dumps(chunks, ensure_ascii=False).encode("utf-8")).hexdigest()
@@ -0,0 +1,28 @@
+"""
+Tests run against a throwaway SQLite database: DATABASE_URL is set before app.db.base creates its engines, and
+Postgres JSONB columns are rendered as SQLite JSON. The async engine needs aiosqlite (requirements-dev.txt).
+"""
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="llm-builder-tests-"), "test.db")
+
+import pytest  # noqa: E402
+from sqlalchemy.dialects.postgresql import JSONB  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_as_json(type_, compiler, **kw):
+    return "JSON"
+
+
+@pytest.fixture(scope="session")
+def db_tables():
+    """Create every table once for the session."""
+    import app.models  # noqa: F401
+    from app.db.base import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,75 @@
+"""
+Regenerate chunker_golden.json from the string-based chunkers that preceded the span-based ones (their
+document_parser.py at --rev, loaded from git), so the golden tests compare today's chunk_text with them.
+
+    python -m tests.fixtures.generate_chunker_golden --rev 6dc19fc^
+
+Run from backend/. Short texts' chunks are stored in full, long texts' as count and sha256; the "divergent"
+entries record what the old chunkers did where the new ones intentionally differ.
+"""
+import argparse
+import json
+import os
+import subprocess
+import types
+
+from tests.chunking_inputs import SHORT_CHARS, SIZES, STRATEGIES, case_id, digest, make_text, texts
+
+PARSER_PATH = "llm-builder/backend/app/services/document_parser.py"
+OUT = os.path.join(os.path.dirname(__file__), "chunker_golden.json")
+# Recursive chunking with overlap >= chunk_size, on text whose words exceed chunk_size (the hard split)
+DIVERGENT_RECURSIVE = [(16, 16), (16, 24), (64, 64), (64, 100)]
+
+
+def load_baseline(rev: str) -> types.ModuleType:
+    source = subprocess.run(
+        ["git", "show", f"{rev}:{PARSER_PATH}"], capture_output=True, text=True, check=True
+    ).stdout
+    module = types.ModuleType("baseline_document_parser")
+    exec(compile(source, f"{rev}:{PARSER_PATH}", "exec"), module.__dict__)
+    return module
+
+
+def _run(baseline, text: str, strategy: str, size: int, overlap: int) -> dict:
+    try:
+        return {"chunks": baseline.chunk_text(text, strategy, size, overlap)}
+    except Exception as e:
+        return {"error": type(e).__name__}
+
+
+def generate(rev: str) -> dict:
+    baseline = load_baseline(rev)
+    cases, digests = {}, {}
+    for name, text in texts().items():
+        for strategy in STRATEGIES:
+            for size, overlap in SIZES:
+                chunks = baseline.chunk_text(text, strategy, size, overlap)
+                key = case_id(name, strategy, size, overlap)
+                if name.endswith("/short"):
+                    cases[key] = chunks
+                else:
+                    digests[key] = {"chunks": len(chunks), "sha256": digest(chunks)}
+    text = make_text("long_words", SHORT_CHARS)
+    divergent = {}
+    for size, overlap in DIVERGENT_RECURSIVE:
+        divergent[case_id("long_words/short", "recursive", size, overlap)] = {
+            "baseline": _run(baseline, text, "recursive", size, overlap),
+            "baseline_without_overlap": _run(baseline, text, "recursive", size, 0),
+        }
+    return {"baseline_rev": rev, "cases": cases, "digests": digests, "divergent": divergent}
+
+
+def main(argv=None) -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--rev", required=True, help="git revision holding the old chunkers")
+    p.add_argument("--out", default=OUT)
+    args = p.parse_args(argv)
+    golden = generate(args.rev)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(golden, f, ensure_ascii=False, indent=0, sort_keys=True)
+        f.write("\n")
+    print(f"{args.out}: {len(golden['cases'])} cases, {len(golden['digests'])} digests")
+
+
+if __name__ == "__main__":
+    main()
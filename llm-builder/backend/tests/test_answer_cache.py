@@ -0,0 +1,43 @@
+"""Semantic answer cache (services/answer_cache.py): a KB's embedding change retires its cached answers."""
+import asyncio
+
+from qdrant_client import AsyncQdrantClient
+
+from app.models.deployment import Deployment
+from app.models.knowledge_base import KnowledgeBase
+from app.schemas.rag_config import resolve_embedding_for_kb
+from app.services import answer_cache
+from app.services.answer_cache import answer_fingerprint, lookup_answer, store_answer
+
+VECTOR = [0.1] * 384  # all-MiniLM-L6-v2 and BAAI/bge-small-en-v1.5 share the 384-wide collection
+CITATIONS = [{"text": "chunk", "source": "doc.txt", "score": 0.9}]
+
+
+def _fingerprint(kb_config: dict | None) -> str:
+    dep = Deployment(id="dep", model_id="model", knowledge_base_id="kb", config={"semantic_cache": True})
+    kb = KnowledgeBase(id="kb", qdrant_collection_name="kb_collection", content_version=3, config=kb_config)
+    return answer_fingerprint(dep, kb, None, resolve_embedding_for_kb(kb.config))
+
+
+def test_fingerprint_follows_the_resolved_embedding():
+    default = _fingerprint(None)
+    assert _fingerprint({"embedding_model": "all-MiniLM-L6-v2"}) == default
+    assert _fingerprint({"embedding_model": "BAAI/bge-small-en-v1.5"}) != default
+    assert _fingerprint({"embedding_query_prefix": "query: "}) != default
+
+
+def test_answer_cached_under_another_model_of_the_same_size_misses(monkeypatch):
+    monkeypatch.setattr(answer_cache, "_existing_collections", set())
+
+    async def scenario():
+        client = AsyncQdrantClient(location=":memory:")
+        before, after = _fingerprint(None), _fingerprint({"embedding_model": "BAAI/bge-small-en-v1.5"})
+        await store_answer(client, "dep", VECTOR, before, 3600, "question", "answer", CITATIONS)
+        hit = await lookup_answer(client, "dep", VECTOR, before, 0.95, 3600)
+        miss = await lookup_answer(client, "dep", VECTOR, after, 0.95, 3600)
+        await client.close()
+        return hit, miss
+
+    hit, miss = asyncio.run(scenario())
+    assert hit == ("answer", CITATIONS)
+    assert miss is None
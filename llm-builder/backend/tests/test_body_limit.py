@@ -0,0 +1,129 @@
+"""Request body caps (core/body_limit.py): a body over the endpoint's limit is refused before it is spooled."""
+import asyncio
+
+import pytest
+from fastapi import APIRouter, FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.core.body_limit import BodyLimitRoute, max_body_bytes
+
+LIMIT = 4096
+BOUNDARY = "limit-test-boundary"
+
+
+class _Received:
+    """ASGI wrapper counting the body bytes the app read (the app under test is received[0])."""
+
+    def __init__(self, app):
+        self.app = app
+        self.bytes = 0
+
+    async def __call__(self, scope, receive, send):
+        async def counting_receive():
+            message = await receive()
+            self.bytes += len(message.get("body", b""))
+            return message
+
+        await self.app(scope, counting_receive, send)
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def received():
+    return []
+
+
+@pytest.fixture
+def client(calls, received):
+    router = APIRouter(route_class=BodyLimitRoute)
+
+    @router.post("/limited")
+    @max_body_bytes(LIMIT)
+    async def limited(file: UploadFile = File(...)):
+        calls.append("limited")
+        return {"size": len(await file.read())}
+
+    @router.post("/unlimited")
+    async def unlimited(file: UploadFile = File(...)):
+        calls.append("unlimited")
+        return {"size": len(await file.read())}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/uploads")
+    counted = _Received(app)
+    received.append(counted)
+    with TestClient(counted) as client:
+        yield client
+
+
+def _multipart(size: int) -> bytes:
+    return (
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="a.txt"\r\n'
+        f"Content-Type: text/plain\r\n\r\n".encode()
+        + b"x" * size
+        + f"\r\n--{BOUNDARY}--\r\n".encode()
+    )
+
+
+async def _post_in_pieces(app, path: str, body: bytes) -> int:
+    """POST body in 1 KB messages without Content-Length (TestClient sends it in one); returns the status."""
+    pieces = [body[i : i + 1024] for i in range(0, len(body), 1024)]
+    statuses = []
+
+    async def receive():
+        piece = pieces.pop(0)
+        return {"type": "http.request", "body": piece, "more_body": bool(pieces)}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(k.encode(), v.encode()) for k, v in HEADERS.items()],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    await app(scope, receive, send)
+    return statuses[0]
+
+
+HEADERS = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+
+def test_body_within_limit_is_accepted(client, calls):
+    response = client.post("/uploads/limited", content=_multipart(1000), headers=HEADERS)
+    assert response.status_code == 200
+    assert response.json() == {"size": 1000}
+
+
+def test_content_length_over_limit_is_refused_unread(client, calls, received):
+    response = client.post("/uploads/limited", content=_multipart(LIMIT * 4), headers=HEADERS)
+    assert response.status_code == 413
+    assert calls == []
+    assert received[0].bytes == 0
+
+
+def test_streamed_body_over_limit_is_stopped_at_the_limit(client, calls, received):
+    status = asyncio.run(_post_in_pieces(received[0], "/uploads/limited", _multipart(LIMIT * 64)))
+    assert status == 413
+    assert calls == []
+    assert received[0].bytes <= LIMIT + 1024
+
+
+def test_endpoint_without_limit_is_unchanged(client, calls):
+    response = client.post("/uploads/unlimited", content=_multipart(LIMIT * 4), headers=HEADERS)
+    assert response.status_code == 200
+    assert calls == ["unlimited"]
@@ -0,0 +1,104 @@
+"""Bulk upload (POST /{kb_id}/upload/bulk): more files than Starlette's default form limit, duplicates, enqueueing."""
+import asyncio
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1 import knowledge_bases
+from app.core.config import get_settings
+from app.core.deps import get_current_user
+from app.db.base import SessionLocal
+from app.models.document import Document, DocumentStatus
+from app.models.knowledge_base import KnowledgeBase
+from app.models.user import Role, User
+
+BUILDER = User(id=str(uuid.uuid4()), email="builder@example.com", role=Role.BUILDER, is_active=True)
+
+
+class _RecordingQueue:
+    """get_queue stand-in: records the enqueued job ids, and whether they were enqueued off the event loop."""
+
+    def __init__(self):
+        self.job_ids: list[str] = []
+        self.on_event_loop = False
+
+    def __call__(self, name):
+        return self
+
+    def enqueue_many(self, jobs):
+        try:
+            asyncio.get_running_loop()
+            self.on_event_loop = True
+        except RuntimeError:
+            pass
+        self.job_ids.extend(job.job_id for job in jobs)
+
+
+@pytest.fixture
+def client(db_tables, tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_dir", str(tmp_path))
+    app = FastAPI()
+    app.include_router(knowledge_bases.router, prefix="/knowledge-bases")
+    app.dependency_overrides[get_current_user] = lambda: BUILDER
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    queue = _RecordingQueue()
+    monkeypatch.setattr(knowledge_bases, "get_queue", queue)
+    return queue
+
+
+@pytest.fixture
+def kb_id(db_tables):
+    kb_id = str(uuid.uuid4())
+    with SessionLocal() as db:
+        db.add(KnowledgeBase(id=kb_id, name="kb", qdrant_collection_name=f"kb_{uuid.uuid4().hex[:16]}"))
+        db.commit()
+    return kb_id
+
+
+def test_more_files_than_default_form_limit(client, queue, kb_id):
+    files = [("files", (f"doc{i}.txt", f"document {i}".encode(), "text/plain")) for i in range(1200)]
+    files.append(("files", ("copy.txt", b"document 7", "text/plain")))
+    files.append(("files", ("image.png", b"not a document", "image/png")))
+
+    response = client.post(f"/knowledge-bases/{kb_id}/upload/bulk", files=files)
+
+    assert response.status_code == 200, response.text
+    batch = response.json()
+    assert (batch["total"], batch["pending"], batch["done"]) == (1200, 1200, False)
+    assert [r["name"] for r in batch["rejected"]] == ["image.png"]
+    # The copy is a duplicate of the batch's own doc7.txt
+    assert [d["name"] for d in batch["duplicates"]] == ["doc7.txt"]
+    with SessionLocal() as db:
+        docs = db.query(Document).filter(Document.upload_batch_id == batch["batch_id"]).all()
+    assert len(docs) == 1200
+    assert all(d.status == DocumentStatus.PENDING for d in docs)
+    assert sorted(queue.job_ids) == sorted(knowledge_bases.ingest_job_id(d.id) for d in docs)
+    assert not queue.on_event_loop
+
+    progress = client.get(f"/knowledge-bases/{kb_id}/upload/batches/{batch['batch_id']}").json()
+    assert (progress["total"], progress["pending"]) == (1200, 1200)
+
+
+def test_reupload_lists_duplicates(client, queue, kb_id):
+    files = [("files", (f"doc{i}.txt", f"same content {i}".encode(), "text/plain")) for i in range(3)]
+    first = client.post(f"/knowledge-bases/{kb_id}/upload/bulk", files=files).json()
+
+    second = client.post(f"/knowledge-bases/{kb_id}/upload/bulk", files=files).json()
+
+    assert (first["total"], second["total"], second["done"]) == (3, 0, True)
+    assert sorted(d["name"] for d in second["duplicates"]) == ["doc0.txt", "doc1.txt", "doc2.txt"]
+    assert all(d["duplicate"] for d in second["duplicates"])
+    assert len(queue.job_ids) == 3
+
+
+def test_form_without_files_is_refused(client, queue, kb_id):
+    response = client.post(f"/knowledge-bases/{kb_id}/upload/bulk", data={"config": "{}"})
+    assert response.status_code == 400
+    assert queue.job_ids == []
@@ -0,0 +1,127 @@
+"""SSE endpoints when the client disconnects mid-stream: the chat turn is still saved, the LLM stream closed."""
+import asyncio
+import json
+import uuid
+
+from fastapi import FastAPI
+
+from app.api.v1 import chat, deployments
+from app.core.deps import get_current_user
+from app.db.base import SessionLocal, async_engine
+from app.models.chat import ChatMessage, ChatSession
+from app.models.user import Role, User
+
+USER = User(id=str(uuid.uuid4()), email="chat@example.com", role=Role.USER, is_active=True)
+CITATIONS = [{"text": "chunk", "source": "doc.txt", "score": 0.9}]
+
+
+class _StallingLLM:
+    """
+    stream_rag stand-in: one token, then an LLM that never finishes, so only a disconnect ends the stream.
+    closed_on_return: whether the token stream was closed by the time the response returned (rather than later,
+    when the event loop finalizes abandoned generators).
+    """
+
+    def __init__(self):
+        self.closed = False
+        self.closed_on_return = False
+
+    async def __call__(self, deployment_id, question, chat_history=None):
+        async def tokens():
+            try:
+                yield "partial answer"
+                await asyncio.Event().wait()
+            finally:
+                self.closed = True
+
+        return CITATIONS, tokens()
+
+
+async def _stream_until_first_token_then_disconnect(
+    app: FastAPI, llm: _StallingLLM, method: str, path: str, query: bytes = b"", body: bytes = b""
+) -> list[dict]:
+    sent: list[dict] = []
+    first_token = asyncio.Event()
+    request_read = False
+
+    async def receive():
+        nonlocal request_read
+        if not request_read:
+            request_read = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await first_token.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        if b"event: token" in message.get("body", b""):
+            first_token.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query,
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")] if body else [],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    try:
+        await asyncio.wait_for(app(scope, receive, send), timeout=10)
+        llm.closed_on_return = llm.closed
+    finally:
+        await async_engine.dispose()
+    return sent
+
+
+def test_chat_disconnect_mid_stream_saves_turn(db_tables, monkeypatch):
+    llm = _StallingLLM()
+    monkeypatch.setattr(chat, "stream_rag", llm)
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.dependency_overrides[get_current_user] = lambda: USER
+    session_id = str(uuid.uuid4())
+    with SessionLocal() as db:
+        db.add(ChatSession(id=session_id, deployment_id=str(uuid.uuid4()), user_id=USER.id, title="t"))
+        db.commit()
+
+    sent = asyncio.run(
+        _stream_until_first_token_then_disconnect(
+            app, llm, "GET", f"/sessions/{session_id}/messages/stream", query=b"content=hello"
+        )
+    )
+
+    body = b"".join(m.get("body", b"") for m in sent)
+    assert b"event: token" in body
+    assert b"event: done" not in body
+    with SessionLocal() as db:
+        messages = db.query(ChatMessage).filter(ChatMessage.session_id == session_id).all()
+    by_role = {m.role: m for m in messages}
+    assert sorted(by_role) == ["assistant", "user"]
+    assert by_role["user"].content == "hello"
+    assert by_role["assistant"].content == "partial answer"
+    assert by_role["assistant"].citations == CITATIONS
+    assert llm.closed_on_return
+
+
+def test_deployment_disconnect_mid_stream_closes_llm_stream(db_tables, monkeypatch):
+    llm = _StallingLLM()
+    monkeypatch.setattr(deployments, "stream_rag", llm)
+    app = FastAPI()
+    app.include_router(deployments.router, prefix="/deployments")
+    app.dependency_overrides[get_current_user] = lambda: USER
+
+    body = json.dumps({"question": "hello", "stream": True}).encode()
+    sent = asyncio.run(
+        _stream_until_first_token_then_disconnect(app, llm, "POST", f"/deployments/{uuid.uuid4()}/run", body=body)
+    )
+
+    body = b"".join(m.get("body", b"") for m in sent)
+    assert b"event: token" in body
+    assert b"event: done" not in body
+    assert llm.closed_on_return
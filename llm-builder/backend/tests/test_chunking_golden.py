@@ -0,0 +1,86 @@
+"""
+Golden tests for the span-based chunkers: chunk_text must give exactly the chunks of the string-based chunkers it
+replaced (fixtures/chunker_golden.json, generated from them by fixtures/generate_chunker_golden.py). The two
+inputs where the old chunkers broke are separate, documented cases below.
+"""
+import json
+import os
+
+import pytest
+
+from app.services.document_parser import _chunk_spans, chunk_text
+from tests.chunking_inputs import SIZES, STRATEGIES, case_id, digest, make_text, texts
+
+with open(os.path.join(os.path.dirname(__file__), "fixtures", "chunker_golden.json"), encoding="utf-8") as f:
+    GOLDEN = json.load(f)
+TEXTS = texts()
+
+
+@pytest.mark.parametrize("key", sorted(GOLDEN["cases"]))
+def test_short_texts_match_previous_chunkers(key):
+    shape, length, strategy, size, overlap = key.split("/")
+    chunks = chunk_text(TEXTS[f"{shape}/{length}"], strategy, int(size), int(overlap))
+    assert chunks == GOLDEN["cases"][key]
+
+
+@pytest.mark.parametrize("key", sorted(GOLDEN["digests"]))
+def test_long_texts_match_previous_chunkers(key):
+    shape, length, strategy, size, overlap = key.split("/")
+    chunks = chunk_text(TEXTS[f"{shape}/{length}"], strategy, int(size), int(overlap))
+    assert (len(chunks), digest(chunks)) == (GOLDEN["digests"][key]["chunks"], GOLDEN["digests"][key]["sha256"])
+
+
+def test_golden_covers_every_case():
+    expected = {case_id(name, s, size, ov) for name in TEXTS for s in STRATEGIES for size, ov in SIZES}
+    assert set(GOLDEN["cases"]) | set(GOLDEN["digests"]) == expected
+
+
+@pytest.mark.parametrize("name", sorted(TEXTS))
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_offsets_point_at_chunks(name, strategy):
+    """
+    iter_chunks takes page numbers from the offsets, so each must be where its chunk starts. Paragraph and
+    sentence chunks are their units re-joined, so only the first word is sure to be there verbatim.
+    """
+    text = TEXTS[name]
+    for size, overlap in SIZES:
+        for offset, chunk in _chunk_spans(text, strategy, size, overlap):
+            if strategy in ("fixed", "recursive"):
+                assert text.startswith(chunk, offset)
+            else:
+                assert text.startswith(chunk.split(maxsplit=1)[0], offset)
+
+
+@pytest.mark.parametrize("key", sorted(GOLDEN["divergent"]))
+def test_recursive_overlap_not_below_chunk_size(key):
+    """
+    Intentional divergence. With overlap >= chunk_size the old recursive chunker's hard split (words longer
+    than chunk_size) stepped by chunk_size - overlap: zero raised ValueError, a negative step dropped the text.
+    The hard split now steps by chunk_size, which is what the old chunker did with no overlap.
+    """
+    _, _, strategy, size, overlap = key.split("/")
+    old = GOLDEN["divergent"][key]
+    if int(overlap) == int(size):
+        assert old["baseline"] == {"error": "ValueError"}
+    else:
+        assert len(old["baseline"]["chunks"]) < len(old["baseline_without_overlap"]["chunks"])
+    chunks = chunk_text(TEXTS["long_words/short"], strategy, int(size), int(overlap))
+    assert chunks == old["baseline_without_overlap"]["chunks"]
+
+
+@pytest.mark.parametrize("size, overlap", [(20, 15), (100, 99)])
+def test_fixed_overlap_past_break_point_advances(size, overlap):
+    """
+    Intentional divergence. When a fixed chunk was cut at a break point no further than overlap from its start,
+    the old chunker restarted at the same offset and never returned (so there is no golden output). Such a step
+    now moves on without overlap. (Offsets may repeat: a step can end in whitespace stripped from both chunks.)
+    """
+    text = make_text("prose", 5000)
+    spans = _chunk_spans(text, "fixed", size, overlap)
+    offsets = [offset for offset, _ in spans]
+    assert offsets == sorted(offsets)
+    assert all(text.startswith(chunk, offset) and len(chunk) <= size for offset, chunk in spans)
+    covered = set()
+    for offset, chunk in spans:
+        covered.update(range(offset, offset + len(chunk)))
+    assert all(i in covered for i, c in enumerate(text) if not c.isspace())
@@ -0,0 +1,75 @@
+"""Text extraction: DOCX / HTML segments, and the isolated extraction's failure modes."""
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from app.services.document_parser import (
+    TEXT_BLOCK_CHARS,
+    ExtractionError,
+    extract_text_from_file,
+    iter_segments,
+    iter_segments_isolated,
+)
+
+
+def _write_html(path, paragraphs: int) -> str:
+    body = "".join(f"<p>Paragraph {i} with <b>bold</b> words.</p>\n<!-- note -->" for i in range(paragraphs))
+    path.write_text(f"<html><head><title>Doc</title><script>var x = 1;</script></head><body>{body}</body></html>")
+    return str(path)
+
+
+def _write_docx(path, paragraphs: int) -> str:
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    for i in range(paragraphs):
+        document.add_paragraph(f"Paragraph {i} of the document." if i % 7 else "")
+    document.save(str(path))
+    return str(path)
+
+
+@pytest.fixture(params=["html", "docx"])
+def document(request, tmp_path):
+    if request.param == "html":
+        pytest.importorskip("bs4")
+        return _write_html(tmp_path / "doc.html", 5000)
+    return _write_docx(tmp_path / "doc.docx", 5000)
+
+
+def test_segments_are_blocks_of_the_extracted_text(document):
+    segments = list(iter_segments(document))
+    assert len(segments) > 1
+    assert all(page is None for page, _ in segments)
+    assert all(len(text) < 2 * TEXT_BLOCK_CHARS for _, text in segments)
+    assert "\n".join(text for _, text in segments) == extract_text_from_file(document)
+
+
+def test_isolated_segments_match(document):
+    assert list(iter_segments_isolated(document, timeout=60)) == list(iter_segments(document))
+
+
+def test_killed_extraction_process_fails_at_once(tmp_path):
+    """A child killed mid-parse (as the OOM killer would) fails the document now, not when the timeout runs out."""
+    pytest.importorskip("bs4")
+    document = _write_html(tmp_path / "big.html", 40_000)
+
+    def kill_first_child():
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            children = multiprocessing.active_children()
+            if children:
+                time.sleep(0.5)  # into the parse
+                os.kill(children[0].pid, signal.SIGKILL)
+                return
+            time.sleep(0.01)
+
+    killer = threading.Thread(target=kill_first_child)
+    killer.start()
+    started = time.monotonic()
+    with pytest.raises(ExtractionError, match="died"):
+        list(iter_segments_isolated(document, timeout=300))
+    killer.join()
+    assert time.monotonic() - started < 60
@@ -0,0 +1,110 @@
+"""Re-ingest (workers/ingest.py): the KB's content_version, which keys cached retrievals, moves iff results may."""
+import uuid
+
+import pytest
+from qdrant_client import QdrantClient
+
+from app.core.config import get_settings
+from app.db.base import SessionLocal
+from app.models.document import Document, DocumentStatus
+from app.models.knowledge_base import KnowledgeBase
+from app.workers import ingest
+
+# One chunk per paragraph, each on the page its segment gives (an overlap of 0 would mean the default)
+CHUNKING = {"chunk_strategy": "recursive", "chunk_size": 40, "chunk_overlap": 1}
+PARAGRAPHS = ["Alpha paragraph about vectors.", "Beta paragraph about queries.", "Gamma paragraph about pages."]
+
+
+class _Run:
+    """Stand-ins for extraction and embedding: segments gives the (page, text) the next run extracts."""
+
+    def __init__(self):
+        self.segments: list[tuple[int | None, str]] = []
+        self.fail_embedding = False
+
+    def extract(self, path, **kwargs):
+        yield from self.segments
+
+    def encode(self, texts, model_id=None, hashes=None):
+        if self.fail_embedding:
+            raise RuntimeError("embedding service unavailable")
+        return [[1.0, float(len(t)), 0.0, 1.0] for t in texts]
+
+
+@pytest.fixture
+def run(db_tables, tmp_path, monkeypatch):
+    client = QdrantClient(location=":memory:")
+    run = _Run()
+    monkeypatch.setattr(get_settings(), "upload_dir", str(tmp_path))
+    monkeypatch.setattr(ingest, "get_qdrant", lambda: client)
+    monkeypatch.setattr(ingest, "iter_segments_isolated", run.extract)
+    monkeypatch.setattr(ingest, "encode_passages_cached", run.encode)
+    monkeypatch.setattr(ingest, "get_vector_size", lambda model: 4)
+    monkeypatch.setattr(ingest, "record_ingest", lambda *args, **kwargs: None)
+    run.client = client
+    yield run
+    client.close()
+
+
+@pytest.fixture
+def doc(run, tmp_path):
+    kb_id, doc_id = str(uuid.uuid4()), str(uuid.uuid4())
+    (tmp_path / "doc.txt").write_text("extracted by the stand-in")
+    with SessionLocal() as db:
+        db.add(KnowledgeBase(id=kb_id, name="kb", qdrant_collection_name=f"kb_{uuid.uuid4().hex[:16]}"))
+        db.add(
+            Document(
+                id=doc_id,
+                knowledge_base_id=kb_id,
+                name="doc.txt",
+                source_type="file",
+                storage_path="doc.txt",
+                status=DocumentStatus.PENDING,
+                config=CHUNKING,
+            )
+        )
+        db.commit()
+    return doc_id
+
+
+def _ingest(run, doc_id: str, pages: list[int]) -> int:
+    """Ingest PARAGRAPHS on the given pages; returns the KB's content_version afterwards."""
+    run.segments = [(page, ("\n" if i else "") + text) for i, (page, text) in enumerate(zip(pages, PARAGRAPHS))]
+    with SessionLocal() as db:
+        db.get(Document, doc_id).status = DocumentStatus.PENDING
+        db.commit()
+    if run.fail_embedding:
+        with pytest.raises(RuntimeError):
+            ingest.run_ingest(doc_id)
+    else:
+        ingest.run_ingest(doc_id)
+    with SessionLocal() as db:
+        doc = db.get(Document, doc_id)
+        assert doc.status == (DocumentStatus.FAILED if run.fail_embedding else DocumentStatus.COMPLETED)
+        return db.get(KnowledgeBase, doc.knowledge_base_id).content_version
+
+
+def _pages(run, doc_id: str) -> dict[str, int]:
+    with SessionLocal() as db:
+        collection = db.get(KnowledgeBase, db.get(Document, doc_id).knowledge_base_id).qdrant_collection_name
+    points, _ = run.client.scroll(collection, limit=100, with_payload=True)
+    return {p.payload["text"].split()[0]: p.payload.get("page") for p in points}
+
+
+def test_unchanged_reingest_keeps_version(run, doc):
+    first = _ingest(run, doc, [1, 2, 3])
+    assert _pages(run, doc) == {"Alpha": 1, "Beta": 2, "Gamma": 3}
+    assert _ingest(run, doc, [1, 2, 3]) == first
+
+
+def test_moved_pages_bump_version(run, doc):
+    """Same chunk texts (no new points, none removed), but the kept chunks now start on other pages."""
+    first = _ingest(run, doc, [1, 2, 3])
+    assert _ingest(run, doc, [1, 4, 5]) > first
+    assert _pages(run, doc) == {"Alpha": 1, "Beta": 4, "Gamma": 5}
+
+
+def test_failed_reingest_bumps_version(run, doc):
+    first = _ingest(run, doc, [1, 2, 3])
+    run.fail_embedding = True
+    assert _ingest(run, doc, [1, 2, 3]) > first
@@ -0,0 +1,40 @@
+"""Streaming chunking (iter_chunks): memory stays bounded on text the strategy finds no break in."""
+import pytest
+
+from app.services import document_parser
+from app.services.document_parser import CHUNK_WINDOW_MAX_WINDOWS, CHUNK_WINDOW_MIN_CHARS, iter_chunks
+
+PAGES = 300
+PAGE_WORDS = 400
+
+
+def _pages():
+    """pypdf-like pages: words on one line each, no blank lines, no sentence end marks."""
+    for page in range(1, PAGES + 1):
+        yield page, " ".join(f"p{page}w{i}" for i in range(PAGE_WORDS))
+
+
+@pytest.mark.parametrize("strategy", ["paragraph", "sentence", "recursive"])
+def test_separator_free_stream_keeps_buffer_bounded(strategy, monkeypatch):
+    chunked_lengths = []
+    chunk_spans = document_parser._chunk_spans
+
+    def spy(text, *args, **kwargs):
+        chunked_lengths.append(len(text))
+        return chunk_spans(text, *args, **kwargs)
+
+    monkeypatch.setattr(document_parser, "_chunk_spans", spy)
+    page_chars = max(len(text) for _, text in _pages())
+
+    chunks = list(iter_chunks(_pages(), strategy, 512, 50))
+
+    assert max(chunked_lengths) <= CHUNK_WINDOW_MIN_CHARS * CHUNK_WINDOW_MAX_WINDOWS + page_chars
+    # Re-chunked about once per window, not once per page
+    assert len(chunked_lengths) <= 2 * PAGES * page_chars // CHUNK_WINDOW_MIN_CHARS
+    # Every word is kept (overlaps may start inside a word)
+    words = {word for chunk, _ in chunks for word in chunk.split()}
+    assert {word for _, text in _pages() for word in text.split()} <= words
+    # Only the text left at the end may be longer than a chunk
+    assert all(len(chunk) <= 512 for chunk, _ in chunks[:-1])
+    pages = [page for _, page in chunks]
+    assert pages == sorted(pages) and pages[-1] > pages[0]
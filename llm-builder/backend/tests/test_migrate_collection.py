@@ -0,0 +1,109 @@
+"""Hybrid migration (workers/maintenance.py): never switches a KB away from points written during the copy."""
+import uuid
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from app.db.base import SessionLocal
+from app.models.document import Document, DocumentStatus
+from app.models.knowledge_base import KnowledgeBase
+from app.workers import maintenance
+
+VECTOR_SIZE = 4
+
+
+@pytest.fixture
+def qdrant(monkeypatch):
+    client = QdrantClient(location=":memory:")
+    monkeypatch.setattr(maintenance, "get_qdrant", lambda: client)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def dense_kb(db_tables, qdrant):
+    """A KB on a dense-only collection (pre-hybrid layout) with one ingested document of three points."""
+    kb_id, doc_id, collection = str(uuid.uuid4()), str(uuid.uuid4()), f"kb_{uuid.uuid4().hex[:16]}"
+    qdrant.create_collection(collection, vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE))
+    qdrant.upsert(
+        collection,
+        [
+            PointStruct(
+                id=str(uuid.uuid4()),
+                vector=[1.0, float(i), 0.0, 1.0],
+                payload={"document_id": doc_id, "chunk_index": i, "text": f"chunk number {i} about vectors"},
+            )
+            for i in range(3)
+        ],
+        wait=True,
+    )
+    with SessionLocal() as db:
+        db.add(KnowledgeBase(id=kb_id, name="kb", qdrant_collection_name=collection))
+        db.add(Document(id=doc_id, knowledge_base_id=kb_id, name="a.txt", status=DocumentStatus.COMPLETED))
+        db.commit()
+    return kb_id, doc_id, collection
+
+
+def _collection_of(kb_id: str) -> str:
+    with SessionLocal() as db:
+        return db.get(KnowledgeBase, kb_id).qdrant_collection_name
+
+
+def _collections(client) -> set[str]:
+    return {c.name for c in client.get_collections().collections}
+
+
+def test_migrates_and_drops_old_collection(dense_kb, qdrant):
+    kb_id, _, old = dense_kb
+    maintenance.run_migrate_collection(kb_id)
+    new = _collection_of(kb_id)
+    assert new != old
+    assert _collections(qdrant) == {new}
+    assert maintenance.is_hybrid_collection(qdrant, new)
+    assert qdrant.count(new).count == 3
+
+
+def test_refuses_while_documents_are_queued(dense_kb, qdrant):
+    kb_id, _, old = dense_kb
+    with SessionLocal() as db:
+        db.add(Document(id=str(uuid.uuid4()), knowledge_base_id=kb_id, name="b.txt", status=DocumentStatus.PENDING))
+        db.commit()
+    with pytest.raises(maintenance.MigrationConflict):
+        maintenance.run_migrate_collection(kb_id)
+    assert _collection_of(kb_id) == old
+    assert _collections(qdrant) == {old}
+
+
+@pytest.mark.parametrize("status", [DocumentStatus.PROCESSING, DocumentStatus.COMPLETED])
+def test_document_ingested_during_copy_aborts_switch(dense_kb, qdrant, monkeypatch, status):
+    """An ingest that starts (or even finishes) while points are copied wrote to the old collection."""
+    kb_id, doc_id, old = dense_kb
+    copy = maintenance.upsert_points
+
+    def copy_while_ingesting(client, collection_name, points, **kwargs):
+        copy(client, collection_name, points, **kwargs)
+        with SessionLocal() as db:
+            db.get(Document, doc_id).status = status
+            db.get(Document, doc_id).error_message = "re-ingested"
+            db.commit()
+
+    monkeypatch.setattr(maintenance, "upsert_points", copy_while_ingesting)
+    with pytest.raises(maintenance.MigrationConflict):
+        maintenance.run_migrate_collection(kb_id)
+    assert _collection_of(kb_id) == old
+    assert _collections(qdrant) == {old}
+    assert qdrant.count(old).count == 3
+
+
+def test_failed_copy_leaves_no_orphan_collection(dense_kb, qdrant, monkeypatch):
+    kb_id, _, old = dense_kb
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("qdrant unavailable")
+
+    monkeypatch.setattr(maintenance, "upsert_points", fail)
+    with pytest.raises(RuntimeError):
+        maintenance.run_migrate_collection(kb_id)
+    assert _collection_of(kb_id) == old
+    assert _collections(qdrant) == {old}
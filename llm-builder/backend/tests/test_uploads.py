@@ -0,0 +1,42 @@
+"""Many-file uploads (services/uploads.receive_files): every archive member counts toward max_files."""
+import asyncio
+import io
+import os
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.uploads import ReceivedUpload, UploadRejected, UploadTooLarge, receive_files
+
+ALLOWED = {".txt"}
+
+
+def _zip(members: dict[str, bytes]) -> SimpleNamespace:
+    """UploadFile stand-in holding a zip of members."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return SimpleNamespace(filename="batch.zip", file=buffer)
+
+
+def _receive(files, directory, max_files: int):
+    return asyncio.run(receive_files(files, str(directory), ALLOWED, 64, max_files, 1024))
+
+
+def test_rejected_members_count_toward_max_files(tmp_path):
+    members = {"keep.txt": b"kept text"} | {f"junk/{i}.exe": b"MZ" for i in range(1000)}
+    with pytest.raises(UploadTooLarge, match="Too many files"):
+        _receive([_zip(members)], tmp_path, max_files=10)
+    assert os.listdir(tmp_path) == []
+
+
+def test_members_within_max_files_are_each_answered(tmp_path):
+    members = {"keep.txt": b"kept text", "big.txt": b"x" * 100, "tool.exe": b"MZ"}
+    results = dict(_receive([_zip(members)], tmp_path, max_files=3))
+    assert isinstance(results["keep.txt"], ReceivedUpload)
+    assert isinstance(results["big.txt"], UploadTooLarge)
+    assert isinstance(results["tool.exe"], UploadRejected)
+    results["keep.txt"].discard()
@@ -4,6 +4,7 @@ export type RagConfigFormValues = {
   chunk_strategy: string;
   chunk_size: number;
   chunk_overlap: number;
+  chunk_token_limit: boolean;
   embedding_model: string;
   embedding_query_prefix: string;
 };
@@ -13,6 +14,7 @@ export const CHUNK_STRATEGIES = [
   { id: "paragraph", label: "By paragraph" },
   { id: "sentence", label: "By sentence" },
   { id: "recursive", label: "Recursive (section-aware)" },
+  { id: "token", label: "By tokens (embedding model)" },
 ] as const;
 
 export const EMBEDDING_MODELS = [
@@ -57,6 +59,7 @@ export function RagConfigForm({
                     chunk_strategy: (c.chunk_strategy as string) || "fixed",
                     chunk_size: typeof c.chunk_size === "number" ? c.chunk_size : 512,
                     chunk_overlap: typeof c.chunk_overlap === "number" ? c.chunk_overlap : 50,
+                    chunk_token_limit: c.chunk_token_limit === true,
                     embedding_model: (c.embedding_model as string) || "all-MiniLM-L6-v2",
                     embedding_query_prefix: (c.embedding_query_prefix as string) ?? "",
                   });
@@ -102,7 +105,7 @@ export function RagConfigForm({
               onChange={(e) => onChange({ ...value, chunk_size: parseInt(e.target.value, 10) || 512 })}
               className="input"
             />
-            <p className="text-xs text-slate-500 mt-0.5">Characters (or sentences for sentence strategy)</p>
+            <p className="text-xs text-slate-500 mt-0.5">Characters (tokens for token strategy)</p>
           </div>
           <div>
             <label className="label">Overlap</label>
@@ -115,6 +118,20 @@ export function RagConfigForm({
               className="input"
             />
           </div>
+          <div className="sm:col-span-2">
+            <label className="flex items-center gap-2 cursor-pointer">
+              <input
+                type="checkbox"
+                checked={value.chunk_token_limit}
+                onChange={(e) => onChange({ ...value, chunk_token_limit: e.target.checked })}
+                className="w-4 h-4 rounded border-[var(--border)] text-brand-600 focus:ring-brand-500"
+              />
+              <span className="text-sm text-slate-700">Fit chunks to the embedding model</span>
+            </label>
+            <p className="text-xs text-slate-500 mt-0.5">
+              Split chunks longer than the model embeds in full (its token limit), so no text is cut off
+            </p>
+          </div>
         </div>
       </div>
 
@@ -43,6 +43,7 @@ type RagConfigFormValues = {
   chunk_strategy: string;
   chunk_size: number;
   chunk_overlap: number;
+  chunk_token_limit: boolean;
   embedding_model: string;
   embedding_query_prefix: string;
 };
@@ -51,6 +52,7 @@ const DEFAULT_RAG_CONFIG: RagConfigFormValues = {
   chunk_strategy: "fixed",
   chunk_size: 512,
   chunk_overlap: 50,
+  chunk_token_limit: false,
   embedding_model: "all-MiniLM-L6-v2",
   embedding_query_prefix: "",
 };
@@ -165,6 +167,7 @@ export default function KnowledgePage() {
         chunk_strategy: kbConfig.chunk_strategy,
         chunk_size: kbConfig.chunk_size,
         chunk_overlap: kbConfig.chunk_overlap,
+        chunk_token_limit: kbConfig.chunk_token_limit,
         embedding_model: kbConfig.embedding_model,
         embedding_query_prefix: kbConfig.embedding_query_prefix || null,
       };
@@ -210,6 +213,7 @@ export default function KnowledgePage() {
             chunk_strategy: opts.config.chunk_strategy,
             chunk_size: opts.config.chunk_size,
             chunk_overlap: opts.config.chunk_overlap,
+            chunk_token_limit: opts.config.chunk_token_limit,
             embedding_model: opts.config.embedding_model,
             embedding_query_prefix: opts.config.embedding_query_prefix || null,
           })
@@ -316,6 +320,7 @@ export default function KnowledgePage() {
         chunk_strategy: editKbConfig.chunk_strategy,
         chunk_size: editKbConfig.chunk_size,
         chunk_overlap: editKbConfig.chunk_overlap,
+        chunk_token_limit: editKbConfig.chunk_token_limit,
         embedding_model: editKbConfig.embedding_model,
         embedding_query_prefix: editKbConfig.embedding_query_prefix || null,
       };
@@ -354,6 +359,7 @@ export default function KnowledgePage() {
         chunk_strategy: editDocConfig.chunk_strategy,
         chunk_size: editDocConfig.chunk_size,
         chunk_overlap: editDocConfig.chunk_overlap,
+        chunk_token_limit: editDocConfig.chunk_token_limit,
         embedding_model: editDocConfig.embedding_model,
         embedding_query_prefix: editDocConfig.embedding_query_prefix || null,
       };
@@ -574,6 +580,7 @@ export default function KnowledgePage() {
                               chunk_strategy: (c.chunk_strategy as string) || "fixed",
                               chunk_size: typeof c.chunk_size === "number" ? c.chunk_size : 512,
                               chunk_overlap: typeof c.chunk_overlap === "number" ? c.chunk_overlap : 50,
+                              chunk_token_limit: c.chunk_token_limit === true,
                               embedding_model: (c.embedding_model as string) || "all-MiniLM-L6-v2",
                               embedding_query_prefix: (c.embedding_query_prefix as string) ?? "",
                             });
@@ -725,6 +732,7 @@ export default function KnowledgePage() {
                                 chunk_strategy: (c.chunk_strategy as string) || "fixed",
                                 chunk_size: typeof c.chunk_size === "number" ? c.chunk_size : 512,
                                 chunk_overlap: typeof c.chunk_overlap === "number" ? c.chunk_overlap : 50,
+                                chunk_token_limit: c.chunk_token_limit === true,
                                 embedding_model: (c.embedding_model as string) || "all-MiniLM-L6-v2",
                                 embedding_query_prefix: (c.embedding_query_prefix as string) ?? "",
                               });
@@ -22,6 +22,7 @@ const DEFAULT_CONFIG: RagConfigFormValues = {
   chunk_strategy: "fixed",
   chunk_size: 512,
   chunk_overlap: 50,
+  chunk_token_limit: false,
   embedding_model: "all-MiniLM-L6-v2",
   embedding_query_prefix: "",
 };
@@ -76,6 +77,7 @@ export default function RagConfigsPage() {
       chunk_strategy: (c.chunk_strategy as string) || "fixed",
       chunk_size: typeof c.chunk_size === "number" ? c.chunk_size : 512,
       chunk_overlap: typeof c.chunk_overlap === "number" ? c.chunk_overlap : 50,
+      chunk_token_limit: c.chunk_token_limit === true,
       embedding_model: (c.embedding_model as string) || "all-MiniLM-L6-v2",
       embedding_query_prefix: (c.embedding_query_prefix as string) ?? "",
     });
@@ -91,6 +93,7 @@ export default function RagConfigsPage() {
         chunk_strategy: formConfig.chunk_strategy,
         chunk_size: formConfig.chunk_size,
         chunk_overlap: formConfig.chunk_overlap,
+        chunk_token_limit: formConfig.chunk_token_limit,
         embedding_model: formConfig.embedding_model,
         embedding_query_prefix: formConfig.embedding_query_prefix || null,
       };